@@ -23,8 +23,9 @@ class Lexer:
     """Tokenizer for ArduinoML DSL"""
 
     TOKEN_PATTERNS = [
-        ('KEYWORD', r'\b(AppBuilder|get_contents|sensor|actuator|on_pin|state|set|to|when|has_value|go_to_state|when_all|when_any|when_condition)\b'),
+        ('KEYWORD', r'\b(AppBuilder|get_contents|sensor|actuator|on_pin|state|set|to|when|has_value|go_to_state|when_all|when_any|when_condition|with_debounce|with_interrupt|after)\b'),
         ('SIGNAL', r'\b(HIGH|LOW)\b'),
+        ('TIME_UNIT', r'\b(MS|S)\b'),
         ('STRING', r'"[^"]*"'),
         ('NUMBER', r'\d+'),
         ('DOT', r'\.'),
@@ -99,18 +100,20 @@ class BNFParser:
                       .get_contents()
 
     <brick_decl> ::= <sensor_decl> | <actuator_decl>
-    <sensor_decl> ::= .sensor(<name>).on_pin(<pin_number>)
+    <sensor_decl> ::= .sensor(<name>)[<sensor_options>].on_pin(<pin_number>)
+    <sensor_options> ::= .with_debounce(<number>)[.with_interrupt()] | .with_interrupt()[.with_debounce(<number>)]
     <actuator_decl> ::= .actuator(<name>).on_pin(<pin_number>)
 
     <state_decl> ::= .state(<state_name>)
                      <action>+
-                     <transition>
+                     <transition>+
 
     <action> ::= .set(<actuator_name>).to(<signal>)
 
     <transition> ::= <simple_transition>
                    | <and_transition>
                    | <or_transition>
+                   | <time_transition>
 
     <simple_transition> ::= .when(<sensor_name>)
                             .has_value(<signal>)
@@ -121,6 +124,9 @@ class BNFParser:
 
     <or_transition> ::= .when_any(<condition_list>)
                         .go_to_state(<state_name>)
+
+    <time_transition> ::= .after(<number>[, <time_unit>])
+                          .go_to_state(<state_name>)
     """
 
     def __init__(self, tokens: List[Token]):
@@ -230,7 +236,8 @@ class BNFParser:
 
     def parse_sensor_decl(self) -> ParseNode:
         """
-        <sensor_decl> ::= .sensor(<name>).on_pin(<pin_number>)
+        <sensor_decl> ::= .sensor(<name>)[<sensor_options>].on_pin(<pin_number>)
+        <sensor_options> ::= .with_debounce(<number>)[.with_interrupt()] | .with_interrupt()[.with_debounce(<number>)]
         """
         node = ParseNode('sensor')
 
@@ -241,6 +248,27 @@ class BNFParser:
         node.children.append(ParseNode('name', name.value.strip('"')))
         self.consume('RPAREN')
 
+        # Optional debounce window and interrupt capture, in any order
+        options = set()
+        next_token = self.peek(1)
+        while next_token and next_token.value in ('with_debounce', 'with_interrupt'):
+            if next_token.value in options:
+                raise SyntaxError(f"Duplicate '{next_token.value}' at position {next_token.position}")
+            options.add(next_token.value)
+            self.consume('DOT')
+            if next_token.value == 'with_debounce':
+                self.consume('KEYWORD', 'with_debounce')
+                self.consume('LPAREN')
+                debounce = self.consume('NUMBER')
+                node.children.append(ParseNode('debounce', int(debounce.value)))
+                self.consume('RPAREN')
+            else:
+                self.consume('KEYWORD', 'with_interrupt')
+                self.consume('LPAREN')
+                self.consume('RPAREN')
+                node.children.append(ParseNode('interrupt', True))
+            next_token = self.peek(1)
+
         self.consume('DOT')
         self.consume('KEYWORD', 'on_pin')
         self.consume('LPAREN')
@@ -263,6 +291,12 @@ class BNFParser:
         node.children.append(ParseNode('name', name.value.strip('"')))
         self.consume('RPAREN')
 
+        # Debounce windows and interrupt capture only apply to sensors
+        next_token = self.peek(1)
+        if next_token and next_token.value in ('with_debounce', 'with_interrupt'):
+            raise SyntaxError(f"Actuator '{node.children[0].value}' cannot use '{next_token.value}' at position "
+                              f"{next_token.position}: only sensors are debounced or captured by interrupts")
+
         self.consume('DOT')
         self.consume('KEYWORD', 'on_pin')
         self.consume('LPAREN')
@@ -276,7 +310,7 @@ class BNFParser:
         """
         <state_decl> ::= .state(<state_name>)
                          <action>+
-                         <transition>
+                         <transition>+
         """
         node = ParseNode('state')
 
@@ -303,9 +337,14 @@ class BNFParser:
         actions_node = ParseNode('actions', children=actions)
         node.children.append(actions_node)
 
-        # Transition (exactly one)
-        transition = self.parse_transition()
-        node.children.append(transition)
+        # Transitions (at least one), by decreasing priority
+        node.children.append(self.parse_transition())
+        while self.current_token() and self.current_token().type == 'DOT':
+            next_token = self.peek(1)
+            if next_token and next_token.value in ['when', 'when_all', 'when_any', 'after']:
+                node.children.append(self.parse_transition())
+            else:
+                break
 
         return node
 
@@ -336,6 +375,7 @@ class BNFParser:
         <transition> ::= <simple_transition>
                        | <and_transition>
                        | <or_transition>
+                       | <time_transition>
         """
         self.consume('DOT')
         keyword = self.current_token()
@@ -346,8 +386,10 @@ class BNFParser:
             return self.parse_and_transition()
         elif keyword.value == 'when_any':
             return self.parse_or_transition()
+        elif keyword.value == 'after':
+            return self.parse_time_transition()
         else:
-            raise SyntaxError(f"Expected transition keyword (when/when_all/when_any), got '{keyword.value}'")
+            raise SyntaxError(f"Expected transition keyword (when/when_all/when_any/after), got '{keyword.value}'")
 
     def parse_simple_transition(self) -> ParseNode:
         """
@@ -426,6 +468,34 @@ class BNFParser:
 
         return node
 
+    def parse_time_transition(self) -> ParseNode:
+        """
+        <time_transition> ::= .after(<number>[, <time_unit>])
+                              .go_to_state(<state_name>)
+        """
+        node = ParseNode('time_transition')
+
+        # Already consumed DOT in parse_transition
+        self.consume('KEYWORD', 'after')
+        self.consume('LPAREN')
+        delay = self.consume('NUMBER')
+        node.children.append(ParseNode('delay', int(delay.value)))
+        unit = 'MS'
+        if self.current_token() and self.current_token().type == 'COMMA':
+            self.consume('COMMA')
+            unit = self.consume('TIME_UNIT').value
+        node.children.append(ParseNode('unit', unit))
+        self.consume('RPAREN')
+
+        self.consume('DOT')
+        self.consume('KEYWORD', 'go_to_state')
+        self.consume('LPAREN')
+        next_state = self.consume('STRING')
+        node.children.append(ParseNode('next_state', next_state.value.strip('"')))
+        self.consume('RPAREN')
+
+        return node
+
     def parse_condition_list(self) -> List[ParseNode]:
         """
         Parse condition list: (<sensor>, <signal>), (<sensor>, <signal>), ...
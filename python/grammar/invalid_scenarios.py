@@ -43,7 +43,7 @@ def invalid_scenario2_missing_state():
 def invalid_scenario3_state_without_transition():
     """
     ERROR: State has no transition
-    Every state must have exactly one transition
+    Every state must have at least one transition
     """
     app = AppBuilder("Invalid_No_Transition") \
         .sensor("BUTTON").on_pin(9) \
@@ -223,6 +223,44 @@ def invalid_scenario12_duplicate_brick_names():
     return app
 
 
+def invalid_scenario13_interrupt_on_unsupported_pin():
+    """
+    ERROR: Interrupt capture on a pin that cannot trigger interrupts
+    On the Uno, only pins 2 and 3 can trigger external interrupts
+    """
+    app = AppBuilder("Invalid_Interrupt_Pin") \
+        .sensor("BUTTON").with_interrupt().on_pin(9) \
+        .actuator("LED").on_pin(11) \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when("BUTTON").has_value(HIGH).go_to_state("on") \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .when("BUTTON").has_value(LOW).go_to_state("off") \
+        .get_contents()
+
+    return app
+
+
+def invalid_scenario14_interrupt_on_actuator():
+    """
+    ERROR: Interrupt capture of an actuator
+    Only sensors can be debounced or captured by an interrupt handler
+    """
+    app = AppBuilder("Invalid_Actuator_Interrupt") \
+        .sensor("BUTTON").on_pin(9) \
+        .actuator("LED").with_interrupt().on_pin(2) \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when("BUTTON").has_value(HIGH).go_to_state("on") \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .when("BUTTON").has_value(LOW).go_to_state("off") \
+        .get_contents()
+
+    return app
+
+
 if __name__ == '__main__':
     print("These scenarios contain intentional errors and should fail validation!")
     print("Run the validator to see the specific error messages for each one.\n")
@@ -240,6 +278,8 @@ if __name__ == '__main__':
         invalid_scenario10_missing_go_to_state,
         invalid_scenario11_empty_app_name,
         invalid_scenario12_duplicate_brick_names,
+        invalid_scenario13_interrupt_on_unsupported_pin,
+        invalid_scenario14_interrupt_on_actuator,
     ]
 
     for scenario in invalid_scenarios:
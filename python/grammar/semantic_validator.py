@@ -4,12 +4,14 @@ This module performs semantic validation beyond syntax checking.
 """
 
 from bnf_parser import ParseNode
+from pyArduinoML.model import Board
 
 
 class SemanticValidator:
     """Validates semantic rules for ArduinoML DSL"""
 
-    def __init__(self):
+    def __init__(self, board=Board.UNO):
+        self.board = board  # target board, giving the pins that can trigger interrupts
         self.errors = []
         self.warnings = []
         self.bricks = {}  # name -> type (sensor/actuator)
@@ -78,12 +80,20 @@ class SemanticValidator:
         """Visit sensor declaration"""
         name = None
         pin = None
+        interrupt = False
 
         for child in node.children:
             if child.type == 'name':
                 name = child.value
             elif child.type == 'pin':
                 pin = child.value
+            elif child.type == 'interrupt':
+                interrupt = True
+
+        if interrupt and pin is not None and not Board.can_interrupt(self.board, pin):
+            self.errors.append(
+                f"Sensor '{name}' cannot use an interrupt: pin {pin} cannot trigger interrupts on board '{self.board}'"
+            )
 
         if name:
             if name in self.bricks:
@@ -134,6 +144,11 @@ class SemanticValidator:
         for child in node.children:
             self._visit(child)
 
+        self.validate_transition_priorities(state_name, [
+            child for child in node.children
+            if child.type in ('simple_transition', 'and_transition', 'or_transition', 'time_transition')
+        ])
+
     def _visit_actions(self, node):
         """Visit actions container"""
         for child in node.children:
@@ -218,6 +233,25 @@ class SemanticValidator:
         if target_state:
             self.target_states.append(target_state)
 
+    def _visit_time_transition(self, node):
+        """Visit time transition and check the delay and target state"""
+        delay = None
+        target_state = None
+
+        for child in node.children:
+            if child.type == 'delay':
+                delay = child.value
+            elif child.type == 'next_state':
+                target_state = child.value
+
+        if delay is not None and delay <= 0:
+            self.errors.append(
+                f"Invalid delay {delay} in time transition: must be positive"
+            )
+
+        if target_state:
+            self.target_states.append(target_state)
+
     def _visit_conditions(self, node):
         """Visit conditions container"""
         for child in node.children:
@@ -249,6 +283,60 @@ class SemanticValidator:
                 f"Invalid signal value '{signal_value}': must be HIGH or LOW"
             )
 
+    def validate_transition_priorities(self, state_name, transitions):
+        """
+        Warn about transitions that can never fire: the transitions of a state are tried in order, so a transition
+        whose condition only holds when a previous condition also holds is shadowed.
+        """
+        conditions = []  # (kind, [(sensor, signal)]) of each transition, or ('after', delay in ms)
+        sensors = []
+        for transition in transitions:
+            if transition.type == 'time_transition':
+                values = dict((c.type, c.value) for c in transition.children)
+                conditions.append(('after', values.get('delay', 0) * (1000 if values.get('unit') == 'S' else 1)))
+                continue
+            checks = []
+            for child in transition.children:
+                if child.type == 'sensor':
+                    checks.append((child.value, None))
+                elif child.type == 'signal' and checks:
+                    checks[-1] = (checks[-1][0], child.value)
+                elif child.type == 'conditions':
+                    for condition in child.children:
+                        values = dict((c.type, c.value) for c in condition.children)
+                        checks.append((values.get('sensor'), values.get('signal')))
+            conditions.append(('all' if transition.type == 'and_transition' else 'any', checks))
+            sensors += [sensor for sensor, _ in checks if sensor not in sensors]
+
+        # enumerate the sensor values (the conditions are small, but bound the enumeration anyway)
+        if len(sensors) > 12:
+            return
+        fireable = [False] * len(conditions)
+        # a time transition fires unless an earlier time transition has a shorter (or the same) delay
+        delays = []
+        for position, (kind, delay) in enumerate(conditions):
+            if kind == 'after':
+                fireable[position] = all(delay < earlier for earlier in delays)
+                delays.append(delay)
+        for index in range(1 << len(sensors)):
+            values = dict((sensor, 'HIGH' if index >> bit & 1 else 'LOW') for bit, sensor in enumerate(sensors))
+            for position, (kind, checks) in enumerate(conditions):
+                if kind == 'after':
+                    # the delay may not have elapsed yet
+                    continue
+                holds = [values[sensor] == signal for sensor, signal in checks]
+                if all(holds) if kind == 'all' else any(holds):
+                    fireable[position] = True
+                    break
+
+        for position, transition in enumerate(transitions):
+            if not fireable[position]:
+                target = next((c.value for c in transition.children if c.type == 'next_state'), None)
+                self.warnings.append(
+                    f"Transition {position + 1} of state '{state_name}' (to '{target}') can never fire: "
+                    f"its condition is unsatisfiable or always shadowed by higher-priority transitions"
+                )
+
     def validate_target_states(self):
         """Validate that all target states are defined"""
         for target in self.target_states:
@@ -258,15 +346,16 @@ class SemanticValidator:
                 )
 
 
-def validate_semantics(parse_tree):
+def validate_semantics(parse_tree, board=Board.UNO):
     """
     Convenience function to validate semantics
 
     Args:
         parse_tree: ParseNode from BNF parser
+        board: target board of the application
 
     Returns:
         Tuple of (is_valid: bool, errors: list, warnings: list)
     """
-    validator = SemanticValidator()
+    validator = SemanticValidator(board)
     return validator.validate(parse_tree)
@@ -16,6 +16,8 @@ from invalid_scenarios import (
     invalid_scenario10_missing_go_to_state,
     invalid_scenario11_empty_app_name,
     invalid_scenario12_duplicate_brick_names,
+    invalid_scenario13_interrupt_on_unsupported_pin,
+    invalid_scenario14_interrupt_on_actuator,
 )
 from validator import ScenarioValidator
 
@@ -42,6 +44,8 @@ def test_invalid_scenarios():
         (invalid_scenario10_missing_go_to_state, "Invalid 10: Missing go_to_state()"),
         (invalid_scenario11_empty_app_name, "Invalid 11: Empty app name"),
         (invalid_scenario12_duplicate_brick_names, "Invalid 12: Duplicate brick names"),
+        (invalid_scenario13_interrupt_on_unsupported_pin, "Invalid 13: Interrupt on unsupported pin"),
+        (invalid_scenario14_interrupt_on_actuator, "Invalid 14: Interrupt on actuator"),
     ]
 
     for func, name in invalid_funcs:
@@ -0,0 +1,37 @@
+"""
+Loading of the scenarios of a Python file for the command lines: the scenarios are the functions of the file whose
+names start with 'scenario', each returning an app.
+"""
+
+import contextlib
+import importlib.util
+import inspect
+import io
+
+from pyArduinoML.model.GeneratorOptions import parse_value
+
+
+def load_scenarios(path, overrides=()):
+    """
+    Apps of the scenarios of a Python file.
+
+    :param path: String, path of the Python file
+    :param overrides: List[String], generation options overriding the options of the scenarios, as NAME=VALUE (e.g.,
+                      backend=LOOP)
+    :return: List[App], by scenario name
+    """
+    spec = importlib.util.spec_from_file_location("scenarios", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    rtr = []
+    for name, function in inspect.getmembers(module, inspect.isfunction):
+        if not name.startswith("scenario"):
+            continue
+        # scenarios print their program
+        with contextlib.redirect_stdout(io.StringIO()):
+            app = function()
+        for override in overrides:
+            key, value = override.split("=", 1)
+            setattr(app.options, key, parse_value(value))
+        rtr.append(app)
+    return rtr
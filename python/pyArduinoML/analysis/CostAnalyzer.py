@@ -0,0 +1,349 @@
+"""
+Static estimation of the code size and of the cycle cost of the Arduino program generated for an app.
+No Arduino toolchain is needed: the estimation counts the operations of the generated code, weighted by the costs of
+a per-board CostTable.
+"""
+
+import argparse
+import sys
+
+from pyArduinoML.Scenarios import load_scenarios
+from pyArduinoML.analysis.CostTable import COSTS
+from pyArduinoML.model.Actuator import Actuator
+from pyArduinoML.model.GeneratorOptions import TABLE
+from pyArduinoML.model.TableBackend import TableBackend
+
+READ = "digitalRead"
+WRITE = "digitalWrite"
+MILLIS = "millis"
+
+
+def _add(operations, operation, count=1):
+    """
+    Adds occurrences of an operation to a count of operations.
+
+    :param operations: Map[String, Integer], count of each operation
+    :param operation: String, the operation
+    :param count: Integer, number of occurrences
+    :return:
+    """
+    if count:
+        operations[operation] = operations.get(operation, 0) + count
+
+
+class StateCost:
+    """
+    Estimated cost of a poll of a state.
+
+    """
+
+    def __init__(self, name, operations, steady_operations, depth, flash, cycles, steady_cycles):
+        """
+        Constructor.
+
+        :param name: String, name of the state
+        :param operations: Map[String, Integer], operations of the worst-case poll (entering the state and firing
+                           its transition)
+        :param steady_operations: Map[String, Integer], operations of a steady-state poll (no entry, no transition)
+        :param depth: Integer, nesting depth of the deepest transition condition
+        :param flash: Integer, flash bytes of the code (or tables) of the state
+        :param cycles: Integer, cycles of the worst-case poll
+        :param steady_cycles: Integer, cycles of a steady-state poll
+        :return:
+        """
+        self.name = name
+        self.operations = operations
+        self.steady_operations = steady_operations
+        self.depth = depth
+        self.flash = flash
+        self.cycles = cycles
+        self.steady_cycles = steady_cycles
+
+    def calls(self, operation):
+        """
+        Number of occurrences of an operation in the worst-case poll.
+
+        :param operation: String, the operation (e.g., "digitalRead")
+        :return: Integer
+        """
+        return self.operations.get(operation, 0)
+
+    def to_dict(self):
+        """
+        Dictionary representation.
+
+        :return: Dict
+        """
+        return {'name': self.name, 'digitalRead': self.calls(READ), 'digitalWrite': self.calls(WRITE),
+                'millis': self.calls(MILLIS), 'depth': self.depth, 'flash': self.flash, 'cycles': self.cycles,
+                'steady_cycles': self.steady_cycles, 'operations': dict(self.operations)}
+
+
+class AppCost:
+    """
+    Estimated cost of the program generated for an app.
+
+    """
+
+    def __init__(self, name, states, flash):
+        """
+        Constructor.
+
+        :param name: String, name of the app
+        :param states: List[StateCost], costs of the states
+        :param flash: Integer, flash bytes of the whole program (Arduino core functions used included)
+        :return:
+        """
+        self.name = name
+        self.states = states
+        self.flash = flash
+        self.cycles = max([state.cycles for state in states] or [0])  # worst-case cycles per loop iteration
+        self.steady_cycles = max([state.steady_cycles for state in states] or [0])
+        self.depth = max([state.depth for state in states] or [0])
+
+    def calls(self, operation):
+        """
+        Number of occurrences of an operation in the worst-case polls of all the states.
+
+        :param operation: String, the operation (e.g., "digitalRead")
+        :return: Integer
+        """
+        return sum(state.calls(operation) for state in self.states)
+
+    def violations(self, max_flash=None, max_cycles=None):
+        """
+        Budget violations of the program.
+
+        :param max_flash: Integer (optional), flash budget in bytes
+        :param max_cycles: Integer (optional), budget of worst-case cycles per loop iteration
+        :return: List[String], the violations (empty if the program is within budget)
+        """
+        rtr = []
+        if max_flash is not None and self.flash > max_flash:
+            rtr.append("%s: %d bytes of flash exceed the budget of %d bytes" % (self.name, self.flash, max_flash))
+        if max_cycles is not None and self.cycles > max_cycles:
+            rtr.append("%s: %d cycles per loop iteration exceed the budget of %d cycles"
+                       % (self.name, self.cycles, max_cycles))
+        return rtr
+
+    def to_dict(self):
+        """
+        Dictionary representation.
+
+        :return: Dict
+        """
+        return {'name': self.name, 'digitalRead': self.calls(READ), 'digitalWrite': self.calls(WRITE),
+                'millis': self.calls(MILLIS), 'depth': self.depth, 'flash': self.flash, 'cycles': self.cycles,
+                'steady_cycles': self.steady_cycles, 'states': [state.to_dict() for state in self.states]}
+
+
+class CostAnalyzer:
+    """
+    Static analyzer estimating the cost of the program generated for an app, with the generation options of the app.
+
+    """
+
+    def __init__(self, app, costs=None):
+        """
+        Constructor.
+
+        :param app: App, the app to analyze
+        :param costs: CostTable (optional), costs of the operations (default: the table of the board of the options)
+        :return:
+        """
+        self.app = app
+        self.options = app.options
+        self.costs = costs if costs is not None else COSTS[self.options.board]
+        self.interrupts = bool(app.interrupt_sensors())
+        self.actuators = len([brick for brick in app.bricks if isinstance(brick, Actuator)])
+
+    def cycles(self, operations):
+        """
+        Cycles of operations.
+
+        :param operations: Map[String, Integer], count of each operation
+        :return: Integer
+        """
+        return sum(count * self.costs.cycles[operation] for operation, count in operations.items())
+
+    def flash(self, operations):
+        """
+        Flash bytes of the code of operations.
+
+        :param operations: Map[String, Integer], count of each operation
+        :return: Integer
+        """
+        return sum(count * self.costs.flash[operation] for operation, count in operations.items())
+
+    def state_operations(self, state):
+        """
+        Operations of the polls of a state.
+
+        :param state: State, the state
+        :return: (Map[String, Integer], Map[String, Integer]), operations of the worst-case poll and of a
+                 steady-state poll
+        """
+        options = self.options
+        transitions = state.transitions
+        sensors = state.sensors()
+        tree = state.decision_tree(options) if options.backend != TABLE else None
+        single = len(transitions) == 1
+        table = options.backend == TABLE or (single and transitions[0].uses_table(options))
+        timed = state.time_transitions()
+        checks = sum(transition.condition.checks() for transition in transitions if transition not in timed)
+        worst = {}
+        steady = {}
+        for operations in (worst, steady):
+            if options.backend == TABLE:
+                _add(operations, "interpreter")
+                _add(operations, "compare", self.actuators)  # action mask loop over ACTUATOR_COUNT
+            else:
+                _add(operations, "call")
+                _add(operations, "state")
+            if options.entry_actions:
+                _add(operations, "compare")  # entry flag
+            if self.interrupts:
+                _add(operations, "edges")
+            # sensor reads: once per sensor when sampled, packed into table indices or tested by a decision tree,
+            # else at each check
+            if options.backend == TABLE:
+                reads = sum(len(transition.sensors()) for transition in transitions)
+            elif options.sample_sensors or table:
+                reads = len(sensors)
+            elif tree is not None:
+                reads = tree.reads()
+            else:
+                reads = checks
+            _add(operations, "port_read" if options.port_io() else READ, reads)
+            if options.backend == TABLE:
+                _add(operations, "table_index", reads)
+                _add(operations, "table_lookup", len(transitions))
+            elif table:
+                _add(operations, "table_index", len(sensors))
+                _add(operations, "table_lookup")
+            else:
+                _add(operations, "compare", tree.reads() if tree is not None else checks)
+            if options.sensor_debounce():
+                _add(operations, MILLIS)
+                _add(operations, "compare", sum(len(transition.sensors()) for transition in transitions))
+            elif len(timed) < len(transitions):
+                _add(operations, MILLIS)
+                _add(operations, "compare")
+            if timed:
+                # time elapsed since the state-entry timestamp, compared to each delay
+                _add(operations, MILLIS, 0 if options.sensor_debounce() else 1)
+                _add(operations, "compare", len(timed))
+        # actions: at each poll, or only when entering the state
+        for operations in (worst,) if options.entry_actions else (worst, steady):
+            if options.port_io() and options.batch_writes:
+                _add(operations, "port_masked_write", len(state.batched_actions_code(options)))
+            else:
+                _add(operations, "port_write" if options.port_io() else WRITE, len(state.actions))
+        # firing the transition: timestamps taken with millis() by the most expensive fire code of the state
+        if options.backend == TABLE:
+            _add(worst, MILLIS, 0 if options.sensor_debounce() else 1)
+        elif transitions:
+            _add(worst, MILLIS, max(state.fire_code(transition, options).count("millis()")
+                                    for transition in transitions))
+        return worst, steady
+
+    def state_flash(self, state, operations):
+        """
+        Flash bytes of the code (or of the tables) of a state.
+
+        :param state: State, the state
+        :param operations: Map[String, Integer], operations of the worst-case poll of the state
+        :return: Integer
+        """
+        transitions = state.transitions
+        if self.options.backend == TABLE:
+            # state entry, transition entries, condition sensors and truth tables
+            return 4 + sum(6 + len(transition.sensors()) + len(transition.table()) for transition in transitions)
+        rtr = self.flash(operations)
+        if len(transitions) == 1 and transitions[0].uses_table(self.options):
+            rtr += len(transitions[0].table())
+        return rtr
+
+    def analyze(self):
+        """
+        Estimates the cost of the program generated for the app.
+
+        :return: AppCost
+        """
+        options = self.options
+        states = []
+        used = set()
+        for state in self.app.states:
+            worst, steady = self.state_operations(state)
+            used.update(worst.keys())
+            depth = max([transition.condition.depth() for transition in state.transitions
+                         if transition.condition is not None] or [0])
+            states.append(StateCost(state.name, worst, steady, depth,
+                                    self.state_flash(state, worst), self.cycles(worst), self.cycles(steady)))
+        # program skeleton, setup of the bricks, interrupt handlers, library code of the core functions used
+        flash = self.costs.flash["program"]
+        if options.port_io():
+            flash += len(self.app.bricks) * self.costs.flash["port_write"]
+        else:
+            flash += len(self.app.bricks) * self.costs.flash["pinMode"]
+            used.add("pinMode")
+        flash += len(self.app.interrupt_sensors()) * self.costs.flash["edges"]
+        if options.backend == TABLE:
+            flash += TableBackend(self.app).footprint()[0]
+            used.update([READ, WRITE, "pinMode"])
+        else:
+            flash += sum(state.flash for state in states)
+        flash += sum(self.costs.library.get(operation, 0) for operation in used)
+        return AppCost(self.app.name, states, flash)
+
+
+def print_report(costs):
+    """
+    Prints a cost report.
+
+    :param costs: List[AppCost], the costs of the apps
+    :return:
+    """
+    print("=" * 80)
+    print("ArduinoML Static Cost Report")
+    print("=" * 80)
+    for cost in costs:
+        print()
+        print("%s: %d bytes of flash, %d cycles per loop iteration (worst case), %d cycles (steady state)"
+              % (cost.name, cost.flash, cost.cycles, cost.steady_cycles))
+        print("  %-24s %6s %6s %6s %6s %7s %7s %7s" % ("state", "reads", "writes", "millis", "depth", "flash",
+                                                      "cycles", "steady"))
+        for state in cost.states:
+            print("  %-24s %6d %6d %6d %6d %7d %7d %7d" % (state.name, state.calls(READ), state.calls(WRITE),
+                                                           state.calls(MILLIS), state.depth, state.flash,
+                                                           state.cycles, state.steady_cycles))
+    print()
+    print("=" * 80)
+
+
+def main(argv=None):
+    """
+    Command line: estimates the cost of all the scenarios (functions starting with 'scenario') of a Python file.
+
+    :param argv: List[String] (optional), the arguments (default: sys.argv)
+    :return: Integer, exit status (1 if a scenario exceeds the budget)
+    """
+    parser = argparse.ArgumentParser(description="Static cost report of ArduinoML scenarios")
+    parser.add_argument("file", help="Python file containing scenario functions returning apps")
+    parser.add_argument("--option", action="append", default=[], metavar="NAME=VALUE",
+                        help="generation option overriding the options of the scenarios (e.g., backend=LOOP)")
+    parser.add_argument("--max-flash", type=int, help="flash budget in bytes")
+    parser.add_argument("--max-cycles", type=int, help="budget of worst-case cycles per loop iteration")
+    args = parser.parse_args(argv)
+
+    costs = [CostAnalyzer(app).analyze() for app in load_scenarios(args.file, args.option)]
+
+    print_report(costs)
+    violations = [violation for cost in costs for violation in cost.violations(args.max_flash, args.max_cycles)]
+    for violation in violations:
+        print("✗ %s" % violation)
+    return 1 if violations else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+from pyArduinoML.model.Board import UNO, NANO
+
+
+class CostTable:
+    """
+    Costs of the operations of a generated program on a board, used by the static cost estimation.
+    Operations are identified by name:
+    - digitalRead, digitalWrite, pinMode, millis: Arduino core calls
+    - port_read, port_write, port_masked_write: port register operations (PORT_IO)
+    - compare: comparing a value and branching
+    - call: calling a state function and returning
+    - state: prologue and epilogue of a state function
+    - table_index: shifting a sensor value into a truth table index
+    - table_lookup: reading a truth table byte in flash and testing a bit
+    - edges: snapshot of the edges latched by interrupt handlers
+    - interpreter: fixed per-iteration work of the interpreter of the table backend
+    - program: startup code and empty setup()/loop()
+
+    """
+
+    def __init__(self, cycles, flash, library):
+        """
+        Constructor.
+
+        :param cycles: Map[String, Integer], cycles of each operation
+        :param flash: Map[String, Integer], flash bytes of each operation at each place it is used
+        :param library: Map[String, Integer], flash bytes of the library code of an operation, counted once if used
+        :return:
+        """
+        self.cycles = cycles
+        self.flash = flash
+        self.library = library
+
+    def copy(self, cycles=None, flash=None, library=None):
+        """
+        Copy of the table, with some costs overridden.
+
+        :param cycles: Map[String, Integer] (optional), cycles to override
+        :param flash: Map[String, Integer] (optional), flash bytes at each place to override
+        :param library: Map[String, Integer] (optional), flash bytes of library code to override
+        :return: CostTable
+        """
+        return CostTable(dict(self.cycles, **(cycles or {})),
+                         dict(self.flash, **(flash or {})),
+                         dict(self.library, **(library or {})))
+
+
+# ATmega328P at 16 MHz, avr-gcc -Os (rough figures, Arduino AVR core 1.8)
+ATMEGA328P_COSTS = CostTable(
+    cycles={
+        "digitalRead": 58, "digitalWrite": 72, "pinMode": 70, "millis": 28,
+        "port_read": 3, "port_write": 2, "port_masked_write": 6,
+        "compare": 3, "call": 8, "state": 4,
+        "table_index": 2, "table_lookup": 10, "edges": 8, "interpreter": 60,
+        "program": 0,
+    },
+    flash={
+        "digitalRead": 6, "digitalWrite": 8, "pinMode": 8, "millis": 4,
+        "port_read": 4, "port_write": 2, "port_masked_write": 8,
+        "compare": 4, "call": 4, "state": 12,
+        "table_index": 4, "table_lookup": 12, "edges": 12, "interpreter": 0,
+        "program": 444,
+    },
+    library={
+        "digitalRead": 110, "digitalWrite": 160, "pinMode": 120, "millis": 30,
+    },
+)
+
+COSTS = {
+    UNO: ATMEGA328P_COSTS,
+    NANO: ATMEGA328P_COSTS,
+}
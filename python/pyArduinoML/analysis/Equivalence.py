@@ -0,0 +1,293 @@
+"""
+Behavioral equivalence of two apps, e.g., before and after a refactoring or a generation option.
+Two apps are equivalent if, for any sequence of inputs, they drive their actuators to the same values.
+The inputs are sensor valuations, and waits of a given delay (for the time transitions). Timing is otherwise
+abstracted away, as in the model checker: the debounce guards are taken open, so that the first transition that holds
+fires.
+The product of the two apps is explored on the fly, the pairs of equivalent configurations being merged with a
+union-find structure (Hopcroft-Karp algorithm), and the exploration stops at the first counterexample.
+"""
+
+import collections
+
+from pyArduinoML.model import SIGNAL
+from pyArduinoML.model.Actuator import Actuator
+from pyArduinoML.model.Condition import AndCondition, BinaryExpression, NotCondition, OrCondition, \
+    PrimaryExpression, _merge_sensors
+from pyArduinoML.model.DecisionTree import DecisionTree, TREE_MAX_SENSORS
+from pyArduinoML.model.Sensor import Sensor
+
+
+def _partial(condition, values):
+    """
+    Evaluates a condition against the values of some of its sensors.
+
+    :param condition: LogicalExpression, the condition
+    :param values: Map[String, SIGNAL], value of the known sensors, by sensor name
+    :return: Boolean, or None if the value of the condition depends on unknown sensors
+    """
+    if isinstance(condition, NotCondition) or isinstance(condition, PrimaryExpression) and condition.inner:
+        rtr = _partial(condition.condition if isinstance(condition, NotCondition) else condition.inner, values)
+        return None if rtr is None else not rtr
+    if isinstance(condition, PrimaryExpression):
+        value = values.get(condition.brick.name)
+        return None if value is None else value == condition.value
+    if isinstance(condition, (AndCondition, OrCondition, BinaryExpression)):
+        if isinstance(condition, BinaryExpression):
+            conjunction = condition.operator.lower() != "or"
+            operands = (condition.left, condition.right)
+        else:
+            conjunction = isinstance(condition, AndCondition)
+            operands = condition.conditions
+        rtr = conjunction
+        for operand in operands:
+            holds = _partial(operand, values)
+            if holds is None:
+                rtr = None
+            elif holds != conjunction:
+                # a false operand of an and, or a true operand of an or, decides the condition
+                return holds
+        return rtr
+    # other expressions are decided once all their sensors are known
+    if all(sensor.name in values for sensor in condition.sensors()):
+        return condition.holds(values)
+    return None
+
+
+class EquivalenceResult:
+    """
+    Outcome of an equivalence check.
+
+    """
+
+    def __init__(self, equivalent, trace=None, outputs=None, explored=0):
+        """
+        Constructor.
+
+        :param equivalent: Boolean, True if the apps are equivalent
+        :param trace: List[Map[String, SIGNAL] or Integer] (optional), counterexample: the inputs, sensor valuations
+                      (unlisted sensors being free) or waits in milliseconds, driving the apps to different outputs
+        :param outputs: (Map[String, SIGNAL], Map[String, SIGNAL]) (optional), the different outputs of both apps
+        :param explored: Integer, number of explored pairs of configurations
+        :return:
+        """
+        self.equivalent = equivalent
+        self.trace = trace
+        self.outputs = outputs
+        self.explored = explored
+
+    def __bool__(self):
+        return self.equivalent
+
+
+class _Machine:
+    """
+    Deterministic view of an app over shared sensor and actuator indices.
+
+    """
+
+    def __init__(self, app, sensor_ids, actuator_ids):
+        """
+        Constructor.
+
+        :param app: App, the app
+        :param sensor_ids: Map[String, Integer], index of each sensor of both apps, by name
+        :param actuator_ids: Map[String, Integer], index of each actuator of both apps, by name
+        :return:
+        """
+        self.app = app
+        self.sensor_ids = sensor_ids
+        state_ids = dict([(state.name, index) for index, state in enumerate(app.states)])
+        self.writes = []  # List[List[(Integer, SIGNAL)]], actuator writes of each state
+        self.cubes = []  # List[List[(Integer, Integer, Integer)]], partition of the valuations of each state
+        self.waits = []  # List[List[(Integer, Integer)]], time transitions of each state (delay, next state)
+        # paths built as in the model checker (the first transition of a path fires, the guards being taken open)
+        first_only = not app.options.sensor_debounce()
+        for state in app.states:
+            self.writes.append([(actuator_ids[action.brick.name], action.value) for action in state.actions])
+            transitions = [transition for transition in state.transitions if transition.condition is not None]
+            cubes = []
+            if transitions:
+                if len(_merge_sensors(transitions)) > TREE_MAX_SENSORS:
+                    # compiled into a chain of conditions, as in the generated code
+                    paths = self.chain(transitions, {}, first_only)
+                else:
+                    paths = self.paths(DecisionTree(transitions, first_only).root)
+                for mask, values, leaf in paths:
+                    cubes.append((mask, values, state_ids[transitions[leaf[0]].nextstate.name] if leaf else None))
+            else:
+                cubes.append((0, 0, None))
+            self.cubes.append(cubes)
+            self.waits.append([(transition.delay, state_ids[transition.nextstate.name])
+                               for transition in state.time_transitions()])
+
+    def paths(self, node, mask=0, values=0):
+        """
+        Paths of a decision tree, as cubes over the sensors.
+
+        :param node: node of a DecisionTree
+        :param mask: Integer, sensors fixed on the path to the node
+        :param values: Integer, values of the fixed sensors
+        :return: Iterator[(Integer, Integer, Tuple[Integer])]
+        """
+        if DecisionTree.is_leaf(node):
+            yield mask, values, node
+            return
+        bit = 1 << self.sensor_ids[node[0].name]
+        for path in self.paths(node[1], mask | bit, values):
+            yield path
+        for path in self.paths(node[2], mask | bit, values | bit):
+            yield path
+
+    def chain(self, transitions, values, first_only=True):
+        """
+        Paths of a chain of conditions, as cubes over the sensors: the first condition that is not decided by the
+        values of the sensors fixed so far is split on one of its unknown sensors.
+
+        :param transitions: List[Transition], the transitions, by decreasing priority
+        :param values: Map[String, SIGNAL], the sensors fixed on the path, by sensor name (restored on return)
+        :param first_only: Boolean, stop at the first transition that holds (otherwise decide all of them, as the
+                           leaves of a DecisionTree)
+        :return: Iterator[(Integer, Integer, Tuple[Integer])], as paths
+        """
+        holding = []
+        for index, transition in enumerate(transitions):
+            holds = _partial(transition.condition, values)
+            if holds is None:
+                sensor = [sensor for sensor in transition.sensors() if sensor.name not in values][0]
+                for value in (SIGNAL.LOW, SIGNAL.HIGH):
+                    values[sensor.name] = value
+                    for path in self.chain(transitions, values, first_only):
+                        yield path
+                del values[sensor.name]
+                return
+            if holds:
+                holding.append(index)
+                if first_only:
+                    break
+        mask = 0
+        bits = 0
+        for name, value in values.items():
+            mask |= 1 << self.sensor_ids[name]
+            bits |= (1 << self.sensor_ids[name]) if value == SIGNAL.HIGH else 0
+        yield mask, bits, tuple(holding)
+
+    def enter(self, state, outputs):
+        """
+        Configuration reached by entering a state.
+
+        :param state: Integer, the state
+        :param outputs: Tuple[SIGNAL], value of each actuator
+        :return: (Integer, Tuple[SIGNAL])
+        """
+        writes = self.writes[state]
+        if writes:
+            outputs = list(outputs)
+            for actuator, value in writes:
+                outputs[actuator] = value
+            outputs = tuple(outputs)
+        return state, outputs
+
+    def wait(self, state, delay):
+        """
+        State entered after waiting without any sensor transition firing.
+
+        :param state: Integer, the current state
+        :param delay: Integer, the wait in milliseconds
+        :return: Integer, the next state (None if no time transition fires)
+        """
+        rtr = None
+        shortest = None
+        for transition_delay, nextstate in self.waits[state]:
+            if transition_delay <= delay and (shortest is None or transition_delay < shortest):
+                shortest = transition_delay
+                rtr = nextstate
+        return rtr
+
+
+def equivalent(app_a, app_b):
+    """
+    Checks if two apps drive their actuators to the same values for any inputs.
+    Actuators missing from an app are taken as always LOW.
+
+    :param app_a: App, the first app
+    :param app_b: App, the second app
+    :return: EquivalenceResult, with a counterexample if the apps are not equivalent
+    """
+    sensors = []
+    actuators = []
+    for app in (app_a, app_b):
+        for brick in app.bricks:
+            if isinstance(brick, Sensor) and brick.name not in sensors:
+                sensors.append(brick.name)
+            elif isinstance(brick, Actuator) and brick.name not in actuators:
+                actuators.append(brick.name)
+    sensor_ids = dict([(name, index) for index, name in enumerate(sensors)])
+    actuator_ids = dict([(name, index) for index, name in enumerate(actuators)])
+    machine_a = _Machine(app_a, sensor_ids, actuator_ids)
+    machine_b = _Machine(app_b, sensor_ids, actuator_ids)
+    delays = sorted(set([delay for machine in (machine_a, machine_b) for waits in machine.waits
+                         for delay, _ in waits]))
+    if not app_a.states or not app_b.states:
+        return EquivalenceResult(not app_a.states and not app_b.states)
+
+    # union-find over the configurations of both apps, numbered when first met
+    ids = {}
+    parents = []
+
+    def find(configuration):
+        key = configuration
+        if key not in ids:
+            ids[key] = len(parents)
+            parents.append(ids[key])
+        node = ids[key]
+        root = node
+        while parents[root] != root:
+            root = parents[root]
+        while parents[node] != root:
+            parents[node], node = root, parents[node]
+        return root
+
+    low = tuple([SIGNAL.LOW] * len(actuators))
+    initial = (("a",) + machine_a.enter(0, low), ("b",) + machine_b.enter(0, low))
+    # the input leading to each pair, and the pair it comes from, to rebuild the counterexample
+    origins = {initial: None}
+    frontier = collections.deque([initial])
+    explored = 0
+    while frontier:
+        pair = frontier.popleft()
+        first, second = pair
+        root_a, root_b = find(first), find(second)
+        if root_a == root_b:
+            continue
+        parents[root_a] = root_b
+        explored += 1
+        if first[2] != second[2]:
+            trace = []
+            current = pair
+            while origins[current] is not None:
+                current, step = origins[current]
+                trace.append(step)
+            return EquivalenceResult(False, trace[::-1], (dict(zip(actuators, first[2])),
+                                                          dict(zip(actuators, second[2]))), explored)
+        _, state_a, outputs_a = first
+        _, state_b, outputs_b = second
+        successors = []
+        for mask_a, values_a, next_a in machine_a.cubes[state_a]:
+            for mask_b, values_b, next_b in machine_b.cubes[state_b]:
+                if (mask_a & mask_b) & (values_a ^ values_b):
+                    continue
+                mask = mask_a | mask_b
+                values = values_a | values_b
+                step = dict([(name, SIGNAL.HIGH if values >> index & 1 else SIGNAL.LOW)
+                             for index, name in enumerate(sensors) if mask >> index & 1])
+                successors.append((step, next_a, next_b))
+        for delay in delays:
+            successors.append((delay, machine_a.wait(state_a, delay), machine_b.wait(state_b, delay)))
+        for step, next_a, next_b in successors:
+            following = (("a",) + (first[1:] if next_a is None else machine_a.enter(next_a, outputs_a)),
+                         ("b",) + (second[1:] if next_b is None else machine_b.enter(next_b, outputs_b)))
+            if following not in origins:
+                origins[following] = (pair, step)
+                frontier.append(following)
+    return EquivalenceResult(True, explored=explored)
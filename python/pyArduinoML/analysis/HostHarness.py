@@ -0,0 +1,354 @@
+"""
+Host-native benchmark of generated sketches: the .ino output of App.save is compiled with the local C++ compiler
+against a minimal shim of the Arduino core (digitalRead, digitalWrite, millis, pinMode, port registers), and run by a
+bounded driver over a synthetic input trace, to compare code generation variants on a machine without boards.
+An iteration is a poll of the current state: a call of a state function (which the recursive backend chains without
+returning to loop()), or a call of loop() for the table backend. The virtual millis() clock advances by a fixed step
+at each iteration, and the trace events are applied when the clock reaches their time.
+The stack depth is the distance between the stack pointer of the driver and the deepest stack address seen in the
+shim functions: host frames are larger than AVR frames, so that the depths compare variants rather than predict the
+RAM usage on the board.
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from pyArduinoML.Scenarios import load_scenarios
+from pyArduinoML.model.Board import ATMEGA328P_PORTS
+from pyArduinoML.model.Sensor import Sensor
+from pyArduinoML.simulation.Simulator import random_trace
+
+DEFAULT_COMPILER = "g++"
+DEFAULT_FLAGS = ("-Os",)  # as the Arduino toolchain, which also turns the recursive state calls into jumps
+
+STATE_FUNCTION = re.compile(r"^(void state_\w+\(\)) \{", re.MULTILINE)
+LOOP_FUNCTION = re.compile(r"^void loop\(\) \{", re.MULTILINE)
+
+
+def _port_registers():
+    """
+    Shim of the input port registers: PINx packs the values of the pins of port x.
+
+    :return: String, C++ macro definitions
+    """
+    first = {}
+    for pin, (letter, bit) in sorted(ATMEGA328P_PORTS.items()):
+        first.setdefault(letter, pin - bit)
+    return "".join(["#define PIN%s harness_port(%d)\n" % (letter, pin) for letter, pin in sorted(first.items())])
+
+
+SHIM = r"""// Arduino core shim of the ArduinoML host harness
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <setjmp.h>
+#include <time.h>
+
+typedef bool boolean;
+typedef uint8_t byte;
+#define PROGMEM
+#define HIGH 1
+#define LOW 0
+#define INPUT 0
+#define OUTPUT 1
+#define CHANGE 1
+#define pgm_read_byte(p) (*(const uint8_t *)(p))
+#define pgm_read_word(p) (*(const uint16_t *)(p))
+#define pgm_read_dword(p) (*(const uint32_t *)(p))
+#define memcpy_P memcpy
+#define bitRead(value, bit) (((value) >> (bit)) & 1)
+#define _BV(bit) (1 << (bit))
+#define digitalPinToInterrupt(pin) (pin)
+
+static uint8_t harness_pins[256];
+static unsigned long harness_clock = 0;
+static unsigned long harness_step = 1;
+static unsigned long harness_count = 0;
+static unsigned long harness_iterations = 0;
+static unsigned long harness_writes = 0;
+static uintptr_t harness_stack_base = 0;
+static uintptr_t harness_stack_low = UINTPTR_MAX;
+static unsigned long *harness_times;
+static uint8_t *harness_event_pins;
+static uint8_t *harness_event_values;
+static size_t harness_events = 0;
+static size_t harness_next = 0;
+static jmp_buf harness_done;
+
+static inline void harness_stack() {
+	volatile char marker;
+	uintptr_t address = (uintptr_t) &marker;
+	if (address < harness_stack_low) harness_stack_low = address;
+}
+
+static inline uint8_t harness_port(int first) {
+	uint8_t rtr = 0;
+	for (int bit = 0; bit < 8; bit++) rtr |= (harness_pins[(first + bit) & 0xFF] & 1) << bit;
+	return rtr;
+}
+%s
+// the output port registers count their writes, as digitalWrite does (one per masked write of a port)
+struct harness_register {
+	uint8_t value;
+	operator uint8_t() const { return value; }
+	harness_register &operator=(uint8_t other) { harness_stack(); value = other; harness_writes++; return *this; }
+	harness_register &operator|=(uint8_t other) { return *this = value | other; }
+	harness_register &operator&=(uint8_t other) { return *this = value & other; }
+};
+uint8_t DDRB, DDRC, DDRD;
+harness_register PORTB, PORTC, PORTD;
+
+int digitalRead(int pin) { harness_stack(); return harness_pins[pin & 0xFF]; }
+void digitalWrite(int pin, int value) { harness_stack(); harness_pins[pin & 0xFF] = value; harness_writes++; }
+void pinMode(int pin, int mode) {}
+unsigned long millis() { harness_stack(); return harness_clock; }
+void noInterrupts() {}
+void interrupts() {}
+void attachInterrupt(int interrupt, void (*handler)(), int mode) {}
+
+static void harness_poll() {
+	harness_stack();
+	if (harness_count == harness_iterations) longjmp(harness_done, 1);
+	harness_count++;
+	harness_clock = harness_count * harness_step;
+	while (harness_next < harness_events && harness_times[harness_next] <= harness_clock) {
+		harness_pins[harness_event_pins[harness_next]] = harness_event_values[harness_next];
+		harness_next++;
+	}
+}
+
+// the sketch names a global 'time', as the C library function
+#define time harness_sketch_time
+%s
+#include "sketch.ino"
+#undef time
+
+static void harness_load(const char *path) {
+	FILE *stream = fopen(path, "r");
+	if (!stream) { perror(path); exit(2); }
+	size_t capacity = 1024;
+	harness_times = (unsigned long *) malloc(capacity * sizeof(unsigned long));
+	harness_event_pins = (uint8_t *) malloc(capacity);
+	harness_event_values = (uint8_t *) malloc(capacity);
+	unsigned long now; unsigned int pin, value;
+	while (fscanf(stream, "%%lu %%u %%u", &now, &pin, &value) == 3) {
+		if (harness_events == capacity) {
+			capacity *= 2;
+			harness_times = (unsigned long *) realloc(harness_times, capacity * sizeof(unsigned long));
+			harness_event_pins = (uint8_t *) realloc(harness_event_pins, capacity);
+			harness_event_values = (uint8_t *) realloc(harness_event_values, capacity);
+		}
+		harness_times[harness_events] = now;
+		harness_event_pins[harness_events] = (uint8_t) pin;
+		harness_event_values[harness_events] = (uint8_t) value;
+		harness_events++;
+	}
+	fclose(stream);
+}
+
+static void __attribute__((noinline)) harness_run() {
+	volatile char marker;
+	harness_stack_base = (uintptr_t) &marker;
+	if (setjmp(harness_done) == 0) {
+		for (;;) loop();
+	}
+}
+
+int main(int argc, char **argv) {
+	if (argc != 4) { fprintf(stderr, "usage: %%s ITERATIONS STEP_MS TRACE\n", argv[0]); return 2; }
+	harness_iterations = strtoul(argv[1], NULL, 10);
+	harness_step = strtoul(argv[2], NULL, 10);
+	harness_load(argv[3]);
+	setup();
+	harness_writes = 0;
+	struct timespec start, end;
+	clock_gettime(CLOCK_MONOTONIC, &start);
+	harness_run();
+	clock_gettime(CLOCK_MONOTONIC, &end);
+	double elapsed = (end.tv_sec - start.tv_sec) * 1e9 + (end.tv_nsec - start.tv_nsec);
+	printf("%%lu %%.0f %%lu %%lu\n", harness_count, elapsed,
+	       (unsigned long) (harness_stack_base > harness_stack_low ? harness_stack_base - harness_stack_low : 0),
+	       harness_writes);
+	return 0;
+}
+"""
+
+
+class HarnessResult:
+    """
+    Measures of a sketch run by the host harness.
+
+    """
+
+    def __init__(self, iterations, nanoseconds, stack, writes):
+        """
+        Constructor.
+
+        :param iterations: Integer, number of polls run
+        :param nanoseconds: Float, total run time in nanoseconds (setup excluded)
+        :param stack: Integer, maximum stack depth in bytes (host frames)
+        :param writes: Integer, number of output writes (setup excluded): digitalWrite calls and PORTx writes
+        :return:
+        """
+        self.iterations = iterations
+        self.nanoseconds = nanoseconds
+        self.stack = stack
+        self.writes = writes
+
+    def ns_per_iteration(self):
+        """
+        Mean run time of a poll.
+
+        :return: Float, in nanoseconds
+        """
+        return self.nanoseconds / self.iterations if self.iterations else 0.0
+
+    def to_dict(self):
+        """
+        Dictionary representation of the measures.
+
+        :return: Map[String, Object]
+        """
+        return {"iterations": self.iterations, "ns_per_iteration": self.ns_per_iteration(), "stack": self.stack,
+                "writes": self.writes}
+
+
+def instrument(sketch):
+    """
+    Instruments a sketch: each poll (state function, or loop() without state functions) starts with a call to the
+    driver, and the state functions are declared first, as the Arduino IDE does.
+
+    :param sketch: String, the Arduino program
+    :return: (String, String), the prototypes and the instrumented program
+    """
+    prototypes = "".join(["%s;\n" % match.group(1) for match in STATE_FUNCTION.finditer(sketch)])
+    if prototypes:
+        return prototypes, STATE_FUNCTION.sub(r"\1 {\n\tharness_poll();", sketch)
+    return prototypes, LOOP_FUNCTION.sub("void loop() {\n\tharness_poll();", sketch)
+
+
+class HostHarness:
+    """
+    Compiled host harness of a sketch.
+
+    """
+
+    def __init__(self, sketch, pins=None, compiler=DEFAULT_COMPILER, flags=DEFAULT_FLAGS):
+        """
+        Constructor: compiles the sketch with the shim and the driver.
+
+        :param sketch: String, path of a .ino file (e.g., from App.save), or the Arduino program itself
+        :param pins: Map[String, Integer] (optional), pin of each sensor, to write traces with sensor names
+        :param compiler: String, the C++ compiler
+        :param flags: Iterable[String], the compiler flags
+        :return:
+        :raises: RuntimeError, if the compiler is missing or fails
+        """
+        if os.path.isfile(sketch):
+            with open(sketch) as stream:
+                sketch = stream.read()
+        self.pins = pins or {}
+        if shutil.which(compiler) is None:
+            raise RuntimeError("C++ compiler '%s' not found" % compiler)
+        self.directory = tempfile.mkdtemp(prefix="arduinoml_harness_")
+        prototypes, instrumented = instrument(sketch)
+        with open(os.path.join(self.directory, "sketch.ino"), "w") as stream:
+            stream.write(instrumented)
+        source = os.path.join(self.directory, "harness.cpp")
+        with open(source, "w") as stream:
+            stream.write(SHIM % (_port_registers(), prototypes))
+        self.binary = os.path.join(self.directory, "harness")
+        process = subprocess.run([compiler] + list(flags) + ["-o", self.binary, source],
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        if process.returncode != 0:
+            self.close()
+            raise RuntimeError("Compilation of the harness failed:\n%s" % process.stderr)
+
+    @staticmethod
+    def for_app(app, compiler=DEFAULT_COMPILER, flags=DEFAULT_FLAGS):
+        """
+        Harness of the program generated for an app.
+
+        :param app: App, the app
+        :param compiler: String, the C++ compiler
+        :param flags: Iterable[String], the compiler flags
+        :return: HostHarness
+        """
+        pins = dict([(brick.name, brick.pin) for brick in app.bricks if isinstance(brick, Sensor)])
+        return HostHarness(str(app), pins, compiler, flags)
+
+    def run(self, trace, iterations=None, step=1):
+        """
+        Runs the sketch over a trace.
+
+        :param trace: Iterable[(Integer, String or Integer, SIGNAL)], events setting the value of a sensor (by name
+                      or pin), by increasing time in milliseconds
+        :param iterations: Integer (optional), number of polls (default: until the time of the last event)
+        :param step: Integer, milliseconds of the virtual clock per poll
+        :return: HarnessResult
+        :raises: RuntimeError, if the run fails
+        """
+        path = os.path.join(self.directory, "trace.txt")
+        end = 0
+        with open(path, "w") as stream:
+            for now, sensor, value in trace:
+                stream.write("%d %d %d\n" % (now, self.pins.get(sensor, sensor), value))
+                end = now
+        if iterations is None:
+            iterations = max(end // step, 1)
+        process = subprocess.run([self.binary, str(iterations), str(step), path],
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        if process.returncode != 0:
+            raise RuntimeError("Run of the harness failed (status %d):\n%s" % (process.returncode, process.stderr))
+        count, nanoseconds, stack, writes = process.stdout.split()
+        return HarnessResult(int(count), float(nanoseconds), int(stack), int(writes))
+
+    def close(self):
+        """
+        Removes the build directory.
+
+        :return:
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def main(argv=None):
+    """
+    Command line: host benchmark of all the scenarios (functions starting with 'scenario') of a Python file.
+
+    :param argv: List[String] (optional), the arguments (default: sys.argv)
+    :return: Integer, exit status
+    """
+    parser = argparse.ArgumentParser(description="Host benchmark of the sketches of ArduinoML scenarios")
+    parser.add_argument("file", help="Python file containing scenario functions returning apps")
+    parser.add_argument("--option", action="append", default=[], metavar="NAME=VALUE",
+                        help="generation option overriding the options of the scenarios (e.g., backend=LOOP)")
+    parser.add_argument("--events", type=int, default=10000, help="number of events of the random traces")
+    parser.add_argument("--iterations", type=int, default=1000000, help="number of polls")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random traces")
+    parser.add_argument("--compiler", default=DEFAULT_COMPILER, help="C++ compiler")
+    args = parser.parse_args(argv)
+
+    print("=" * 80)
+    print("ArduinoML Host Benchmark (%d polls per scenario)" % args.iterations)
+    print("=" * 80)
+    for app in load_scenarios(args.file, args.option):
+        harness = HostHarness.for_app(app, args.compiler)
+        try:
+            trace = random_trace(app, args.events, args.seed, max_gap=max(2 * args.iterations // max(args.events, 1), 1))
+            result = harness.run(trace, args.iterations)
+        finally:
+            harness.close()
+        print("%-24s %10.1f ns/poll %8d stack bytes" % (app.name, result.ns_per_iteration(), result.stack))
+    print("=" * 80)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
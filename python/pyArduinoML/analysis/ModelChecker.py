@@ -0,0 +1,436 @@
+"""
+Explicit-state model checking of an app.
+The sensors are inputs that the environment can change at any time, so that the explored space is the one of the
+(state x actuator value) configurations, each transition being labelled with the sensor valuations enabling it.
+The valuations are enumerated symbolically per state: only the sensors read by the transitions of a state are split
+(as in the decision trees of the generated code), as cubes over the other sensors, so that apps with tens of sensors
+are checked without enumerating the valuations of all of them.
+Timing is abstracted away: the debounce guards eventually open, and the delays of the time transitions eventually
+expire, so that a time transition can always fire.
+"""
+
+import argparse
+import collections
+import sys
+
+from pyArduinoML.Scenarios import load_scenarios
+from pyArduinoML.analysis.Equivalence import _partial
+from pyArduinoML.model import SIGNAL
+from pyArduinoML.model.Actuator import Actuator
+from pyArduinoML.model.Condition import _merge_sensors
+from pyArduinoML.model.DecisionTree import DecisionTree, TREE_MAX_SENSORS
+from pyArduinoML.model.Sensor import Sensor
+from pyArduinoML.model.TimeTransition import TimeTransition
+
+
+def _bits(count):
+    """
+    Packed bit array.
+
+    :param count: Integer, number of bits
+    :return: bytearray, all bits cleared
+    """
+    return bytearray((count + 7) >> 3)
+
+
+def _test(bits, index):
+    """
+    Value of a bit of a packed bit array.
+
+    :param bits: bytearray, the bit array
+    :param index: Integer, index of the bit
+    :return: Boolean
+    """
+    return bits[index >> 3] >> (index & 7) & 1 == 1
+
+
+def _set(bits, index):
+    """
+    Sets a bit of a packed bit array.
+
+    :param bits: bytearray, the bit array
+    :param index: Integer, index of the bit
+    :return:
+    """
+    bits[index >> 3] |= 1 << (index & 7)
+
+
+class Edge:
+    """
+    Transition of the explored graph: the sensor valuations enabling it are a cube, i.e., the values of the sensors
+    of a mask, the other sensors being free.
+
+    """
+
+    def __init__(self, nextstate, mask, values, timed=False):
+        """
+        Constructor.
+
+        :param nextstate: Integer, index of the next state
+        :param mask: Integer, bit i is set if the i-th sensor has a fixed value
+        :param values: Integer, bit i is the value of the i-th sensor (if fixed)
+        :param timed: Boolean, True for a time transition
+        :return:
+        """
+        self.nextstate = nextstate
+        self.mask = mask
+        self.values = values
+        self.timed = timed
+
+    def compatible(self, other):
+        """
+        Checks if a sensor valuation enables both this edge and another one.
+
+        :param other: Edge, the other edge
+        :return: Boolean
+        """
+        return (self.mask & other.mask) & (self.values ^ other.values) == 0
+
+
+class ModelCheckResult:
+    """
+    Outcome of the model checking of an app.
+
+    """
+
+    def __init__(self, name, explored, unreachable, blocked, livelocks):
+        """
+        Constructor.
+
+        :param name: String, name of the app
+        :param explored: Integer, number of reachable states
+        :param unreachable: List[String], states that are never entered
+        :param blocked: Map[String, List[List[(String, Map[String, SIGNAL])]]], for each checked actuator, traces to
+                        configurations from which the actuator can never be turned off again
+        :param livelocks: List[(String, String, Map[String, SIGNAL])], pairs of reachable states switching to each
+                          other forever with a sensor valuation
+        :return:
+        """
+        self.name = name
+        self.explored = explored
+        self.unreachable = unreachable
+        self.blocked = blocked
+        self.livelocks = livelocks
+
+    def holds(self):
+        """
+        Checks if all the properties hold.
+
+        :return: Boolean
+        """
+        return not self.unreachable and not any(self.blocked.values()) and not self.livelocks
+
+    def violations(self):
+        """
+        Messages describing the violated properties.
+
+        :return: List[String]
+        """
+        rtr = ["%s: state '%s' is unreachable" % (self.name, state) for state in self.unreachable]
+        for actuator, traces in sorted(self.blocked.items()):
+            for trace in traces:
+                rtr.append("%s: %s can no longer be turned off after %s"
+                           % (self.name, actuator, " -> ".join([state for state, _ in trace])))
+        for first, second, valuation in self.livelocks:
+            rtr.append("%s: livelock between '%s' and '%s' when %s"
+                       % (self.name, first, second,
+                          ", ".join(["%s is %s" % (sensor, SIGNAL.value(value))
+                                     for sensor, value in sorted(valuation.items())]) or "always"))
+        return rtr
+
+
+class ModelChecker:
+    """
+    Exhaustive explorer of the configurations of an app, by breadth-first search.
+
+    """
+
+    def __init__(self, app):
+        """
+        Constructor: builds the edges of each state.
+
+        :param app: App, the app to check
+        :return:
+        """
+        self.app = app
+        self.sensors = [brick for brick in app.bricks if isinstance(brick, Sensor)]  # List[Sensor]
+        self.actuators = [brick for brick in app.bricks if isinstance(brick, Actuator)]  # List[Actuator]
+        self.sensor_ids = dict([(sensor.name, index) for index, sensor in enumerate(self.sensors)])
+        self.state_ids = dict([(state.name, index) for index, state in enumerate(app.states)])
+        self.edges = [self.state_edges(state) for state in app.states]  # List[List[Edge]], by state
+
+    def state_edges(self, state):
+        """
+        Edges of a state.
+        With the global debounce guard, only the first transition that holds can fire; with per-sensor guards, a
+        later transition can fire when the guard of an earlier one is closed.
+        The valuations are split by a decision tree, or per transition when the transitions read more than
+        TREE_MAX_SENSORS sensors (see chain_cubes).
+
+        :param state: State, the state
+        :return: List[Edge]
+        """
+        rtr = []
+        seen = set()
+        transitions = [transition for transition in state.transitions if not isinstance(transition, TimeTransition)]
+        first_only = not self.app.options.sensor_debounce()
+        if len(_merge_sensors(transitions)) > TREE_MAX_SENSORS:
+            cubes = [(mask, values, (index,)) for index in range(len(transitions))
+                     for mask, values in self.chain_cubes(transitions, index, first_only)]
+        elif transitions:
+            cubes = self.cubes(DecisionTree(transitions, first_only).root)
+        else:
+            cubes = []
+        for mask, values, leaf in cubes:
+            for index in leaf:
+                edge = (self.state_ids[transitions[index].nextstate.name], mask, values)
+                if edge not in seen:
+                    seen.add(edge)
+                    rtr.append(Edge(*edge))
+        for transition in state.time_transitions():
+            rtr.append(Edge(self.state_ids[transition.nextstate.name], 0, 0, True))
+        return rtr
+
+    def cubes(self, node, mask=0, values=0):
+        """
+        Paths of a decision tree, as cubes over the sensors.
+
+        :param node: node of a DecisionTree
+        :param mask: Integer, sensors fixed on the path to the node
+        :param values: Integer, values of the fixed sensors
+        :return: Iterator[(Integer, Integer, Tuple[Integer])], cubes and transitions selected by them
+        """
+        if DecisionTree.is_leaf(node):
+            yield mask, values, node
+            return
+        bit = 1 << self.sensor_ids[node[0].name]
+        for cube in self.cubes(node[1], mask | bit, values):
+            yield cube
+        for cube in self.cubes(node[2], mask | bit, values | bit):
+            yield cube
+
+    def chain_cubes(self, transitions, index, first_only, values=None):
+        """
+        Cubes of the sensor valuations firing a transition: its condition holds and, if only the first transition
+        that holds can fire, the conditions of the previous transitions do not.
+        As for the chains of conditions of the equivalence check, the first condition that is not decided by the
+        sensors fixed so far is split on one of its unknown sensors, so that only the sensors of the transition and
+        of the previous ones are enumerated.
+
+        :param transitions: List[Transition], the transitions, by decreasing priority
+        :param index: Integer, index of the transition
+        :param first_only: Boolean, True if the previous transitions must not hold
+        :param values: Map[String, SIGNAL] (optional), the sensors fixed so far, by sensor name (restored on return)
+        :return: Iterator[(Integer, Integer)], cubes (mask, values)
+        """
+        values = {} if values is None else values
+        expected = [(transition.condition, False) for transition in transitions[:index]] if first_only else []
+        expected.append((transitions[index].condition, True))
+        for condition, holds in expected:
+            decided = _partial(condition, values)
+            if decided is None:
+                sensor = [sensor for sensor in condition.sensors() if sensor.name not in values][0]
+                for value in (SIGNAL.LOW, SIGNAL.HIGH):
+                    values[sensor.name] = value
+                    for cube in self.chain_cubes(transitions, index, first_only, values):
+                        yield cube
+                del values[sensor.name]
+                return
+            if decided != holds:
+                return
+        mask = 0
+        bits = 0
+        for name, value in values.items():
+            mask |= 1 << self.sensor_ids[name]
+            bits |= (1 << self.sensor_ids[name]) if value == SIGNAL.HIGH else 0
+        yield mask, bits
+
+    def valuation(self, mask, values):
+        """
+        Sensor valuation of a cube.
+
+        :param mask: Integer, the fixed sensors
+        :param values: Integer, their values
+        :return: Map[String, SIGNAL], value of each fixed sensor
+        """
+        return dict([(sensor.name, SIGNAL.HIGH if values >> index & 1 else SIGNAL.LOW)
+                     for index, sensor in enumerate(self.sensors) if mask >> index & 1])
+
+    def reachable(self):
+        """
+        Reachable states.
+
+        :return: bytearray, packed bit array of the reachable states
+        """
+        rtr = _bits(len(self.app.states))
+        if not self.app.states:
+            return rtr
+        _set(rtr, 0)
+        frontier = collections.deque([0])
+        while frontier:
+            state = frontier.popleft()
+            for edge in self.edges[state]:
+                if not _test(rtr, edge.nextstate):
+                    _set(rtr, edge.nextstate)
+                    frontier.append(edge.nextstate)
+        return rtr
+
+    def unreachable_states(self):
+        """
+        States that are never entered.
+
+        :return: List[String]
+        """
+        reachable = self.reachable()
+        return [state.name for index, state in enumerate(self.app.states) if not _test(reachable, index)]
+
+    def writes(self, actuator):
+        """
+        Value written to an actuator when entering each state.
+
+        :param actuator: String, name of the actuator
+        :return: List[SIGNAL], by state (None if the state does not write the actuator)
+        """
+        rtr = []
+        for state in self.app.states:
+            value = None
+            for action in state.actions:
+                if action.brick.name == actuator:
+                    value = action.value  # the last action on an actuator wins
+            rtr.append(value)
+        return rtr
+
+    def blocked(self, actuator):
+        """
+        Reachable configurations from which an actuator can never be turned off again (i.e., from which no
+        configuration where the actuator is LOW is reachable).
+        A configuration is a state and the value of the actuator (LOW at start-up), packed as 2 * state + value.
+
+        :param actuator: String, name of the actuator
+        :return: List[List[(String, Map[String, SIGNAL])]], a trace to each such configuration: the entered states,
+                 and the sensor valuations entering them
+        """
+        writes = self.writes(actuator)
+        count = 2 * len(self.app.states)
+        if not count:
+            return []
+
+        def successor(configuration, edge):
+            value = writes[edge.nextstate]
+            return 2 * edge.nextstate + (configuration & 1 if value is None else value)
+
+        # forward search of the reachable configurations, with the parent of each one for the traces
+        reachable = _bits(count)
+        parents = [None] * count
+        initial = 0 if writes[0] is None else writes[0]
+        _set(reachable, initial)
+        frontier = collections.deque([initial])
+        predecessors = [[] for _ in range(count)]
+        while frontier:
+            configuration = frontier.popleft()
+            for edge in self.edges[configuration >> 1]:
+                following = successor(configuration, edge)
+                predecessors[following].append(configuration)
+                if not _test(reachable, following):
+                    _set(reachable, following)
+                    parents[following] = (configuration, edge)
+                    frontier.append(following)
+
+        # backward search from the reachable configurations where the actuator is LOW
+        released = _bits(count)
+        frontier = collections.deque()
+        for configuration in range(0, count, 2):
+            if _test(reachable, configuration):
+                _set(released, configuration)
+                frontier.append(configuration)
+        while frontier:
+            configuration = frontier.popleft()
+            for predecessor in predecessors[configuration]:
+                if not _test(released, predecessor):
+                    _set(released, predecessor)
+                    frontier.append(predecessor)
+
+        rtr = []
+        for configuration in range(count):
+            if _test(reachable, configuration) and not _test(released, configuration):
+                trace = []
+                current = configuration
+                while parents[current] is not None:
+                    current, edge = parents[current]
+                    trace.append((self.app.states[edge.nextstate].name, self.valuation(edge.mask, edge.values)))
+                trace.append((self.app.states[current >> 1].name, {}))
+                rtr.append(trace[::-1])
+        return rtr
+
+    def livelocks(self):
+        """
+        Pairs of reachable states switching to each other forever while the sensors keep the same values.
+
+        :return: List[(String, String, Map[String, SIGNAL])], the states and a valuation keeping them switching
+        """
+        reachable = self.reachable()
+        rtr = []
+        for first, edges in enumerate(self.edges):
+            if not _test(reachable, first):
+                continue
+            for edge in edges:
+                second = edge.nextstate
+                if edge.timed or second <= first:
+                    continue
+                for back in self.edges[second]:
+                    if back.nextstate == first and not back.timed and edge.compatible(back):
+                        rtr.append((self.app.states[first].name, self.app.states[second].name,
+                                    self.valuation(edge.mask | back.mask, edge.values | back.values)))
+                        break
+        return rtr
+
+    def check(self, actuators=None):
+        """
+        Checks that every state is reachable, that actuators can always be turned off, and that no two states
+        switch to each other forever.
+
+        :param actuators: List[String] (optional), actuators that must always be possible to turn off (default: all)
+        :return: ModelCheckResult
+        """
+        actuators = [actuator.name for actuator in self.actuators] if actuators is None else actuators
+        blocked = dict([(actuator, self.blocked(actuator)) for actuator in actuators])
+        reachable = self.reachable()
+        explored = sum(1 for index in range(len(self.app.states)) if _test(reachable, index))
+        return ModelCheckResult(self.app.name, explored, self.unreachable_states(), blocked, self.livelocks())
+
+
+def main(argv=None):
+    """
+    Command line: checks all the scenarios (functions starting with 'scenario') of a Python file.
+
+    :param argv: List[String] (optional), the arguments (default: sys.argv)
+    :return: Integer, exit status (1 if a property is violated)
+    """
+    parser = argparse.ArgumentParser(description="Model checking of ArduinoML scenarios")
+    parser.add_argument("file", help="Python file containing scenario functions returning apps")
+    parser.add_argument("--off", action="append", default=None, metavar="ACTUATOR",
+                        help="actuator that must always be possible to turn off (default: all)")
+    args = parser.parse_args(argv)
+
+    apps = load_scenarios(args.file)
+    # an actuator may be missing from some scenarios, but not from all of them
+    known = set([brick.name for app in apps for brick in app.bricks if isinstance(brick, Actuator)])
+    unknown = [actuator for actuator in args.off or [] if actuator not in known]
+    if unknown:
+        parser.error("unknown actuator(s): %s" % ", ".join(unknown))
+
+    violations = []
+    for app in apps:
+        checker = ModelChecker(app)
+        actuators = None if args.off is None else [actuator for actuator in args.off
+                                                   if actuator in [brick.name for brick in checker.actuators]]
+        result = checker.check(actuators)
+        print("%s %-24s %d reachable states" % ("✓" if result.holds() else "✗", app.name, result.explored))
+        violations += result.violations()
+    for violation in violations:
+        print("✗ %s" % violation)
+    return 1 if violations else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Tests for the static cost estimation of the generated Arduino programs
+"""
+
+from pyArduinoML.analysis.CostAnalyzer import CostAnalyzer, main
+from pyArduinoML.methodchaining.AppBuilder import AppBuilder
+from pyArduinoML.model.GeneratorOptions import GeneratorOptions, PORT_IO, TABLE, SENSOR_DEBOUNCE
+from pyArduinoML.model.SIGNAL import HIGH, LOW
+
+
+def build_dual_button_app(options=None):
+    """
+    Builds an app whose transition mentions the same sensor twice.
+    """
+    return AppBuilder("Dual_Button") \
+        .sensor("BUTTON1").on_pin(9) \
+        .sensor("BUTTON2").on_pin(10) \
+        .actuator("LED").on_pin(12) \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when_any(("BUTTON1", HIGH), ("BUTTON2", HIGH), ("BUTTON1", LOW)).go_to_state("on") \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .when("BUTTON1").has_value(HIGH).go_to_state("off") \
+        .get_contents(options)
+
+
+def test_counts_the_operations_of_each_state():
+    cost = CostAnalyzer(build_dual_button_app()).analyze()
+    off, on = cost.states
+    assert (off.calls("digitalRead"), off.calls("digitalWrite"), off.calls("millis")) == (3, 1, 2)
+    assert off.depth == 3 and on.depth == 1
+    assert cost.calls("digitalRead") == 4
+    assert cost.cycles == off.cycles > on.cycles
+
+
+def test_options_reduce_the_estimated_cost():
+    default = CostAnalyzer(build_dual_button_app()).analyze()
+    sampled = CostAnalyzer(build_dual_button_app(GeneratorOptions(sample_sensors=True))).analyze()
+    entry = CostAnalyzer(build_dual_button_app(GeneratorOptions(entry_actions=True))).analyze()
+    ports = CostAnalyzer(build_dual_button_app(GeneratorOptions(io=PORT_IO))).analyze()
+    assert sampled.states[0].calls("digitalRead") == 2
+    assert sampled.cycles < default.cycles
+    assert entry.steady_cycles < default.steady_cycles
+    assert ports.cycles < default.cycles and ports.flash < default.flash
+
+
+def test_table_backend_and_sensor_debounce():
+    cost = CostAnalyzer(build_dual_button_app(GeneratorOptions(backend=TABLE, debounce=SENSOR_DEBOUNCE))).analyze()
+    assert cost.states[0].calls("millis") == 1
+    assert cost.states[0].calls("interpreter") == 1
+    assert cost.flash > 0
+
+
+def test_firing_charges_millis_only_when_the_fire_code_calls_it():
+    app = AppBuilder("Pulse") \
+        .sensor("BUTTON").on_pin(9) \
+        .actuator("LED").on_pin(12) \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .after(500).go_to_state("off") \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when("BUTTON").has_value(HIGH).go_to_state("on") \
+        .get_contents()
+    on, off = CostAnalyzer(app).analyze().states
+    # a time transition to an untimed state takes no timestamp: only the elapsed time is read
+    assert on.calls("millis") == 1
+    # the debounce guard, and time = millis() when firing (reused as the state-entry timestamp of "on")
+    assert off.calls("millis") == 2
+
+
+def test_budget_violations():
+    cost = CostAnalyzer(build_dual_button_app()).analyze()
+    assert cost.violations() == []
+    assert cost.violations(max_flash=cost.flash, max_cycles=cost.cycles) == []
+    assert len(cost.violations(max_flash=cost.flash - 1, max_cycles=cost.cycles - 1)) == 2
+
+
+def test_table_backend_loops_over_the_actuators_only():
+    def build(extra):
+        builder = AppBuilder("Table").sensor("BUTTON").on_pin(9)
+        for index in range(extra):
+            builder.sensor("UNUSED%d" % index).on_pin(2 + index)
+        return builder.actuator("LED").on_pin(12) \
+            .state("off") \
+                .set("LED").to(LOW) \
+                .when("BUTTON").has_value(HIGH).go_to_state("on") \
+            .state("on") \
+                .set("LED").to(HIGH) \
+                .when("BUTTON").has_value(LOW).go_to_state("off") \
+            .get_contents(GeneratorOptions(backend=TABLE))
+
+    # sensors that no state reads do not change the action mask loop over ACTUATOR_COUNT
+    single, unused = CostAnalyzer(build(0)).analyze(), CostAnalyzer(build(2)).analyze()
+    assert unused.states[0].operations["compare"] == single.states[0].operations["compare"]
+    assert unused.cycles == single.cycles
+
+
+def test_command_line_fails_over_budget(tmp_path, capsys):
+    scenario = tmp_path / "scenarios.py"
+    scenario.write_text("from pyArduinoML.analysis.test_cost_analyzer import build_dual_button_app\n"
+                        "def scenario_dual():\n"
+                        "    app = build_dual_button_app()\n"
+                        "    print(app)\n"
+                        "    return app\n")
+    assert main([str(scenario)]) == 0
+    assert "Dual_Button" in capsys.readouterr().out
+    assert main([str(scenario), "--max-cycles", "10"]) == 1
+    assert main([str(scenario), "--option", "io=PORT_IO", "--max-flash", "100000"]) == 0
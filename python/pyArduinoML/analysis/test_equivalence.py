@@ -0,0 +1,118 @@
+"""
+Tests for the behavioral equivalence of apps
+"""
+
+from pyArduinoML.analysis.Equivalence import _Machine, equivalent
+from pyArduinoML.methodchaining.AppBuilder import AppBuilder
+from pyArduinoML.model.GeneratorOptions import GeneratorOptions, SENSOR_DEBOUNCE
+from pyArduinoML.model.SIGNAL import HIGH, LOW
+from pyArduinoML.model.TimeUnit import S
+
+
+def build_toggle_app(name="Toggle", duplicate=False, delay=2):
+    """
+    Builds an app switching a LED on with a button and off with another one or after a delay, optionally with a
+    duplicated "on" state.
+    """
+    builder = AppBuilder(name) \
+        .sensor("ON").on_pin(9) \
+        .sensor("OFF").on_pin(10) \
+        .actuator("LED").on_pin(12) \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when("ON").has_value(HIGH).go_to_state("on") \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .when("OFF").has_value(HIGH).go_to_state("off") \
+            .when("ON").has_value(LOW).go_to_state("on2" if duplicate else "on") \
+            .after(delay, S).go_to_state("off")
+    if duplicate:
+        builder = builder.state("on2") \
+            .set("LED").to(HIGH) \
+            .when("OFF").has_value(HIGH).go_to_state("off") \
+            .when("ON").has_value(LOW).go_to_state("on") \
+            .after(delay, S).go_to_state("off")
+    return builder.get_contents()
+
+
+def test_duplicated_states_are_equivalent():
+    result = equivalent(build_toggle_app(), build_toggle_app("Refactored", duplicate=True))
+    assert result
+    assert result.trace is None
+    assert result.explored > 0
+
+
+def test_counterexample_is_a_sensor_trace():
+    other = AppBuilder("Other") \
+        .sensor("ON").on_pin(9) \
+        .sensor("OFF").on_pin(10) \
+        .actuator("LED").on_pin(12) \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when("ON").has_value(HIGH).go_to_state("on") \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .when_all(("OFF", HIGH), ("ON", LOW)).go_to_state("off") \
+            .after(2, S).go_to_state("off") \
+        .get_contents()
+    result = equivalent(build_toggle_app(), other)
+    assert not result
+    assert result.trace == [{"ON": HIGH}, {"ON": HIGH, "OFF": HIGH}]
+    assert result.outputs == ({"LED": LOW}, {"LED": HIGH})
+
+
+def test_delays_are_observable():
+    result = equivalent(build_toggle_app(), build_toggle_app(delay=3))
+    assert not result
+    assert result.trace == [{"ON": HIGH}, 2000]
+
+
+def test_states_reading_more_sensors_than_a_decision_tree():
+    def build(names, order):
+        builder = AppBuilder("Panel")
+        for index, name in enumerate(names):
+            builder.sensor(name).on_pin(2 + index)
+        return builder.actuator("LED").on_pin(12) \
+            .state("off") \
+                .set("LED").to(LOW) \
+                .when_all(*[(name, HIGH) for name in order]).go_to_state("on") \
+                .when_all(*[(name, LOW) for name in order]).go_to_state("on") \
+            .state("on") \
+                .set("LED").to(HIGH) \
+                .when(names[0]).has_value(LOW).go_to_state("off") \
+            .get_contents()
+
+    names = ["S%d" % index for index in range(9)]
+    assert equivalent(build(names, names), build(names, names[::-1]))
+    result = equivalent(build(names, names), build(names, names[:-1]))
+    assert not result
+    # only the first app requires S8 to follow the other sensors
+    step = result.trace[0]
+    assert len(set([step[name] for name in names[:-1]])) == 1 and step[names[-1]] != step[names[0]]
+
+
+def test_per_sensor_guards_decide_all_the_transitions():
+    def build(options=None):
+        builder = AppBuilder("Panel")
+        for index, name in enumerate(names):
+            builder.sensor(name).on_pin(2 + index)
+        return builder.actuator("LED").on_pin(12) \
+            .state("off") \
+                .set("LED").to(LOW) \
+                .when_all(*[(name, HIGH) for name in names]).go_to_state("on") \
+                .when("S0").has_value(HIGH).go_to_state("on") \
+            .state("on") \
+                .set("LED").to(HIGH) \
+                .when("S0").has_value(LOW).go_to_state("off") \
+            .get_contents(options)
+
+    names = ["S%d" % index for index in range(9)]
+    app = build()
+    machine = _Machine(app, dict([(name, index) for index, name in enumerate(names)]), {"LED": 0})
+    transitions = app.states[0].transitions
+    # with the global guard, the second transition is not decided once the first one holds
+    assert set([leaf for _, _, leaf in machine.chain(transitions, {}, True)]) == {(0,), (1,), ()}
+    # with per-sensor guards, it may fire when the guard of the first one is closed
+    assert set([leaf for _, _, leaf in machine.chain(transitions, {}, False)]) == {(0, 1), (1,), ()}
+    debounced = GeneratorOptions(debounce=SENSOR_DEBOUNCE)
+    assert equivalent(build(debounced), build(debounced))
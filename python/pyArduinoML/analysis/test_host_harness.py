@@ -0,0 +1,77 @@
+"""
+Tests for the host benchmark of generated sketches
+"""
+
+import shutil
+import tempfile
+
+import pytest
+
+from pyArduinoML.analysis.HostHarness import HostHarness, instrument
+from pyArduinoML.analysis.test_cost_analyzer import build_dual_button_app
+from pyArduinoML.model.GeneratorOptions import GeneratorOptions, PORT_IO, TABLE
+from pyArduinoML.model.SIGNAL import HIGH, LOW
+from pyArduinoML.simulation.test_simulator import build_switch_app
+
+compiler = pytest.mark.skipif(shutil.which("g++") is None, reason="no C++ compiler")
+
+
+def test_instrument_polls_and_declares_the_state_functions():
+    prototypes, sketch = instrument(str(build_switch_app()))
+    assert prototypes == "void state_off();\nvoid state_on();\n"
+    assert "void state_on() {\n\tharness_poll();" in sketch
+    prototypes, sketch = instrument(str(build_dual_button_app(GeneratorOptions(backend=TABLE))))
+    assert prototypes == ""
+    assert "void loop() {\n\tharness_poll();" in sketch
+
+
+@compiler
+def test_measures_the_polls_of_the_generated_variants(tmp_path):
+    trace = [(300, "BUTTON", HIGH), (400, "BUTTON", LOW), (3000, "STOP", HIGH)]
+    app = build_switch_app()
+    harness = HostHarness(app.save(str(tmp_path)), {"BUTTON": 9, "STOP": 10})
+    try:
+        result = harness.run(trace, 5000)
+    finally:
+        harness.close()
+    assert result.iterations == 5000
+    assert result.ns_per_iteration() > 0
+    # each poll writes the LED
+    assert result.writes == 5000
+
+    harness = HostHarness.for_app(build_switch_app(GeneratorOptions(entry_actions=True)))
+    try:
+        result = harness.run(trace, 5000)
+    finally:
+        harness.close()
+    # entries of the initial state, of "on" at 300 ms, and of "off" 2 s later
+    assert result.writes == 3
+
+    # port writes are counted as digitalWrite calls
+    harness = HostHarness.for_app(build_switch_app(GeneratorOptions(entry_actions=True, io=PORT_IO)))
+    try:
+        result = harness.run(trace, 5000)
+    finally:
+        harness.close()
+    assert result.writes == 3
+
+
+@compiler
+def test_failed_compilations_remove_the_build_directory(monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    with pytest.raises(RuntimeError):
+        HostHarness("void setup() { undefined(); }\nvoid loop() {}\n")
+    assert list(tmp_path.iterdir()) == []
+
+
+@compiler
+def test_stack_depth_of_unoptimized_recursive_calls():
+    app = build_switch_app()
+    optimized = HostHarness.for_app(app)
+    unoptimized = HostHarness.for_app(app, flags=("-O0",))
+    try:
+        assert optimized.run([], 2000).stack < 1000
+        assert unoptimized.run([], 2000).stack > 2000 * 8
+    finally:
+        optimized.close()
+        unoptimized.close()
@@ -0,0 +1,125 @@
+"""
+Tests for the model checking of apps
+"""
+
+import pytest
+
+from pyArduinoML.analysis.ModelChecker import ModelChecker, main
+from pyArduinoML.methodchaining.AppBuilder import AppBuilder
+from pyArduinoML.model.GeneratorOptions import GeneratorOptions, SENSOR_DEBOUNCE
+from pyArduinoML.model.SIGNAL import HIGH, LOW
+
+
+def build_alarm_app():
+    """
+    Builds an alarm whose siren cannot be turned off once the panic state is entered, with an unreachable state.
+    """
+    return AppBuilder("Alarm") \
+        .sensor("DOOR").on_pin(8) \
+        .sensor("PANIC").on_pin(9) \
+        .sensor("KEY").on_pin(10) \
+        .actuator("SIREN").on_pin(12) \
+        .state("armed") \
+            .set("SIREN").to(LOW) \
+            .when("PANIC").has_value(HIGH).go_to_state("panic") \
+            .when("DOOR").has_value(HIGH).go_to_state("alarm") \
+        .state("alarm") \
+            .set("SIREN").to(HIGH) \
+            .when("KEY").has_value(HIGH).go_to_state("armed") \
+        .state("panic") \
+            .set("SIREN").to(HIGH) \
+            .when("PANIC").has_value(LOW).go_to_state("panic") \
+        .state("maintenance") \
+            .set("SIREN").to(LOW) \
+            .when("KEY").has_value(LOW).go_to_state("armed") \
+        .get_contents()
+
+
+def test_reports_unreachable_states_and_blocked_actuators():
+    result = ModelChecker(build_alarm_app()).check(["SIREN"])
+    assert result.explored == 3
+    assert result.unreachable == ["maintenance"]
+    assert result.blocked["SIREN"] == [[("armed", {}), ("panic", {"PANIC": HIGH})]]
+    # with the door open and the key turned, the alarm is raised and cleared forever
+    assert result.livelocks == [("armed", "alarm", {"PANIC": LOW, "DOOR": HIGH, "KEY": HIGH})]
+    assert not result.holds()
+
+
+def test_reports_livelocks_with_their_valuation():
+    app = AppBuilder("Toggle") \
+        .sensor("BUTTON").on_pin(9) \
+        .actuator("LED").on_pin(12) \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when("BUTTON").has_value(HIGH).go_to_state("on") \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .when("BUTTON").has_value(HIGH).go_to_state("off") \
+        .get_contents()
+    result = ModelChecker(app).check()
+    assert result.livelocks == [("off", "on", {"BUTTON": HIGH})]
+    assert result.violations() == ["Toggle: livelock between 'off' and 'on' when BUTTON is HIGH"]
+
+
+def test_scales_with_the_sensors_read_per_state():
+    builder = AppBuilder("Chain")
+    for index in range(40):
+        builder = builder.sensor("S%d" % index).on_pin(index)
+    builder = builder.actuator("LED").on_pin(50)
+    for index in range(40):
+        builder = builder.state("s%d" % index).set("LED").to(HIGH if index % 2 else LOW) \
+            .when_all(("S%d" % index, HIGH), ("S%d" % ((index + 1) % 40), LOW)).go_to_state("s%d" % ((index + 1) % 40))
+    result = ModelChecker(builder.get_contents()).check()
+    assert result.explored == 40
+    assert result.holds()
+
+
+def test_states_reading_more_sensors_than_a_decision_tree():
+    builder = AppBuilder("Vault")
+    for index in range(10):
+        builder = builder.sensor("S%d" % index).on_pin(index)
+    app = builder.actuator("LOCK").on_pin(50) \
+        .state("locked") \
+            .set("LOCK").to(HIGH) \
+            .when_all(*[("S%d" % index, HIGH) for index in range(10)]).go_to_state("open") \
+            .when("S0").has_value(HIGH).go_to_state("alarm") \
+        .state("open") \
+            .set("LOCK").to(LOW) \
+            .when("S9").has_value(LOW).go_to_state("locked") \
+        .state("alarm") \
+            .set("LOCK").to(HIGH) \
+            .when("S1").has_value(HIGH).go_to_state("locked") \
+        .get_contents()
+    checker = ModelChecker(app)
+    # S0 is HIGH and another sensor is LOW: the code combination fails, and the alarm is raised
+    alarm = [edge for edge in checker.edges[0] if edge.nextstate == 2]
+    assert len(alarm) == 9 and all(checker.valuation(edge.mask, edge.values)["S0"] == HIGH for edge in alarm)
+    assert [checker.valuation(edge.mask, edge.values) for edge in checker.edges[0] if edge.nextstate == 1] \
+        == [dict(("S%d" % index, HIGH) for index in range(10))]
+    result = checker.check(["LOCK"])
+    assert result.explored == 3 and result.blocked == {"LOCK": []}
+    # with per-sensor guards, the alarm can also fire when the combination holds
+    app.options = GeneratorOptions(debounce=SENSOR_DEBOUNCE)
+    alarm = [edge for edge in ModelChecker(app).edges[0] if edge.nextstate == 2]
+    assert [checker.valuation(edge.mask, edge.values) for edge in alarm] == [{"S0": HIGH}]
+
+
+def test_command_line(tmp_path, capsys):
+    scenarios = tmp_path / "scenarios.py"
+    scenarios.write_text("from pyArduinoML.analysis.test_model_checker import build_alarm_app\n"
+                         "def scenario_alarm():\n"
+                         "    return build_alarm_app()\n")
+    assert main([str(scenarios), "--off", "SIREN"]) == 1
+    out = capsys.readouterr().out
+    assert "Alarm: state 'maintenance' is unreachable" in out
+    assert "Alarm: SIREN can no longer be turned off after armed -> panic" in out
+
+
+def test_command_line_rejects_unknown_actuators(tmp_path, capsys):
+    scenarios = tmp_path / "scenarios.py"
+    scenarios.write_text("from pyArduinoML.analysis.test_model_checker import build_alarm_app\n"
+                         "def scenario_alarm():\n"
+                         "    return build_alarm_app()\n")
+    with pytest.raises(SystemExit):
+        main([str(scenarios), "--off", "SIRNE"])
+    assert "unknown actuator(s): SIRNE" in capsys.readouterr().err
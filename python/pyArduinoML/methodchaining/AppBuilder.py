@@ -4,6 +4,21 @@ from pyArduinoML.model.App import App
 from pyArduinoML.methodchaining.BrickBuilder import BrickBuilder
 from pyArduinoML.methodchaining.StateBuilder import StateBuilder
 from pyArduinoML.methodchaining.BrickBuilder import ACTUATOR, SENSOR
+from pyArduinoML.methodchaining.UndefinedBrick import UndefinedBrick
+from pyArduinoML.methodchaining.UndefinedState import UndefinedState
+from pyArduinoML.model import TimeUnit
+from pyArduinoML.model.Action import Action
+from pyArduinoML.model.Actuator import Actuator
+from pyArduinoML.model.Condition import AndCondition, OrCondition, SensorCondition
+from pyArduinoML.model.Sensor import Sensor, DEFAULT_DEBOUNCE
+from pyArduinoML.model.State import State
+from pyArduinoML.model.TimeTransition import TimeTransition
+from pyArduinoML.model.Transition import Transition
+
+# tags of the conditions of the transitions of a specification (see AppBuilder.from_spec)
+ALL = "all"
+ANY = "any"
+AFTER = "after"
 
 
 class AppBuilder:
@@ -55,10 +70,75 @@ class AppBuilder:
         self.states.append(builder)
         return builder
 
-    def get_contents(self):
+    def _last_state(self, method):
+        """
+        Builder of the last state, to which the transitions are added.
+
+        :param method: String, name of the method adding a transition, for the error message
+        :return: StateBuilder, builder for states
+        :raises: ValueError, if no state has been added yet
+        """
+        if not self.states:
+            raise ValueError("%s() adds a transition to the last state, but no state has been added" % method)
+        return self.states[-1]
+
+    def when(self, sensor):
+        """
+        Adds a transition to the last state, with a lower priority than its previous transitions.
+
+        :param sensor: String, brick to operate on
+        :return: TransitionBuilder, the builder for the transition
+        :raises: ValueError, if no state has been added yet
+        """
+        return self._last_state("when").when(sensor)
+
+    def when_all(self, *sensor_conditions):
+        """
+        Adds a transition with AND condition to the last state, with a lower priority than its previous transitions.
+
+        :param sensor_conditions: Tuple of (sensor_name, value) pairs
+        :return: TransitionBuilder, the builder for the transition
+        :raises: ValueError, if no state has been added yet
+        """
+        return self._last_state("when_all").when_all(*sensor_conditions)
+
+    def when_any(self, *sensor_conditions):
+        """
+        Adds a transition with OR condition to the last state, with a lower priority than its previous transitions.
+
+        :param sensor_conditions: Tuple of (sensor_name, value) pairs
+        :return: TransitionBuilder, the builder for the transition
+        :raises: ValueError, if no state has been added yet
+        """
+        return self._last_state("when_any").when_any(*sensor_conditions)
+
+    def when_condition(self, condition_builder_fn):
+        """
+        Adds a transition with a custom complex condition to the last state, with a lower priority than its previous
+        transitions.
+
+        :param condition_builder_fn: Function that takes bricks dict and returns a Condition
+        :return: TransitionBuilder, the builder for the transition
+        :raises: ValueError, if no state has been added yet
+        """
+        return self._last_state("when_condition").when_condition(condition_builder_fn)
+
+    def after(self, delay, unit=TimeUnit.MS):
+        """
+        Adds a time transition to the last state, with a lower priority than its previous transitions.
+
+        :param delay: Integer, the delay, in the time unit
+        :param unit: TimeUnit, unit of the delay (default: milliseconds)
+        :return: TransitionBuilder, the builder for the transition
+        :raises: ValueError, if no state has been added yet
+        """
+        return self._last_state("after").after(delay, unit)
+
+    def get_contents(self, options=None):
         """
         Builds the app.
 
+        :param options: GeneratorOptions (optional), options of the code generation of the app
         :return: App, the app to be build
         """
         # build the bricks
@@ -80,4 +160,67 @@ class AppBuilder:
         for builder in self.states:
             builder.get_contents2(bricks, states)
         # build the app
-        return App(self.name, bricks.values(), state_values)
+        return App(self.name, list(bricks.values()), state_values, options)
+
+    @staticmethod
+    def from_spec(name, bricks, states, transitions, options=None):
+        """
+        Builds an app in bulk from plain tuples, in one linear pass over the specification.
+
+        :param name: String, name of the app
+        :param bricks: Iterable[(ACTUATOR or SENSOR, String, Integer[, Integer[, Boolean]])], kind, name and pin of each
+                       brick, optionally followed (sensors only) by the debounce window and the interrupt capture
+        :param states: Iterable[(String, Iterable[(String, SIGNAL)])], name and actions (actuator, value) of each state,
+                       the first one being the initial state
+        :param transitions: Iterable[(String, condition, String)], source, condition and target of each transition, the
+                            transitions of a state by decreasing priority; a condition is (sensor, value),
+                            (ALL, [(sensor, value), ...]), (ANY, [(sensor, value), ...]), (AFTER, delay in
+                            milliseconds), or a function from the bricks (Map[String, Brick]) to a LogicalExpression
+        :param options: GeneratorOptions (optional), options of the code generation of the app
+        :return: App, the app
+        :raises: UndefinedBrick, if a brick an action or a condition operates on is not defined
+        :raises: UndefinedState, if the source or the target of a transition is not defined
+        """
+        brick_map = {}  # Map[String, Brick]
+        for spec in bricks:
+            kind, brick_name, pin = spec[:3]
+            if kind == SENSOR:
+                debounce = spec[3] if len(spec) > 3 else DEFAULT_DEBOUNCE
+                interrupt = spec[4] if len(spec) > 4 else False
+                brick_map[brick_name] = Sensor(brick_name, pin, debounce, interrupt)
+            else:
+                brick_map[brick_name] = Actuator(brick_name, pin)
+        state_map = {}  # Map[String, State]
+        state_values = []  # List[State], in order
+        for state_name, actions in states:
+            built = []
+            for actuator, value in actions:
+                if actuator not in brick_map:
+                    raise UndefinedBrick()
+                built.append(Action(value, brick_map[actuator]))
+            state = State(state_name, built)
+            state_map[state_name] = state
+            state_values.append(state)
+        for source, condition, target in transitions:
+            if source not in state_map or target not in state_map:
+                raise UndefinedState()
+            nextstate = state_map[target]
+            if callable(condition):
+                transition = Transition(None, None, nextstate, condition=condition(brick_map))
+            elif condition[0] == AFTER:
+                transition = TimeTransition(condition[1], nextstate)
+            elif condition[0] in (ALL, ANY):
+                conditions = []
+                for sensor, value in condition[1]:
+                    if sensor not in brick_map:
+                        raise UndefinedBrick()
+                    conditions.append(SensorCondition(brick_map[sensor], value))
+                composite = AndCondition(*conditions) if condition[0] == ALL else OrCondition(*conditions)
+                transition = Transition(None, None, nextstate, condition=composite)
+            else:
+                sensor, value = condition
+                if sensor not in brick_map:
+                    raise UndefinedBrick()
+                transition = Transition(brick_map[sensor], value, nextstate)
+            state_map[source].addtransition(transition)
+        return App(name, list(brick_map.values()), state_values, options)
@@ -1,7 +1,7 @@
 __author__ = 'pascalpoizat'
 
 from pyArduinoML.model.Actuator import Actuator
-from pyArduinoML.model.Sensor import Sensor
+from pyArduinoML.model.Sensor import Sensor, DEFAULT_DEBOUNCE
 
 ACTUATOR = 0
 SENSOR = 1
@@ -25,6 +25,33 @@ class BrickBuilder:
         self.name = name
         self.kind = kind
         self.pin = None  # Int, pin of the brick
+        self.debounce = DEFAULT_DEBOUNCE  # Int, debounce window of the brick (sensors only)
+        self.interrupt = False  # Boolean, capture of the brick by an interrupt handler (sensors only)
+
+    def with_debounce(self, debounce):
+        """
+        Sets the debounce window of the brick (sensors only)
+
+        :param debounce: Int, debounce window in milliseconds
+        :return: BrickBuilder, the builder
+        :raises: ValueError, if the brick is an actuator
+        """
+        if self.kind != SENSOR:
+            raise ValueError("Actuator '%s' cannot have a debounce window" % self.name)
+        self.debounce = debounce
+        return self
+
+    def with_interrupt(self):
+        """
+        Captures the brick with an interrupt handler (sensors only)
+
+        :return: BrickBuilder, the builder
+        :raises: ValueError, if the brick is an actuator
+        """
+        if self.kind != SENSOR:
+            raise ValueError("Actuator '%s' cannot be captured by an interrupt handler" % self.name)
+        self.interrupt = True
+        return self
 
     def on_pin(self, pin):
         """
@@ -45,5 +72,5 @@ class BrickBuilder:
         if self.kind == ACTUATOR:
             return Actuator(self.name, self.pin)
         if self.kind == SENSOR:
-            return Sensor(self.name, self.pin)
+            return Sensor(self.name, self.pin, self.debounce, self.interrupt)
         return None
@@ -0,0 +1,70 @@
+"""
+Benchmark of the construction of large apps: a ring of states built in bulk (AppBuilder.from_spec) and by method
+chaining.
+"""
+
+import argparse
+import sys
+import time
+
+from pyArduinoML.methodchaining.AppBuilder import AppBuilder
+from pyArduinoML.methodchaining.BrickBuilder import ACTUATOR, SENSOR
+
+
+def ring_spec(count):
+    """
+    Specification of a ring of states, each press of a button going to the next state, the LED being on every other
+    state.
+
+    :param count: Integer, number of states
+    :return: (List, List, List), bricks, states and transitions (see AppBuilder.from_spec)
+    """
+    bricks = [(SENSOR, "BUTTON", 9), (ACTUATOR, "LED", 12)]
+    states = [("s%d" % index, [("LED", index % 2)]) for index in range(count)]
+    transitions = [("s%d" % index, ("BUTTON", 1), "s%d" % ((index + 1) % count)) for index in range(count)]
+    return bricks, states, transitions
+
+
+def benchmark(count=100000):
+    """
+    Measures the construction of a ring of states (see ring_spec), in bulk and by method chaining.
+
+    :param count: Integer, number of states
+    :return: (Float, Float), seconds to build the app from its specification and by method chaining
+    """
+    bricks, states, transitions = ring_spec(count)
+    start = time.perf_counter()
+    AppBuilder.from_spec("Ring", bricks, states, transitions)
+    bulk = time.perf_counter() - start
+    start = time.perf_counter()
+    builder = AppBuilder("Ring")
+    builder.sensor("BUTTON").on_pin(9)
+    builder.actuator("LED").on_pin(12)
+    for (name, actions), (_, (sensor, value), target) in zip(states, transitions):
+        state = builder.state(name)
+        for actuator, signal in actions:
+            state.set(actuator).to(signal)
+        state.when(sensor).has_value(value).go_to_state(target)
+    builder.get_contents()
+    chained = time.perf_counter() - start
+    return bulk, chained
+
+
+def main(argv=None):
+    """
+    Command line: construction times of a ring of states.
+
+    :param argv: List[String] (optional), the arguments (default: sys.argv)
+    :return: Integer, exit status
+    """
+    parser = argparse.ArgumentParser(description="Construction benchmark of large ArduinoML apps")
+    parser.add_argument("--states", type=int, default=100000, help="number of states of the ring")
+    args = parser.parse_args(argv)
+
+    bulk, chained = benchmark(args.states)
+    print("%d states: %.2f s in bulk, %.2f s by method chaining" % (args.states, bulk, chained))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,6 +2,8 @@ __author__ = 'pascalpoizat'
 
 from pyArduinoML.model.State import State
 from pyArduinoML.model.Transition import Transition
+from pyArduinoML.model.TimeTransition import TimeTransition
+from pyArduinoML.model import TimeUnit
 from pyArduinoML.model.Condition import SensorCondition, AndCondition, OrCondition
 from pyArduinoML.methodchaining.TransitionBuilder import TransitionBuilder
 from pyArduinoML.methodchaining.StateActionBuilder import StateActionBuilder
@@ -24,7 +26,7 @@ class StateBuilder:
         self.root = root
         self.state = state
         self.actions = []  # List[StateActionBuilder], builders for the state actions
-        self.transition = None  # TransitionBuilder, builder for the state transition (unique in the current meta-model)
+        self.transitions = []  # List[TransitionBuilder], builders for the state transitions, by decreasing priority
 
     def set(self, actuator):
         """
@@ -34,23 +36,23 @@ class StateBuilder:
         :return: StateActionBuilder, the builder for the action
         """
         action = StateActionBuilder(self, actuator)
-        self.actions = self.actions + [action]
+        self.actions.append(action)
         return action
 
     def when(self, sensor):
         """
-        Sets the transition of the state (unique in the current meta-model)
+        Adds a transition to the state, with a lower priority than the previous ones
 
         :param sensor: String, brick to operate on
         :return: TransitionBuilder, the builder for the transition
         """
         transition = TransitionBuilder(self, sensor)
-        self.transition = transition
+        self.transitions.append(transition)
         return transition
 
     def when_all(self, *sensor_conditions):
         """
-        Sets a transition with AND condition (all conditions must be true).
+        Adds a transition with AND condition (all conditions must be true).
 
         :param sensor_conditions: Tuple of (sensor_name, value) pairs or Condition objects
         :return: TransitionBuilder, the builder for the transition
@@ -59,12 +61,12 @@ class StateBuilder:
         transition = TransitionBuilder(self, None)
         transition.composite_conditions = sensor_conditions
         transition.composite_type = "AND"
-        self.transition = transition
+        self.transitions.append(transition)
         return transition
 
     def when_any(self, *sensor_conditions):
         """
-        Sets a transition with OR condition (at least one condition must be true).
+        Adds a transition with OR condition (at least one condition must be true).
 
         :param sensor_conditions: Tuple of (sensor_name, value) pairs or Condition objects
         :return: TransitionBuilder, the builder for the transition
@@ -73,12 +75,12 @@ class StateBuilder:
         transition = TransitionBuilder(self, None)
         transition.composite_conditions = sensor_conditions
         transition.composite_type = "OR"
-        self.transition = transition
+        self.transitions.append(transition)
         return transition
 
     def when_condition(self, condition_builder_fn):
         """
-        Sets a transition with a custom complex condition.
+        Adds a transition with a custom complex condition.
 
         :param condition_builder_fn: Function that takes bricks dict and returns a Condition
         :return: TransitionBuilder, the builder for the transition
@@ -89,7 +91,22 @@ class StateBuilder:
         """
         transition = TransitionBuilder(self, None)
         transition.condition_builder = condition_builder_fn
-        self.transition = transition
+        self.transitions.append(transition)
+        return transition
+
+    def after(self, delay, unit=TimeUnit.MS):
+        """
+        Adds a transition fired when a delay has elapsed since the state was entered, with a lower priority than the
+        previous transitions.
+
+        :param delay: Integer, the delay, in the time unit
+        :param unit: TimeUnit, unit of the delay (default: milliseconds)
+        :return: TransitionBuilder, the builder for the transition
+        Example: .after(2, S).go_to_state("off")
+        """
+        transition = TransitionBuilder(self, None)
+        transition.delay = delay * unit
+        self.transitions.append(transition)
         return transition
 
     def get_contents(self, bricks):
@@ -115,53 +132,60 @@ class StateBuilder:
         :raises: UndefinedBrick, if the brick the transition operates on is not defined
         :raises: UndefinedState, if the target state is not defined
 
-        This method builds the transition attribute.
+        This method builds the transitions, in priority order.
         A 2-step build is required (due to the meta-model) to get references right while avoiding bad typing tricks
         such as passing a TransitionBuilder instead of a Transition.
         """
-        # Handle custom complex condition
-        if hasattr(self.transition, 'condition_builder') and self.transition.condition_builder:
-            if self.state not in states.keys():
+        if self.state not in states:
+            raise UndefinedState()
+        for builder in self.transitions:
+            states[self.state].addtransition(self.build_transition(builder, bricks, states))
+
+    def build_transition(self, builder, bricks, states):
+        """
+        Builds a transition of the state.
+
+        :param builder: TransitionBuilder, the builder of the transition
+        :param bricks: Map[String,Brick], the bricks of the application
+        :param states: Map[String, State], the states of the application
+        :return: Transition, the transition
+        :raises: UndefinedBrick, if the brick the transition operates on is not defined
+        :raises: UndefinedState, if the target state is not defined
+        """
+        # Handle time transition
+        if getattr(builder, 'delay', None) is not None:
+            if builder.next_state not in states:
                 raise UndefinedState()
-            if self.transition.next_state not in states.keys():
+            return TimeTransition(builder.delay, states[builder.next_state])
+        # Handle custom complex condition
+        if getattr(builder, 'condition_builder', None):
+            if builder.next_state not in states:
                 raise UndefinedState()
-
             # Build the condition using the provided function
-            composite_condition = self.transition.condition_builder(bricks)
-            transition = Transition(None, None, states[self.transition.next_state], condition=composite_condition)
-            states[self.state].transition = transition
+            composite_condition = builder.condition_builder(bricks)
+            return Transition(None, None, states[builder.next_state], condition=composite_condition)
         # Handle composite conditions
-        elif hasattr(self.transition, 'composite_conditions') and self.transition.composite_conditions:
+        if getattr(builder, 'composite_conditions', None):
             # Validate all sensors exist
-            for sensor_name, value in self.transition.composite_conditions:
-                if sensor_name not in bricks.keys():
+            for sensor_name, value in builder.composite_conditions:
+                if sensor_name not in bricks:
                     raise UndefinedBrick()
-
-            if self.state not in states.keys():
-                raise UndefinedState()
-            if self.transition.next_state not in states.keys():
+            if builder.next_state not in states:
                 raise UndefinedState()
 
             # Create composite condition
             conditions = [SensorCondition(bricks[sensor_name], value)
-                         for sensor_name, value in self.transition.composite_conditions]
+                         for sensor_name, value in builder.composite_conditions]
 
-            if self.transition.composite_type == "AND":
+            if builder.composite_type == "AND":
                 composite_condition = AndCondition(*conditions)
             else:  # OR
                 composite_condition = OrCondition(*conditions)
 
-            transition = Transition(None, None, states[self.transition.next_state], condition=composite_condition)
-            states[self.state].transition = transition
-        else:
-            # Handle simple condition (backward compatibility)
-            if self.transition.sensor not in bricks.keys():
-                raise UndefinedBrick()
-            if self.state not in states.keys():
-                raise UndefinedState()
-            if self.transition.next_state not in states.keys():
-                raise UndefinedState()
-            transition = Transition(bricks[self.transition.sensor],
-                                    self.transition.value,
-                                    states[self.transition.next_state])
-            states[self.state].transition = transition
+            return Transition(None, None, states[builder.next_state], condition=composite_condition)
+        # Handle simple condition (backward compatibility)
+        if builder.sensor not in bricks:
+            raise UndefinedBrick()
+        if builder.next_state not in states:
+            raise UndefinedState()
+        return Transition(bricks[builder.sensor], builder.value, states[builder.next_state])
@@ -0,0 +1,82 @@
+"""
+Tests for the bulk construction of apps from specifications
+"""
+
+import pytest
+
+from pyArduinoML.methodchaining.AppBuilder import AFTER, ALL, ANY, AppBuilder
+from pyArduinoML.methodchaining.BrickBuilder import ACTUATOR, SENSOR
+from pyArduinoML.methodchaining.BulkBenchmark import ring_spec
+from pyArduinoML.methodchaining.UndefinedBrick import UndefinedBrick
+from pyArduinoML.methodchaining.UndefinedState import UndefinedState
+from pyArduinoML.model.Condition import AndCondition, NotCondition, SensorCondition
+from pyArduinoML.model.SIGNAL import HIGH, LOW
+
+
+def test_matches_method_chaining():
+    chained = AppBuilder("Alarm") \
+        .sensor("B1").on_pin(8) \
+        .sensor("B2").on_pin(9) \
+        .actuator("LED").on_pin(12) \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when_all(("B1", HIGH), ("B2", HIGH)).go_to_state("on") \
+            .when("B1").has_value(HIGH).go_to_state("wait") \
+        .state("wait") \
+            .after(500).go_to_state("off") \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .when_any(("B1", LOW), ("B2", LOW)).go_to_state("off") \
+            .when_condition(lambda bricks: AndCondition(
+                NotCondition(SensorCondition(bricks["B1"], HIGH)), SensorCondition(bricks["B2"], HIGH))) \
+            .go_to_state("wait") \
+        .get_contents()
+    bulk = AppBuilder.from_spec(
+        "Alarm",
+        [(SENSOR, "B1", 8), (SENSOR, "B2", 9), (ACTUATOR, "LED", 12)],
+        [("off", [("LED", LOW)]), ("wait", []), ("on", [("LED", HIGH)])],
+        [("off", (ALL, [("B1", HIGH), ("B2", HIGH)]), "on"),
+         ("off", ("B1", HIGH), "wait"),
+         ("wait", (AFTER, 500), "off"),
+         ("on", (ANY, [("B1", LOW), ("B2", LOW)]), "off"),
+         ("on", lambda bricks: AndCondition(
+             NotCondition(SensorCondition(bricks["B1"], HIGH)), SensorCondition(bricks["B2"], HIGH)), "wait")])
+    assert str(bulk) == str(chained)
+
+
+def test_sensor_options():
+    app = AppBuilder.from_spec("Button", [(SENSOR, "BUTTON", 9, 50, True)], [("idle", [])], [])
+    assert app.bricks[0].debounce == 50
+    assert app.bricks[0].interrupt
+
+
+def test_undefined_names():
+    bricks = [(SENSOR, "BUTTON", 9), (ACTUATOR, "LED", 12)]
+    with pytest.raises(UndefinedBrick):
+        AppBuilder.from_spec("App", bricks, [("on", [("BUZZER", HIGH)])], [])
+    with pytest.raises(UndefinedBrick):
+        AppBuilder.from_spec("App", bricks, [("on", [])], [("on", ("RESET", HIGH), "on")])
+    with pytest.raises(UndefinedState):
+        AppBuilder.from_spec("App", bricks, [("on", [])], [("on", ("BUTTON", HIGH), "off")])
+
+
+def test_actuators_have_no_sensor_options():
+    with pytest.raises(ValueError):
+        AppBuilder("App").actuator("LED").with_debounce(50)
+    with pytest.raises(ValueError):
+        AppBuilder("App").actuator("LED").with_interrupt()
+
+
+def test_transitions_need_a_state():
+    builder = AppBuilder("App").sensor("BUTTON").on_pin(9)
+    for add in (lambda: builder.when("BUTTON"), lambda: builder.when_all(("BUTTON", HIGH)),
+                lambda: builder.when_any(("BUTTON", HIGH)), lambda: builder.when_condition(lambda bricks: None),
+                lambda: builder.after(500)):
+        with pytest.raises(ValueError, match="no state"):
+            add()
+
+
+def test_large_ring():
+    app = AppBuilder.from_spec("Ring", *ring_spec(100000))
+    assert len(app.states) == 100000
+    assert app.states[-1].transition.nextstate is app.states[0]
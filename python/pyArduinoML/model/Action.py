@@ -16,3 +16,12 @@ class Action :
         """
         self.value = value
         self.brick = brick
+
+    def setup(self, options=None):
+        """
+        Arduino code for the action.
+
+        :param options: GeneratorOptions (optional), options of the generation
+        :return: String
+        """
+        return self.brick.write(self.value, options)
@@ -19,10 +19,11 @@ class Actuator(Brick):
 
         Brick.__init__(self, name, pin)
 
-    def setup(self):
+    def setup(self, options=None):
         """
         Arduino code for the setup of the actuator
 
+        :param options: GeneratorOptions (optional), options of the generation
         :return: String
         """
-        return "\tpinMode(%s, OUTPUT);" % self.name
+        return self.pin_mode("OUTPUT", options)
@@ -2,6 +2,9 @@ __author__ = 'pascalpoizat'
 
 import os
 from pyArduinoML.model.NamedElement import NamedElement
+from pyArduinoML.model.GeneratorOptions import GeneratorOptions, LOOP, TABLE
+from pyArduinoML.model.TableBackend import TableBackend
+from pyArduinoML.model.Sensor import Sensor, DEFAULT_DEBOUNCE
 
 
 class App(NamedElement):
@@ -10,18 +13,20 @@ class App(NamedElement):
 
     """
 
-    def __init__(self, name, bricks=(), states=()):
+    def __init__(self, name, bricks=(), states=(), options=None):
         """
         Constructor.
 
         :param name: String, the name of the application
         :param bricks: List[Brick], bricks over which the application operates
         :param states: List[State], states of the application with the first one being the initial state
+        :param options: GeneratorOptions (optional), options of the code generation (default options if None)
         :return:
         """
         NamedElement.__init__(self, name)
         self.bricks = bricks
         self.states = states
+        self.options = options if options is not None else GeneratorOptions()
 
     def __repr__(self):
         """
@@ -29,25 +34,162 @@ class App(NamedElement):
 
         :return: String
         """
+        if self.options.backend == TABLE:
+            return TableBackend(self).generate()
 
         rtr = """// generated by ArduinoML
-
 %s
-
+%s
+%s
 void setup() {
 %s
 }
 
-int state = LOW; int prev = HIGH;
-long time = 0; long debounce = 200;
-
 %s
-void loop() { state_%s(); }""" % ("\n".join(map(lambda b: b.declare(), self.bricks)),
-                                  "\n".join(map(lambda b: b.setup(), self.bricks)),
-                                  "\n".join(map(lambda s: s.setup(), self.states)),
-                                  self.states[0].name)
+%s
+%s
+%s""" % (self.header(),
+         "\n".join(map(lambda b: b.declare(self.options), self.bricks)),
+         self.interrupt_handlers(),
+         "\n".join(map(lambda b: b.setup(self.options), self.bricks)),
+         self.global_variables(),
+         self.state_variables(),
+         "\n".join(map(lambda s: s.setup(self.options, bool(self.interrupt_sensors())), self.states)),
+         self.loop())
         return rtr
 
+    def interrupt_sensors(self):
+        """
+        Sensors captured by interrupt handlers.
+
+        :return: List[Sensor]
+        """
+        return [brick for brick in self.bricks if isinstance(brick, Sensor) and brick.interrupt]
+
+    def interrupt_handlers(self):
+        """
+        Arduino declarations of the edge bitmask and of the interrupt handlers of the sensors.
+
+        :return: String
+        :raises: ValueError, if there are more interrupt sensors than bits in the bitmask
+        """
+        sensors = self.interrupt_sensors()
+        if not sensors:
+            return ""
+        if len(sensors) > 4:
+            raise ValueError("At most 4 sensors can be captured by interrupt handlers")
+        rtr = "\n%svolatile uint8_t sensor_edges = 0;\n" % self.storage()
+        for index, sensor in enumerate(sensors):
+            rtr += "%s\n" % sensor.interrupt_handler(index, self.options)
+        return rtr
+
+    def header(self):
+        """
+        Comments following the first line of the program (static RAM estimate of the compact declarations).
+
+        :return: String
+        """
+        if self.options.compact():
+            return "// estimated static RAM: %d bytes (Arduino core excluded)\n" % self.ram_estimate()
+        return ""
+
+    def storage(self):
+        """
+        Storage class of the global variables (file-scope static with the compact declarations).
+
+        :return: String
+        """
+        return "static " if self.options.compact() else ""
+
+    def global_variables(self):
+        """
+        Arduino declarations of the global variables: state/prev (unused, standard declarations only), debounce
+        timestamps and windows, and state-entry timestamp (time transitions).
+
+        :return: String
+        """
+        rtr = ""
+        if not self.options.compact():
+            rtr += "int state = LOW; int prev = HIGH;\n"
+        if self.options.sensor_debounce():
+            rtr += "\n".join([brick.debounce_variables(self.options)
+                              for brick in self.bricks if isinstance(brick, Sensor)])
+        elif self.options.compact():
+            rtr += "static unsigned long time = 0; const unsigned long debounce = %d;" % DEFAULT_DEBOUNCE
+        else:
+            rtr += "long time = 0; long debounce = %d;" % DEFAULT_DEBOUNCE
+        if self.timed():
+            rtr += "\n%sunsigned long state_time = 0;" % self.storage()
+        return rtr
+
+    def timed(self):
+        """
+        Checks if a state has time transitions, the program then recording the state-entry timestamp.
+
+        :return: Boolean
+        """
+        return any(state.time_transitions() for state in self.states)
+
+    def ram_estimate(self):
+        """
+        Estimated static RAM of the global variables of the program, with AVR type sizes (int: 2 bytes, long: 4 bytes).
+        Constants are folded by the compiler, and cost no RAM. The Arduino core and the stack are excluded.
+
+        :return: Integer, number of bytes
+        """
+        if self.options.backend == TABLE:
+            return TableBackend(self).footprint()[1]
+        compact = self.options.compact()
+        sensors = [brick for brick in self.bricks if isinstance(brick, Sensor)]
+        rtr = 0
+        if not compact:
+            rtr += 2 * len(self.bricks)  # int pins
+            rtr += 4  # int state, prev
+        if self.options.sensor_debounce():
+            rtr += 4 * len(sensors)  # unsigned long timestamps, the windows are constants
+        else:
+            rtr += 4 if compact else 8  # long time (and long debounce)
+        if self.options.backend == LOOP:
+            rtr += 1  # uint8_t current_state
+        if self.options.entry_actions:
+            rtr += 1  # boolean state_entry
+        if self.interrupt_sensors():
+            rtr += 1  # uint8_t sensor_edges
+        if self.timed():
+            rtr += 4  # unsigned long state_time
+        return rtr
+
+    def state_variables(self):
+        """
+        Arduino declarations of the variables tracking the state: state identifiers and current state (LOOP
+        backend), state entry flag (entry actions).
+
+        :return: String
+        """
+        rtr = ""
+        if self.options.backend == LOOP:
+            rtr += "\n"
+            for index, state in enumerate(self.states):
+                rtr += "const uint8_t %s = %d;\n" % (state.identifier(), index)
+            rtr += "%suint8_t current_state = %s;\n" % (self.storage(), self.states[0].identifier())
+        if self.options.entry_actions:
+            rtr += "\n%sboolean state_entry = true;\n" % self.storage()
+        return rtr
+
+    def loop(self):
+        """
+        Arduino code for the main loop.
+
+        :return: String
+        """
+        if self.options.backend == LOOP:
+            rtr = "void loop() {\n\tswitch (current_state) {\n"
+            for state in self.states:
+                rtr += "\t\tcase %s: state_%s(); break;\n" % (state.identifier(), state.name)
+            rtr += "\t}\n}"
+            return rtr
+        return "void loop() { state_%s(); }" % self.states[0].name
+
     def save(self, output_dir=None):
         """
         Saves the generated Arduino code to a .ino file.
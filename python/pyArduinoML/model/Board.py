@@ -0,0 +1,53 @@
+"""
+Enumeration of the supported boards, with their pin tables.
+"""
+
+UNO = "uno"
+NANO = "nano"
+
+# ATmega328P: digital pins 0-7 are PD0-PD7, 8-13 are PB0-PB5, analog pins A0-A5 (14-19) are PC0-PC5
+# (A6 and A7 of the Nano are analog inputs only, with no digital port)
+ATMEGA328P_PORTS = dict([(pin, ("D", pin)) for pin in range(0, 8)]
+                        + [(pin, ("B", pin - 8)) for pin in range(8, 14)]
+                        + [(pin, ("C", pin - 14)) for pin in range(14, 20)])
+
+PORTS = {
+    UNO: ATMEGA328P_PORTS,
+    NANO: ATMEGA328P_PORTS,
+}
+
+# pins with an external interrupt (INT0 and INT1 on the ATmega328P)
+INTERRUPT_PINS = {
+    UNO: (2, 3),
+    NANO: (2, 3),
+}
+
+
+def port(board, pin):
+    """
+    Returns the port register and bit a pin is mapped to.
+
+    :param board: Board, the board
+    :param pin: Integer, the pin
+    :return: (String, Integer), the letter of the port (e.g., "B" for PORTB/PINB/DDRB) and the bit in the port
+    :raises: ValueError, if the board is unknown or the pin has no digital port on the board
+    """
+    if board not in PORTS:
+        raise ValueError("Unknown board '%s'" % board)
+    if pin not in PORTS[board]:
+        raise ValueError("Pin %s has no digital port on board '%s'" % (pin, board))
+    return PORTS[board][pin]
+
+
+def can_interrupt(board, pin):
+    """
+    Checks if a pin can trigger an external interrupt.
+
+    :param board: Board, the board
+    :param pin: Integer, the pin
+    :return: Boolean
+    :raises: ValueError, if the board is unknown
+    """
+    if board not in INTERRUPT_PINS:
+        raise ValueError("Unknown board '%s'" % board)
+    return pin in INTERRUPT_PINS[board]
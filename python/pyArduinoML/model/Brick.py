@@ -1,6 +1,8 @@
 __author__ = 'pascalpoizat'
 
 from pyArduinoML.model.NamedElement import NamedElement
+from pyArduinoML.model import Board
+from pyArduinoML.model import SIGNAL
 
 class Brick(NamedElement):
     """
@@ -19,10 +21,73 @@ class Brick(NamedElement):
         NamedElement.__init__(self, name)
         self.pin = pin
 
-    def declare(self):
+    def declare(self, options=None):
         """
         Arduino code for the declaration of the brick.
 
+        :param options: GeneratorOptions (optional), options of the generation
         :return: String
         """
+        if options is not None and options.compact():
+            # a constant pin costs no RAM and is folded by the compiler
+            return "const uint8_t %s = %d;" % (self.name, self.pin)
         return "int %s = %d;" % (self.name, self.pin)
+
+    def port(self, options):
+        """
+        Port register and bit of the brick on the target board.
+
+        :param options: GeneratorOptions, options of the generation
+        :return: (String, Integer), the letter of the port and the bit in the port
+        """
+        return Board.port(options.board, self.pin)
+
+    def pin_mode(self, mode, options=None):
+        """
+        Arduino code setting the direction of the pin of the brick.
+
+        :param mode: String, "INPUT" or "OUTPUT"
+        :param options: GeneratorOptions (optional), options of the generation
+        :return: String
+        """
+        if options is not None and options.port_io():
+            port, bit = self.port(options)
+            if mode == "OUTPUT":
+                return "\tDDR%s |= _BV(%d);" % (port, bit)
+            return "\tDDR%s &= ~_BV(%d); PORT%s &= ~_BV(%d);" % (port, bit, port, bit)
+        return "\tpinMode(%s, %s);" % (self.name, mode)
+
+    def read(self, options=None):
+        """
+        Arduino code reading the current value of the brick.
+
+        :param options: GeneratorOptions (optional), options of the generation
+        :return: String
+        """
+        if options is not None and options.port_io():
+            port, bit = self.port(options)
+            return "bitRead(PIN%s, %d)" % (port, bit)
+        return "digitalRead(%s)" % self.name
+
+    def write(self, value, options=None):
+        """
+        Arduino code sending a signal to the brick.
+
+        :param value: SIGNAL, the signal to send
+        :param options: GeneratorOptions (optional), options of the generation
+        :return: String
+        """
+        if options is not None and options.port_io():
+            port, bit = self.port(options)
+            if value == SIGNAL.HIGH:
+                return "PORT%s |= _BV(%d);" % (port, bit)
+            return "PORT%s &= ~_BV(%d);" % (port, bit)
+        return "digitalWrite(%s, %s);" % (self.name, SIGNAL.value(value))
+
+    def sample(self):
+        """
+        Name of the local variable holding the value of the brick, when sampled once per state poll.
+
+        :return: String
+        """
+        return "%s_sample" % self.name
@@ -6,13 +6,83 @@ class LogicalExpression:
     Interface for logical expressions (matches PlantUML interface).
     """
 
-    def evaluate(self):
+    def evaluate(self, options=None):
         """
         Generates Arduino code for the expression evaluation.
+        :param options: GeneratorOptions (optional), options of the generation
         :return: String, Arduino condition code
         """
         raise NotImplementedError("Subclasses must implement evaluate()")
 
+    def sensors(self):
+        """
+        Sensors read by the expression, without duplicates, in order of first use.
+        :return: List[Sensor]
+        """
+        raise NotImplementedError("Subclasses must implement sensors()")
+
+    def holds(self, values):
+        """
+        Evaluates the expression against sensor values.
+        :param values: Map[String, SIGNAL], value of each sensor read by the expression, by sensor name
+        :return: Boolean
+        """
+        raise NotImplementedError("Subclasses must implement holds()")
+
+    def python(self, indices, vectorized=False):
+        """
+        Python expression evaluating the expression against a list of sensor values named 'values', for simulation.
+        :param indices: Map[String, Integer], index of each sensor in the list of values, by sensor name
+        :param vectorized: Boolean, evaluate the expression against a NumPy matrix of values (one row per
+                           simulation, one column per sensor) with element-wise operators
+        :return: String, Python expression
+        """
+        raise NotImplementedError("Subclasses must implement python()")
+
+    def checks(self):
+        """
+        Number of sensor checks in the expression, i.e., its size once generated.
+        :return: Integer
+        """
+        raise NotImplementedError("Subclasses must implement checks()")
+
+    def depth(self):
+        """
+        Nesting depth of the expression once generated (1 for a single sensor check).
+        :return: Integer
+        """
+        raise NotImplementedError("Subclasses must implement depth()")
+
+
+def _merge_sensors(expressions):
+    """
+    Sensors read by a sequence of expressions, without duplicates, in order of first use.
+    :param expressions: List[LogicalExpression]
+    :return: List[Sensor]
+    """
+    sensors = []
+    names = set()
+    for expression in expressions:
+        for sensor in expression.sensors():
+            if sensor.name not in names:
+                names.add(sensor.name)
+                sensors.append(sensor)
+    return sensors
+
+
+def _chain_depth(expressions):
+    """
+    Nesting depth of a left-deep chain of binary expressions, as generated for AND/OR conditions.
+    :param expressions: List[LogicalExpression]
+    :return: Integer
+    """
+    if not expressions:
+        return 1
+    rtr = expressions[0].depth()
+    for expression in expressions[1:]:
+        rtr = 1 + max(rtr, expression.depth())
+    return rtr
+
 
 class BinaryExpression(LogicalExpression):
     """
@@ -31,9 +101,10 @@ class BinaryExpression(LogicalExpression):
         self.left = left
         self.right = right
 
-    def evaluate(self):
+    def evaluate(self, options=None):
         """
         Generates Arduino code for binary expression.
+        :param options: GeneratorOptions (optional), options of the generation
         :return: String, e.g., "(left && right)" or "(left || right)"
         """
         operator_map = {
@@ -41,7 +112,51 @@ class BinaryExpression(LogicalExpression):
             "or": "||"
         }
         arduino_op = operator_map.get(self.operator.lower(), "&&")
-        return "(%s %s %s)" % (self.left.evaluate(), arduino_op, self.right.evaluate())
+        return "(%s %s %s)" % (self.left.evaluate(options), arduino_op, self.right.evaluate(options))
+
+    def sensors(self):
+        """
+        Sensors read by both operands.
+        :return: List[Sensor]
+        """
+        return _merge_sensors([self.left, self.right])
+
+    def holds(self, values):
+        """
+        Evaluates the binary expression against sensor values.
+        :param values: Map[String, SIGNAL], value of each sensor, by sensor name
+        :return: Boolean
+        """
+        if self.operator.lower() == "or":
+            return self.left.holds(values) or self.right.holds(values)
+        return self.left.holds(values) and self.right.holds(values)
+
+    def python(self, indices, vectorized=False):
+        """
+        Python expression of the binary expression.
+        :param indices: Map[String, Integer], index of each sensor in the list of values, by sensor name
+        :param vectorized: Boolean, element-wise operators over a matrix of values
+        :return: String, e.g., "(left and right)", or "(left & right)" when vectorized
+        """
+        if self.operator.lower() == "or":
+            operator = "|" if vectorized else "or"
+        else:
+            operator = "&" if vectorized else "and"
+        return "(%s %s %s)" % (self.left.python(indices, vectorized), operator, self.right.python(indices, vectorized))
+
+    def checks(self):
+        """
+        Number of sensor checks in both operands.
+        :return: Integer
+        """
+        return self.left.checks() + self.right.checks()
+
+    def depth(self):
+        """
+        Nesting depth of the binary expression.
+        :return: Integer
+        """
+        return 1 + max(self.left.depth(), self.right.depth())
 
 
 class PrimaryExpression(LogicalExpression):
@@ -61,14 +176,73 @@ class PrimaryExpression(LogicalExpression):
         self.value = value
         self.inner = inner
 
-    def evaluate(self):
+    def evaluate(self, options=None):
         """
         Generates Arduino code for primary expression.
-        :return: String, e.g., "digitalRead(BUTTON) == HIGH"
+        :param options: GeneratorOptions (optional), options of the generation
+        :return: String, e.g., "digitalRead(BUTTON) == HIGH", or "BUTTON_sample == HIGH" when sensors are sampled,
+                 or "(digitalRead(BUTTON) == HIGH || (edges & BUTTON_HIGH_EDGE))" for interrupt sensors
+        """
+        if self.inner:
+            return "!(%s)" % self.inner.evaluate(options)
+        if options is not None and options.sample_sensors:
+            rtr = "%s == %s" % (self.brick.sample(), SIGNAL.value(self.value))
+        else:
+            rtr = "%s == %s" % (self.brick.read(options), SIGNAL.value(self.value))
+        if getattr(self.brick, "interrupt", False):
+            # the value may also have been latched by the interrupt handler since the previous poll
+            rtr = "(%s || (edges & %s))" % (rtr, self.brick.edge(self.value))
+        return rtr
+
+    def sensors(self):
+        """
+        Sensor checked by the expression (or read by the negated expression).
+        :return: List[Sensor]
+        """
+        if self.inner:
+            return self.inner.sensors()
+        return [self.brick]
+
+    def holds(self, values):
+        """
+        Evaluates the primary expression against sensor values.
+        :param values: Map[String, SIGNAL], value of each sensor, by sensor name
+        :return: Boolean
+        """
+        if self.inner:
+            return not self.inner.holds(values)
+        return values[self.brick.name] == self.value
+
+    def python(self, indices, vectorized=False):
+        """
+        Python expression of the primary expression.
+        :param indices: Map[String, Integer], index of each sensor in the list of values, by sensor name
+        :param vectorized: Boolean, element-wise operators over a matrix of values
+        :return: String, e.g., "values[0] == 1", or "(values[:, 0] == 1)" when vectorized
+        """
+        if self.inner:
+            return ("~(%s)" if vectorized else "not (%s)") % self.inner.python(indices, vectorized)
+        if vectorized:
+            return "(values[:, %d] == %d)" % (indices[self.brick.name], self.value)
+        return "values[%d] == %d" % (indices[self.brick.name], self.value)
+
+    def checks(self):
+        """
+        Number of sensor checks (1, or the checks of the negated expression).
+        :return: Integer
         """
         if self.inner:
-            return "!(%s)" % self.inner.evaluate()
-        return "digitalRead(%s) == %s" % (self.brick.name, SIGNAL.value(self.value))
+            return self.inner.checks()
+        return 1
+
+    def depth(self):
+        """
+        Nesting depth of the primary expression (a negation adds a level).
+        :return: Integer
+        """
+        if self.inner:
+            return 1 + self.inner.depth()
+        return 1
 
 
 # Legacy aliases for backward compatibility
@@ -108,21 +282,63 @@ class AndCondition(LogicalExpression):
         """
         self.conditions.append(condition)
 
-    def evaluate(self):
+    def evaluate(self, options=None):
         """
         Generates Arduino code for AND condition.
+        :param options: GeneratorOptions (optional), options of the generation
         :return: String, e.g., "(condition1 && condition2)"
         """
         if not self.conditions:
             return "true"
         if len(self.conditions) == 1:
-            return self.conditions[0].evaluate()
+            return self.conditions[0].evaluate(options)
 
         # Convert to BinaryExpression chain
         result = self.conditions[0]
         for i in range(1, len(self.conditions)):
             result = BinaryExpression("and", result, self.conditions[i])
-        return result.evaluate()
+        return result.evaluate(options)
+
+    def sensors(self):
+        """
+        Sensors read by the combined conditions.
+        :return: List[Sensor]
+        """
+        return _merge_sensors(self.conditions)
+
+    def holds(self, values):
+        """
+        Evaluates the AND condition against sensor values (true if there is no condition).
+        :param values: Map[String, SIGNAL], value of each sensor, by sensor name
+        :return: Boolean
+        """
+        return all(condition.holds(values) for condition in self.conditions)
+
+    def python(self, indices, vectorized=False):
+        """
+        Python expression of the AND condition.
+        :param indices: Map[String, Integer], index of each sensor in the list of values, by sensor name
+        :param vectorized: Boolean, element-wise operators over a matrix of values
+        :return: String, e.g., "(condition1 and condition2)", or "(condition1 & condition2)" when vectorized
+        """
+        if not self.conditions:
+            return "True"
+        return "(%s)" % (" & " if vectorized else " and ").join([condition.python(indices, vectorized)
+                                                                  for condition in self.conditions])
+
+    def checks(self):
+        """
+        Number of sensor checks in the combined conditions.
+        :return: Integer
+        """
+        return sum(condition.checks() for condition in self.conditions)
+
+    def depth(self):
+        """
+        Nesting depth of the combined conditions, generated as a left-deep chain of binary expressions.
+        :return: Integer
+        """
+        return _chain_depth(self.conditions)
 
 
 class OrCondition(LogicalExpression):
@@ -144,21 +360,63 @@ class OrCondition(LogicalExpression):
         """
         self.conditions.append(condition)
 
-    def evaluate(self):
+    def evaluate(self, options=None):
         """
         Generates Arduino code for OR condition.
+        :param options: GeneratorOptions (optional), options of the generation
         :return: String, e.g., "(condition1 || condition2)"
         """
         if not self.conditions:
             return "false"
         if len(self.conditions) == 1:
-            return self.conditions[0].evaluate()
+            return self.conditions[0].evaluate(options)
 
         # Convert to BinaryExpression chain
         result = self.conditions[0]
         for i in range(1, len(self.conditions)):
             result = BinaryExpression("or", result, self.conditions[i])
-        return result.evaluate()
+        return result.evaluate(options)
+
+    def sensors(self):
+        """
+        Sensors read by the combined conditions.
+        :return: List[Sensor]
+        """
+        return _merge_sensors(self.conditions)
+
+    def holds(self, values):
+        """
+        Evaluates the OR condition against sensor values (false if there is no condition).
+        :param values: Map[String, SIGNAL], value of each sensor, by sensor name
+        :return: Boolean
+        """
+        return any(condition.holds(values) for condition in self.conditions)
+
+    def python(self, indices, vectorized=False):
+        """
+        Python expression of the OR condition.
+        :param indices: Map[String, Integer], index of each sensor in the list of values, by sensor name
+        :param vectorized: Boolean, element-wise operators over a matrix of values
+        :return: String, e.g., "(condition1 or condition2)", or "(condition1 | condition2)" when vectorized
+        """
+        if not self.conditions:
+            return "False"
+        return "(%s)" % (" | " if vectorized else " or ").join([condition.python(indices, vectorized)
+                                                                 for condition in self.conditions])
+
+    def checks(self):
+        """
+        Number of sensor checks in the combined conditions.
+        :return: Integer
+        """
+        return sum(condition.checks() for condition in self.conditions)
+
+    def depth(self):
+        """
+        Nesting depth of the combined conditions, generated as a left-deep chain of binary expressions.
+        :return: Integer
+        """
+        return _chain_depth(self.conditions)
 
 
 class NotCondition(LogicalExpression):
@@ -174,9 +432,48 @@ class NotCondition(LogicalExpression):
         """
         self.condition = condition
 
-    def evaluate(self):
+    def evaluate(self, options=None):
         """
         Generates Arduino code for NOT condition.
+        :param options: GeneratorOptions (optional), options of the generation
         :return: String, e.g., "!(condition)"
         """
-        return "!(%s)" % self.condition.evaluate()
+        return "!(%s)" % self.condition.evaluate(options)
+
+    def sensors(self):
+        """
+        Sensors read by the negated condition.
+        :return: List[Sensor]
+        """
+        return self.condition.sensors()
+
+    def holds(self, values):
+        """
+        Evaluates the NOT condition against sensor values.
+        :param values: Map[String, SIGNAL], value of each sensor, by sensor name
+        :return: Boolean
+        """
+        return not self.condition.holds(values)
+
+    def python(self, indices, vectorized=False):
+        """
+        Python expression of the NOT condition.
+        :param indices: Map[String, Integer], index of each sensor in the list of values, by sensor name
+        :param vectorized: Boolean, element-wise operators over a matrix of values
+        :return: String, e.g., "not (condition)", or "~(condition)" when vectorized
+        """
+        return ("~(%s)" if vectorized else "not (%s)") % self.condition.python(indices, vectorized)
+
+    def checks(self):
+        """
+        Number of sensor checks in the negated condition.
+        :return: Integer
+        """
+        return self.condition.checks()
+
+    def depth(self):
+        """
+        Nesting depth of the NOT condition.
+        :return: Integer
+        """
+        return 1 + self.condition.depth()
@@ -0,0 +1,111 @@
+from pyArduinoML.model import SIGNAL
+from pyArduinoML.model.Condition import _merge_sensors
+
+TREE_MAX_SENSORS = 8  # the tree is built from the 2^k outcomes of the transitions over k sensors
+
+
+class DecisionTree:
+    """
+    Decision tree selecting the outgoing transitions of a state whose conditions hold.
+    Each inner node tests one sensor, so that each sensor is read at most once whatever the number of transitions
+    reading it, and the sensors that do not change the outcome of a subtree are not tested.
+    Leaves are tuples of transition indices, in priority order.
+
+    """
+
+    def __init__(self, transitions, first_only=True):
+        """
+        Constructor.
+
+        :param transitions: List[Transition], the transitions, by decreasing priority
+        :param first_only: Boolean, keep only the first transition that holds in the leaves (otherwise all of them,
+                           when a later transition can fire if the guard of an earlier one blocks it)
+        :return:
+        :raises: ValueError, if the transitions read more than TREE_MAX_SENSORS sensors
+        """
+        self.transitions = transitions
+        self.sensors = _merge_sensors(transitions)  # List[Sensor], bit i of an outcome index is the value of sensor i
+        if len(self.sensors) > TREE_MAX_SENSORS:
+            raise ValueError("Decision trees support at most %d sensors" % TREE_MAX_SENSORS)
+        outcomes = []
+        for index in range(1 << len(self.sensors)):
+            values = {}
+            for bit, sensor in enumerate(self.sensors):
+                values[sensor.name] = SIGNAL.HIGH if index >> bit & 1 else SIGNAL.LOW
+            holding = tuple([i for i, transition in enumerate(transitions) if transition.condition.holds(values)])
+            outcomes.append(holding[:1] if first_only else holding)
+        self.root = self._build(outcomes, self.sensors)
+
+    def _build(self, outcomes, sensors):
+        """
+        Builds the subtree of a set of outcomes.
+
+        :param outcomes: List[Tuple[Integer]], outcome of each value of the sensors (bit i of the index being the
+                         value of the i-th sensor)
+        :param sensors: List[Sensor], the sensors not tested yet
+        :return: Tuple[Integer] for a leaf, (Sensor, node, node) for a test (LOW and HIGH subtrees)
+        """
+        if all(outcome == outcomes[0] for outcome in outcomes):
+            return outcomes[0]
+        low = outcomes[0::2]
+        high = outcomes[1::2]
+        if low == high:
+            # the sensor does not change the outcome here
+            return self._build(low, sensors[1:])
+        return sensors[0], self._build(low, sensors[1:]), self._build(high, sensors[1:])
+
+    @staticmethod
+    def is_leaf(node):
+        """
+        Checks if a node of the tree is a leaf.
+
+        :param node: node of the tree
+        :return: Boolean
+        """
+        return len(node) != 3 or not hasattr(node[0], "name")
+
+    def select(self, values):
+        """
+        Transitions whose conditions hold for sensor values.
+
+        :param values: Map[String, SIGNAL], value of each sensor, by sensor name
+        :return: Tuple[Integer], indices of the transitions
+        """
+        node = self.root
+        while not self.is_leaf(node):
+            node = node[2] if values[node[0].name] == SIGNAL.HIGH else node[1]
+        return node
+
+    def reads(self, node=None):
+        """
+        Maximum number of sensors tested on a path of the tree.
+
+        :param node: node of the tree (optional, default: the root)
+        :return: Integer
+        """
+        node = self.root if node is None else node
+        if self.is_leaf(node):
+            return 0
+        return 1 + max(self.reads(node[1]), self.reads(node[2]))
+
+    def code(self, read, leaf, node=None):
+        """
+        Arduino statements of the tree.
+
+        :param read: Function[Sensor, String], Arduino expression of the value of a sensor
+        :param leaf: Function[Tuple[Integer], List[String]], Arduino statements of a leaf
+        :param node: node of the tree (optional, default: the root)
+        :return: List[String], the statements, nested blocks being indented with tabs
+        """
+        node = self.root if node is None else node
+        if self.is_leaf(node):
+            return leaf(node)
+        sensor, low, high = node
+        low_code = ["\t%s" % line for line in self.code(read, leaf, low)]
+        high_code = ["\t%s" % line for line in self.code(read, leaf, high)]
+        if not high_code:
+            return ["if (%s == %s) {" % (read(sensor), SIGNAL.value(SIGNAL.LOW))] + low_code + ["}"]
+        rtr = ["if (%s == %s) {" % (read(sensor), SIGNAL.value(SIGNAL.HIGH))] + high_code
+        if low_code:
+            rtr += ["} else {"] + low_code
+        return rtr + ["}"]
@@ -0,0 +1,109 @@
+"""
+Enumerations of the code generation backends and of the I/O backends.
+"""
+
+from pyArduinoML.model.Board import UNO
+
+RECURSIVE = 0  # each state function calls the next state function (or itself)
+LOOP = 1  # loop() dispatches on the current state, kept in a variable
+TABLE = 2  # states, actions and transitions are stored in flash tables, run by a single interpreter loop
+
+CORE_IO = 0  # pinMode/digitalWrite/digitalRead from the Arduino core
+PORT_IO = 1  # direct DDRx/PORTx/PINx register operations (AVR boards)
+
+GLOBAL_DEBOUNCE = 0  # a single timestamp, any transition blocks all the transitions during the debounce window
+SENSOR_DEBOUNCE = 1  # a timestamp and a debounce window per sensor
+
+EXPRESSION_CONDITIONS = 0  # conditions are generated as &&/|| expressions
+TABLE_CONDITIONS = 1  # conditions over at most 8 sensors are generated as truth table lookups
+AUTO_CONDITIONS = 2  # the cheapest of both, according to an estimated cost
+
+STANDARD_DECLARATIONS = 0  # historical declarations: mutable int pins, int/long globals
+COMPACT_DECLARATIONS = 1  # const uint8_t pins, unsigned long timestamps, static globals, no unused globals
+
+
+class GeneratorOptions:
+    """
+    Options driving the generation of the Arduino program.
+    The default options produce the historical output of the generator.
+
+    """
+
+    def __init__(self, sample_sensors=False, backend=RECURSIVE, entry_actions=False, io=CORE_IO, board=UNO,
+                 batch_writes=False, debounce=GLOBAL_DEBOUNCE, conditions=EXPRESSION_CONDITIONS,
+                 declarations=STANDARD_DECLARATIONS):
+        """
+        Constructor.
+
+        :param sample_sensors: Boolean, read each sensor used by a transition once per state poll into a local
+                               variable, and evaluate the condition against these local variables
+        :param backend: Backend, RECURSIVE to keep the historical mutually recursive state functions (the stack
+                        grows at each poll), LOOP to keep the current state in a variable and dispatch from loop(),
+                        TABLE to encode the app into flash tables run by an interpreter (see TableBackend)
+        :param entry_actions: Boolean, run the actions of a state only when entering it (first poll, or transition
+                              fired), instead of at every poll
+        :param io: IOBackend, CORE_IO to use the Arduino core functions, PORT_IO to use the port registers of the
+                   board, with pins mapped to ports at generation time
+        :param board: Board, the target board
+        :param batch_writes: Boolean, group the actions of a state by port, and write each port once with masks
+                             computed at generation time (requires PORT_IO)
+        :param debounce: DebounceModel, GLOBAL_DEBOUNCE for a single debounce timestamp shared by all the transitions,
+                         SENSOR_DEBOUNCE for a timestamp per sensor, with the debounce window of each sensor, and
+                         millis() sampled once per poll
+        :param conditions: ConditionStrategy, EXPRESSION_CONDITIONS to generate the conditions as expressions,
+                           TABLE_CONDITIONS to precompute the conditions over at most 8 sensors into truth tables
+                           stored in flash, AUTO_CONDITIONS to choose for each condition according to its cost
+        :param declarations: DeclarationProfile, STANDARD_DECLARATIONS for the historical declarations,
+                             COMPACT_DECLARATIONS to minimize RAM: constant pins the compiler can fold, unsigned
+                             timestamps, file-scope static variables, and no unused state/prev variables
+        :return:
+        """
+        self.sample_sensors = sample_sensors
+        self.backend = backend
+        self.entry_actions = entry_actions
+        self.io = io
+        self.board = board
+        self.batch_writes = batch_writes
+        self.debounce = debounce
+        self.conditions = conditions
+        self.declarations = declarations
+
+    def compact(self):
+        """
+        Checks if the declarations minimize RAM.
+
+        :return: Boolean
+        """
+        return self.declarations == COMPACT_DECLARATIONS
+
+    def sensor_debounce(self):
+        """
+        Checks if each sensor has its own debounce timestamp.
+
+        :return: Boolean
+        """
+        return self.debounce == SENSOR_DEBOUNCE
+
+    def port_io(self):
+        """
+        Checks if the I/O operations use the port registers.
+
+        :return: Boolean
+        """
+        return self.io == PORT_IO
+
+
+def parse_value(value):
+    """
+    Parses the value of a generation option given on the command line.
+
+    :param value: String, a constant of this module (e.g., LOOP), a boolean, an integer or a string
+    :return: the value
+    """
+    if value.isupper() and value in globals():
+        return globals()[value]
+    if value in ("True", "False"):
+        return value == "True"
+    if value.isdigit():
+        return int(value)
+    return value
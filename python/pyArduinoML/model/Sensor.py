@@ -1,6 +1,11 @@
 __author__ = 'pascalpoizat'
 
 from pyArduinoML.model.Brick import Brick
+from pyArduinoML.model import Board
+from pyArduinoML.model import SIGNAL
+
+DEFAULT_DEBOUNCE = 200  # Integer, debounce window in milliseconds
+
 
 class Sensor(Brick):
     """
@@ -8,20 +13,84 @@ class Sensor(Brick):
 
     """
 
-    def __init__(self, name, pin):
+    def __init__(self, name, pin, debounce=DEFAULT_DEBOUNCE, interrupt=False):
         """
         Constructor.
 
         :param name: String, name of the sensor
         :param pin: Integer, pin where the sensor is connected
+        :param debounce: Integer, debounce window of the sensor in milliseconds (used with SENSOR_DEBOUNCE)
+        :param interrupt: Boolean, capture the edges of the sensor with an interrupt handler, so that the transitions
+                          also see the values the sensor had between two polls (the pin must support interrupts)
         :return:
         """
         Brick.__init__(self, name, pin)
+        self.debounce = debounce
+        self.interrupt = interrupt
 
-    def setup(self):
+    def setup(self, options=None):
         """
         Arduino code for the setup of the sensor
 
+        :param options: GeneratorOptions (optional), options of the generation
+        :return: String
+        """
+        rtr = self.pin_mode("INPUT", options)
+        if self.interrupt:
+            rtr += "\n\tattachInterrupt(digitalPinToInterrupt(%s), %s_isr, CHANGE);" % (self.name, self.name)
+        return rtr
+
+    def edge(self, value):
+        """
+        Name of the Arduino constant for the bit latching that the sensor had a value (interrupt sensors).
+
+        :param value: SIGNAL, the value
+        :return: String
+        """
+        return "%s_%s_EDGE" % (self.name, SIGNAL.value(value))
+
+    def interrupt_handler(self, index, options):
+        """
+        Arduino code for the edge bits and the interrupt handler of the sensor (interrupt sensors).
+        The handler latches the value read after each edge into the sensor_edges bitmask.
+
+        :param index: Integer, index of the sensor among the interrupt sensors, giving its bits in sensor_edges
+        :param options: GeneratorOptions, options of the generation
+        :return: String
+        :raises: ValueError, if the pin of the sensor cannot trigger an interrupt on the target board
+        """
+        if not Board.can_interrupt(options.board, self.pin):
+            raise ValueError("Pin %s of sensor '%s' cannot trigger an interrupt on board '%s'"
+                             % (self.pin, self.name, options.board))
+        rtr = "const uint8_t %s = 0x%02X; const uint8_t %s = 0x%02X;\n" \
+              % (self.edge(SIGNAL.HIGH), 1 << 2 * index, self.edge(SIGNAL.LOW), 1 << 2 * index + 1)
+        rtr += "void %s_isr() { sensor_edges |= %s == HIGH ? %s : %s; }" \
+               % (self.name, self.read(options), self.edge(SIGNAL.HIGH), self.edge(SIGNAL.LOW))
+        return rtr
+
+    def debounce_variables(self, options=None):
+        """
+        Arduino declarations of the debounce timestamp and window of the sensor (SENSOR_DEBOUNCE).
+
+        :param options: GeneratorOptions (optional), options of the generation
+        :return: String
+        """
+        storage = "static " if options is not None and options.compact() else ""
+        return "%sunsigned long %s_time = 0; const unsigned long %s_debounce = %d;" \
+               % (storage, self.name, self.name, self.debounce)
+
+    def guard(self):
+        """
+        Arduino condition checking that the debounce window of the sensor is over (SENSOR_DEBOUNCE).
+
+        :return: String
+        """
+        return "now - %s_time > %s_debounce" % (self.name, self.name)
+
+    def stamp(self):
+        """
+        Arduino code recording that a transition reading the sensor fired (SENSOR_DEBOUNCE).
+
         :return: String
         """
-        return "\tpinMode(%s, INPUT);" % self.name
+        return "%s_time = now;" % self.name
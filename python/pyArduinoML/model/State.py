@@ -2,6 +2,10 @@ __author__ = 'pascalpoizat'
 
 from pyArduinoML.model.NamedElement import NamedElement
 from pyArduinoML.model import SIGNAL
+from pyArduinoML.model.GeneratorOptions import LOOP
+from pyArduinoML.model.Condition import _merge_sensors
+from pyArduinoML.model.DecisionTree import DecisionTree, TREE_MAX_SENSORS
+from pyArduinoML.model.TimeTransition import TimeTransition
 
 class State(NamedElement):
     """
@@ -9,19 +13,36 @@ class State(NamedElement):
 
     """
 
-    def __init__(self, name, actions=(), transition=None):
+    def __init__(self, name, actions=(), transition=None, transitions=None):
         """
         Constructor.
 
         :param name: String, name of the state
         :param actions: List[Action], sequence of actions to do when entering the state (size should be > 0)
-        :param transition: Transition, unique outgoing transition
+        :param transition: Transition, unique outgoing transition (deprecated if transitions is used)
+        :param transitions: List[Transition], outgoing transitions by decreasing priority (optional, overrides
+                            transition)
         :return:
         """
         NamedElement.__init__(self, name)
-        self.transition = transition
+        if transitions is None:
+            transitions = [transition] if transition is not None else []
+        self.transitions = list(transitions)
         self.actions = actions
 
+    @property
+    def transition(self):
+        """
+        First outgoing transition (the unique one in single-transition apps).
+
+        :return: Transition, or None if the state has no transition
+        """
+        return self.transitions[0] if self.transitions else None
+
+    @transition.setter
+    def transition(self, transition):
+        self.transitions = [transition] if transition is not None else []
+
     def settransition(self, transition):
         """
         Sets the transition of the state
@@ -30,22 +51,314 @@ class State(NamedElement):
         """
         self.transition = transition
 
-    def setup(self):
+    def addtransition(self, transition):
+        """
+        Adds an outgoing transition, with a lower priority than the existing ones
+        :param transition: Transition
+        :return:
+        """
+        self.transitions.append(transition)
+
+    def sensors(self):
+        """
+        Sensors read by the outgoing transitions.
+        :return: List[Sensor]
+        """
+        return _merge_sensors(self.transitions)
+
+    def time_transitions(self):
+        """
+        Outgoing transitions fired by the time elapsed in the state.
+        :return: List[TimeTransition]
+        """
+        return [transition for transition in self.transitions if isinstance(transition, TimeTransition)]
+
+    def decision_tree(self, options=None):
+        """
+        Decision tree dispatching the sensor transitions of the state, if they are compiled into one.
+        States with a single sensor transition keep their condition expression (or truth table), and states whose
+        transitions read sensors captured by interrupts, or more than TREE_MAX_SENSORS sensors, or with a time
+        transition taking priority over a sensor transition, are compiled into a chain of conditions.
+        The time transitions following the sensor transitions are checked when no sensor transition fires.
+
+        :param options: GeneratorOptions (optional), options of the generation
+        :return: DecisionTree, or None
+        """
+        transitions = self.transitions[:len(self.transitions) - len(self.time_transitions())]
+        if len(self.transitions) == 1 or any(isinstance(transition, TimeTransition) for transition in transitions):
+            return None
+        sensors = self.sensors()
+        if len(sensors) > TREE_MAX_SENSORS or any(getattr(sensor, "interrupt", False) for sensor in sensors):
+            return None
+        # with a debounce window per sensor, a transition blocked by its guard lets the next one holding fire
+        return DecisionTree(transitions, first_only=options is None or not options.sensor_debounce())
+
+    def identifier(self):
+        """
+        Name of the Arduino constant identifying the state.
+
+        :return: String
+        """
+        return "STATE_%s" % self.name
+
+    def actions_code(self, options=None):
+        """
+        Arduino statements for the state actions.
+
+        :param options: GeneratorOptions (optional), options of the generation
+        :return: List[String]
+        """
+        if options is not None and options.batch_writes:
+            return self.batched_actions_code(options)
+        return [action.setup(options) for action in self.actions]
+
+    def batched_actions_code(self, options):
+        """
+        Arduino statements for the state actions, with one masked write per port.
+        The set and clear masks are computed at generation time, and the actuators of a port switch simultaneously.
+
+        :param options: GeneratorOptions, options of the generation
+        :return: List[String]
+        :raises: ValueError, if the I/O operations do not use the port registers
+        """
+        if not options.port_io():
+            raise ValueError("Batched writes require the port I/O backend")
+        masks = {}  # Map[String, (Integer, Integer)], set and clear masks of each port
+        ports = []  # List[String], ports in order of first use
+        for action in self.actions:
+            port, bit = action.brick.port(options)
+            if port not in masks:
+                masks[port] = (0, 0)
+                ports.append(port)
+            set_mask, clear_mask = masks[port]
+            # the last action on an actuator wins, as with sequential writes
+            if action.value == SIGNAL.HIGH:
+                masks[port] = (set_mask | 1 << bit, clear_mask & ~(1 << bit))
+            else:
+                masks[port] = (set_mask & ~(1 << bit), clear_mask | 1 << bit)
+        rtr = []
+        for port in ports:
+            set_mask, clear_mask = masks[port]
+            if not clear_mask:
+                rtr.append("PORT%s |= 0x%02X;" % (port, set_mask))
+            elif not set_mask:
+                rtr.append("PORT%s &= ~0x%02X;" % (port, clear_mask))
+            else:
+                rtr.append("PORT%s = (PORT%s & ~0x%02X) | 0x%02X;" % (port, port, clear_mask, set_mask))
+        return rtr
+
+    def setup(self, options=None, edges=False):
         """
         Arduino code for the state.
 
+        :param options: GeneratorOptions (optional), options of the generation
+        :param edges: Boolean, consume the edges latched by the interrupt handlers of the sensors at each poll
         :return: String
         """
         rtr = ""
+        table = "condition_%s" % self.name
+        if len(self.transitions) == 1 and self.transition.uses_table(options):
+            rtr += "%s\n" % self.transition.table_declaration(table)
         rtr += "void state_%s() {\n" % self.name
+        sensor_debounce = options is not None and options.sensor_debounce()
+        if sensor_debounce:
+            # a single millis() call per poll
+            rtr += "\tunsigned long now = millis();\n"
+        entry_actions = options is not None and options.entry_actions
         # generate code for state actions
-        for action in self.actions:
-            rtr += "\tdigitalWrite(%s, %s);\n" % (action.brick.name, SIGNAL.value(action.value))
-        rtr += "\tboolean guard = millis() - time > debounce;\n"
+        if entry_actions:
+            rtr += "\tif (state_entry) {\n"
+            for statement in self.actions_code(options):
+                rtr += "\t\t%s\n" % statement
+            rtr += "\t\tstate_entry = false;\n\t}\n"
+        else:
+            for statement in self.actions_code(options):
+                rtr += "\t%s\n" % statement
         transition = self.transition
-        condition_code = transition.evaluate_condition()
-        rtr += "\tif (%s && guard) {\n\t\ttime = millis(); state_%s();\n\t} else {\n\t\tstate_%s();\n\t}" \
-               % (condition_code, transition.nextstate.name, self.name)
+        if edges:
+            # the edges stay latched until a transition reading their sensor is evaluated (see consume_edges_code)
+            rtr += "\tnoInterrupts(); uint8_t edges = sensor_edges; interrupts();\n"
+        # sample the sensors of the transitions once, so that the conditions read consistent values
+        if options is not None and options.sample_sensors:
+            for sensor in self.sensors():
+                rtr += "\t%s %s = %s;\n" % ("uint8_t" if options.compact() else "int", sensor.sample(),
+                                              sensor.read(options))
+        if len(self.transitions) != 1 or self.time_transitions():
+            rtr += "\n".join(["\t%s" % line for line in self.dispatch_code(options, edges)])
+            rtr += "\n}\n"
+            return rtr
+        if sensor_debounce:
+            # only the sensors read by the transition are debounced
+            sensors = transition.sensors()
+            rtr += "\tboolean guard = %s;\n" % (" && ".join([sensor.guard() for sensor in sensors]) or "true")
+            fire = " ".join([sensor.stamp() for sensor in sensors])
+        else:
+            rtr += "\tboolean guard = millis() - time > debounce;\n"
+            fire = "time = millis();"
+        if edges:
+            for statement in self.consume_edges_code(options):
+                rtr += "\t%s\n" % statement
+        if transition.uses_table(options):
+            rtr += "\tuint8_t index = %s;\n" % transition.table_index(options)
+            condition_code = transition.table_lookup(table, "index")
+        else:
+            condition_code = transition.evaluate_condition(options)
+        if transition.nextstate.time_transitions():
+            fire += " state_time = %s;" % ("now" if sensor_debounce else "time")
+        if entry_actions:
+            fire += " state_entry = true;"
+        if options is not None and options.backend == LOOP:
+            # loop() calls the state function again, no recursion
+            rtr += "\tif (%s && guard) {\n\t\t%s current_state = %s;\n\t}" \
+                   % (condition_code, fire, transition.nextstate.identifier())
+        else:
+            rtr += "\tif (%s && guard) {\n\t\t%s state_%s();\n\t} else {\n\t\tstate_%s();\n\t}" \
+                   % (condition_code, fire, transition.nextstate.name, self.name)
         # end of state
         rtr += "\n}\n"
         return rtr
+
+    def fire_code(self, transition, options=None):
+        """
+        Arduino statement firing a transition: debounce timestamps, state-entry timestamp, entry flag, and change
+        of state.
+
+        :param transition: Transition, the transition
+        :param options: GeneratorOptions (optional), options of the generation
+        :return: String
+        """
+        sensor_debounce = options is not None and options.sensor_debounce()
+        if isinstance(transition, TimeTransition):
+            # no sensor to debounce
+            statements = []
+        elif sensor_debounce:
+            statements = [sensor.stamp() for sensor in transition.sensors()]
+        else:
+            statements = ["time = millis();"]
+        if transition.nextstate.time_transitions():
+            if sensor_debounce:
+                statements.append("state_time = now;")
+            elif statements:
+                statements.append("state_time = time;")
+            else:
+                statements.append("state_time = millis();")
+        if options is not None and options.entry_actions:
+            statements.append("state_entry = true;")
+        if options is not None and options.backend == LOOP:
+            statements.append("current_state = %s;" % transition.nextstate.identifier())
+        else:
+            statements.append("state_%s();" % transition.nextstate.name)
+        return " ".join(statements)
+
+    def stay_code(self, options=None):
+        """
+        Arduino statements staying in the state when no transition fires.
+
+        :param options: GeneratorOptions (optional), options of the generation
+        :return: List[String]
+        """
+        if options is not None and options.backend == LOOP:
+            # loop() polls the current state again
+            return []
+        return ["state_%s();" % self.name]
+
+    def consume_edges_code(self, options=None):
+        """
+        Arduino statements consuming the edges latched for the interrupt sensors read by the transitions whose debounce
+        guard is open at this poll, before these transitions are evaluated.
+        The other edges stay latched, so that a pulse shorter than a poll is not lost while the guard is closed, or
+        while a state not reading the sensor is active.
+
+        :param options: GeneratorOptions (optional), options of the generation
+        :return: List[String]
+        """
+        def consume(sensors):
+            bits = " | ".join(["%s | %s" % (sensor.edge(SIGNAL.HIGH), sensor.edge(SIGNAL.LOW)) for sensor in sensors])
+            return "noInterrupts(); sensor_edges &= ~(edges & (%s)); interrupts();" % bits
+
+        interrupt = lambda sensors: [sensor for sensor in sensors if getattr(sensor, "interrupt", False)]
+        if options is None or not options.sensor_debounce():
+            sensors = interrupt(self.sensors())
+            return ["if (guard) { %s }" % consume(sensors)] if sensors else []
+        rtr = []
+        for transition in self.transitions:
+            sensors = interrupt(transition.sensors())
+            if sensors:
+                guard = " && ".join([sensor.guard() for sensor in transition.sensors()])
+                rtr.append("if (%s) { %s }" % (guard, consume(sensors)))
+        return rtr
+
+    def dispatch_code(self, options=None, edges=False):
+        """
+        Arduino statements firing the first outgoing transition (by priority) whose condition and guard hold,
+        for any number of transitions.
+        The transitions are compiled into a decision tree when possible, so that the sensors shared by several
+        conditions are read once, and into a chain of conditions otherwise.
+
+        :param options: GeneratorOptions (optional), options of the generation
+        :param edges: Boolean, consume the edges latched by the interrupt handlers of the sensors (see
+                      consume_edges_code)
+        :return: List[String], the statements, nested blocks being indented with tabs
+        """
+        sensor_debounce = options is not None and options.sensor_debounce()
+
+        def guard(transition):
+            # debounce guard of a transition, None if it is always open
+            if isinstance(transition, TimeTransition):
+                return None
+            if not sensor_debounce:
+                return "guard"
+            return " && ".join([sensor.guard() for sensor in transition.sensors()]) or None
+
+        def branch(transition, condition=True):
+            # (condition, statement) branch firing a transition, the condition being None if it always holds
+            conditions = [transition.evaluate_condition(options)] if condition else []
+            conditions += [guard(transition)] if guard(transition) is not None else []
+            return " && ".join(conditions) or None, self.fire_code(transition, options)
+
+        def chain(branches, stay):
+            # if/else if chain of (condition, statement) branches, a None condition ending the chain
+            rtr = []
+            for condition, statement in branches:
+                if condition is None:
+                    if not rtr:
+                        return [statement]
+                    return rtr + ["} else {", "\t%s" % statement, "}"]
+                rtr += ["%sif (%s) {" % ("} else " if rtr else "", condition), "\t%s" % statement]
+            if not rtr:
+                return list(stay)
+            if stay:
+                rtr += ["} else {"] + ["\t%s" % statement for statement in stay]
+            return rtr + ["}"]
+
+        timed = self.time_transitions()
+        rtr = []
+        global_guard = not sensor_debounce and len(timed) < len(self.transitions)
+        if global_guard:
+            rtr.append("boolean guard = millis() - time > debounce;")
+        if timed:
+            # the state-entry timestamp is compared once per poll, without blocking
+            rtr.append("unsigned long elapsed = %s - state_time;" % ("now" if sensor_debounce else "millis()"))
+        if edges:
+            rtr += self.consume_edges_code(options)
+        tree = self.decision_tree(options)
+        if tree is None:
+            return rtr + chain([branch(transition) for transition in self.transitions], self.stay_code(options))
+
+        # the time transitions follow the sensor transitions
+        stay = chain([branch(transition) for transition in timed], self.stay_code(options))
+        if options is not None and options.sample_sensors:
+            read = lambda sensor: sensor.sample()
+        else:
+            read = lambda sensor: sensor.read(options)
+        if sensor_debounce:
+            leaf = lambda indices: chain([branch(self.transitions[index], False) for index in indices], stay)
+            return rtr + tree.code(read, leaf)
+        # a single guard, checked before reading the sensors
+        if tree.is_leaf(tree.root) and not tree.root:
+            return rtr[1:] + stay if global_guard else rtr + stay
+        leaf = lambda indices: [self.fire_code(self.transitions[index], options) for index in indices] or stay
+        rtr += ["if (guard) {"] + ["\t%s" % line for line in tree.code(read, leaf)]
+        if stay:
+            rtr += ["} else {"] + ["\t%s" % statement for statement in stay]
+        return rtr + ["}"]
@@ -0,0 +1,237 @@
+from pyArduinoML.model.Actuator import Actuator
+from pyArduinoML.model.Sensor import Sensor, DEFAULT_DEBOUNCE
+from pyArduinoML.model.Transition import TABLE_MAX_SENSORS
+
+# estimated flash bytes of the interpreter loop and of the setup loops, Arduino core functions excluded
+INTERPRETER_FLASH = 420
+# estimated stack bytes of the interpreter (locals and call frames), besides the copies of the table entries
+INTERPRETER_STACK = 16
+
+
+def _integer_type(count):
+    """
+    Smallest unsigned Arduino integer type holding a number of bits.
+
+    :param count: Integer, the number of bits
+    :return: (String, Integer), the type and its size in bytes
+    :raises: ValueError, if more than 32 bits are needed
+    """
+    for bits, size in ((8, 1), (16, 2), (32, 4)):
+        if count <= bits:
+            return "uint%d_t" % bits, size
+    raise ValueError("At most 32 bits are supported, got %d" % count)
+
+
+class TableBackend:
+    """
+    Data-driven code generation: the states, actions and transitions of an app are stored in flash (PROGMEM) tables,
+    and a single interpreter loop runs the state machine.
+    The code size grows with the size of the tables instead of with the number of state functions.
+
+    """
+
+    def __init__(self, app):
+        """
+        Constructor.
+
+        :param app: App, the app to generate the code of
+        :return:
+        :raises: ValueError, if the app cannot be encoded into tables
+        """
+        self.app = app
+        self.options = app.options
+        if self.options.port_io() or self.options.batch_writes:
+            raise ValueError("The table backend only supports the core I/O functions")
+        self.sensors = [brick for brick in app.bricks if isinstance(brick, Sensor)]  # List[Sensor]
+        self.actuators = [brick for brick in app.bricks if isinstance(brick, Actuator)]  # List[Actuator]
+        if any(sensor.interrupt for sensor in self.sensors):
+            raise ValueError("The table backend does not support interrupt sensors")
+        if any(state.time_transitions() for state in app.states):
+            raise ValueError("The table backend does not support time transitions")
+        self.sensor_ids = dict([(sensor.name, index) for index, sensor in enumerate(self.sensors)])
+        self.actuator_ids = dict([(actuator.name, index) for index, actuator in enumerate(self.actuators)])
+        self.state_ids = dict([(state.name, index) for index, state in enumerate(app.states)])
+        self.action_type, self.action_size = _integer_type(len(self.actuators))
+        self.state_type, self.state_size = _integer_type(max(len(app.states) - 1, 1).bit_length())
+        # List[Transition], in table order: the transitions of each state are contiguous, by decreasing priority
+        self.transitions = [transition for state in app.states for transition in state.transitions]
+        # the interpreter loop index reaches the number of transitions, one past the last transition
+        self.transition_type, self.transition_size = _integer_type(max(len(self.transitions), 1).bit_length())
+        # debounce windows are stored in 16 bits unless one of them needs 32 bits
+        self.debounce_type, self.debounce_size = _integer_type(
+            max([16] + [sensor.debounce.bit_length() for sensor in self.sensors]))
+        for transition in self.transitions:
+            if len(transition.sensors()) > TABLE_MAX_SENSORS:
+                raise ValueError("The table backend supports conditions over at most %d sensors" % TABLE_MAX_SENSORS)
+
+    def state_entries(self):
+        """
+        Entries of the state table: action mask, action values, first transition and number of transitions.
+
+        :return: List[(Integer, Integer, Integer, Integer)]
+        """
+        rtr = []
+        first = 0
+        for state in self.app.states:
+            mask = 0
+            values = 0
+            for action in state.actions:
+                bit = 1 << self.actuator_ids[action.brick.name]
+                mask |= bit
+                # the last action on an actuator wins, as with sequential writes
+                values = values | bit if action.value else values & ~bit
+            rtr.append((mask, values, first, len(state.transitions)))
+            first += len(state.transitions)
+        return rtr
+
+    def transition_entries(self):
+        """
+        Entries of the transition table: next state, number of sensors, offset of the sensors in the condition
+        sensor table, offset of the truth table in the condition table.
+        Also builds the condition sensor table and the condition table.
+
+        :return: (List[(Integer, Integer, Integer, Integer)], List[Integer], List[Integer])
+        :raises: ValueError, if the condition tables do not fit 16-bit offsets
+        """
+        entries = []
+        sensors = []
+        tables = []
+        for transition in self.transitions:
+            condition_sensors = transition.sensors()
+            entries.append((self.state_ids[transition.nextstate.name], len(condition_sensors), len(sensors),
+                            len(tables)))
+            sensors += [self.sensor_ids[sensor.name] for sensor in condition_sensors]
+            tables += transition.table()
+        if len(sensors) > 0xFFFF or len(tables) > 0xFFFF:
+            raise ValueError("The condition tables are too large for 16-bit offsets")
+        return entries, sensors, tables
+
+    def footprint(self):
+        """
+        Estimated memory usage of the generated program, Arduino core excluded.
+
+        :return: (Integer, Integer), flash and RAM bytes (RAM including the stack of the interpreter)
+        """
+        entries, sensors, tables = self.transition_entries()
+        state_entry_size = 2 * self.action_size + self.transition_size + 1
+        transition_entry_size = self.state_size + 1 + 2 + 2
+        flash = len(self.sensors) + len(self.actuators) \
+            + len(self.app.states) * state_entry_size + len(entries) * transition_entry_size \
+            + len(sensors) + len(tables) + INTERPRETER_FLASH
+        ram = self.state_size + INTERPRETER_STACK + state_entry_size + transition_entry_size
+        if self.options.entry_actions:
+            ram += 1
+        if self.options.sensor_debounce():
+            flash += self.debounce_size * len(self.sensors)
+            ram += 4 * len(self.sensors)
+        else:
+            ram += 4 if self.options.compact() else 8
+        return flash, ram
+
+    def generate(self):
+        """
+        Arduino program: tables and interpreter.
+
+        :return: String
+        """
+        flash, ram = self.footprint()
+        state_entries = self.state_entries()
+        transition_entries, condition_sensors, condition_tables = self.transition_entries()
+        entry_actions = self.options.entry_actions
+        sensor_debounce = self.options.sensor_debounce()
+
+        rtr = "// generated by ArduinoML (table backend)\n"
+        rtr += "// expected usage: %d bytes of flash, %d bytes of RAM (Arduino core excluded)\n\n" % (flash, ram)
+        for index, brick in enumerate(self.sensors):
+            rtr += "// sensor %d: %s (pin %d)\n" % (index, brick.name, brick.pin)
+        for index, brick in enumerate(self.actuators):
+            rtr += "// actuator %d: %s (pin %d)\n" % (index, brick.name, brick.pin)
+        for index, state in enumerate(self.app.states):
+            rtr += "// state %d: %s\n" % (index, state.name)
+        rtr += "\nconst uint8_t SENSOR_COUNT = %d;\n" % len(self.sensors)
+        rtr += "const uint8_t SENSOR_PINS[] PROGMEM = {%s};\n" % ", ".join([str(s.pin) for s in self.sensors])
+        if sensor_debounce:
+            rtr += "const %s SENSOR_DEBOUNCE[] PROGMEM = {%s};\n" \
+                   % (self.debounce_type, ", ".join([str(s.debounce) for s in self.sensors]))
+        rtr += "const uint8_t ACTUATOR_COUNT = %d;\n" % len(self.actuators)
+        rtr += "const uint8_t ACTUATOR_PINS[] PROGMEM = {%s};\n\n" % ", ".join([str(a.pin) for a in self.actuators])
+
+        rtr += "struct StateEntry { %s mask; %s values; %s first; uint8_t count; };\n" \
+               % (self.action_type, self.action_type, self.transition_type)
+        rtr += "const StateEntry STATES[] PROGMEM = {\n%s\n};\n\n" \
+               % ",\n".join(["\t{0x%X, 0x%X, %d, %d}" % entry for entry in state_entries])
+        rtr += "struct TransitionEntry { %s next; uint8_t count; uint16_t sensors; uint16_t table; };\n" \
+               % self.state_type
+        rtr += "const TransitionEntry TRANSITIONS[] PROGMEM = {\n%s\n};\n" \
+               % ",\n".join(["\t{%d, %d, %d, %d}" % entry for entry in transition_entries])
+        rtr += "const uint8_t CONDITION_SENSORS[] PROGMEM = {%s};\n" % ", ".join(map(str, condition_sensors))
+        rtr += "const uint8_t CONDITION_TABLES[] PROGMEM = {%s};\n\n" \
+               % ", ".join(["0x%02X" % byte for byte in condition_tables])
+
+        storage = "static " if self.options.compact() else ""
+        rtr += "%s%s current_state = 0;\n" % (storage, self.state_type)
+        if entry_actions:
+            rtr += "%sboolean state_entry = true;\n" % storage
+        if sensor_debounce:
+            rtr += "%sunsigned long sensor_time[%d];\n" % (storage, max(len(self.sensors), 1))
+        elif self.options.compact():
+            rtr += "static unsigned long time = 0; const unsigned long debounce = %d;\n" % DEFAULT_DEBOUNCE
+        else:
+            rtr += "long time = 0; long debounce = %d;\n" % DEFAULT_DEBOUNCE
+
+        rtr += """
+void setup() {
+	for (uint8_t i = 0; i < SENSOR_COUNT; i++) pinMode(pgm_read_byte(&SENSOR_PINS[i]), INPUT);
+	for (uint8_t i = 0; i < ACTUATOR_COUNT; i++) pinMode(pgm_read_byte(&ACTUATOR_PINS[i]), OUTPUT);
+}
+
+void loop() {
+	StateEntry state;
+	memcpy_P(&state, &STATES[current_state], sizeof(StateEntry));
+"""
+        actions = """	for (uint8_t i = 0; i < ACTUATOR_COUNT; i++) {
+		if (state.mask >> i & 1) digitalWrite(pgm_read_byte(&ACTUATOR_PINS[i]), state.values >> i & 1);
+	}
+"""
+        if entry_actions:
+            rtr += "\tif (state_entry) {\n%s\t\tstate_entry = false;\n\t}\n" \
+                   % "".join(["\t%s\n" % line for line in actions.rstrip("\n").split("\n")])
+        else:
+            rtr += actions
+        if sensor_debounce:
+            rtr += "\tunsigned long now = millis();\n"
+        else:
+            rtr += "\tboolean guard = millis() - time > debounce;\n"
+        rtr += """	for (%s t = state.first; t < state.first + state.count; t++) {
+		TransitionEntry transition;
+		memcpy_P(&transition, &TRANSITIONS[t], sizeof(TransitionEntry));
+		uint8_t index = 0;
+""" % self.transition_type
+        if sensor_debounce:
+            rtr += """		boolean guard = true;
+		for (uint8_t k = 0; k < transition.count; k++) {
+			uint8_t sensor = pgm_read_byte(&CONDITION_SENSORS[transition.sensors + k]);
+			index |= digitalRead(pgm_read_byte(&SENSOR_PINS[sensor])) << k;
+			guard = guard && now - sensor_time[sensor] > %s(&SENSOR_DEBOUNCE[sensor]);
+		}
+""" % ("pgm_read_dword" if self.debounce_size == 4 else "pgm_read_word")
+            fire = """			for (uint8_t k = 0; k < transition.count; k++) {
+				sensor_time[pgm_read_byte(&CONDITION_SENSORS[transition.sensors + k])] = now;
+			}
+"""
+        else:
+            rtr += """		for (uint8_t k = 0; k < transition.count; k++) {
+			uint8_t sensor = pgm_read_byte(&CONDITION_SENSORS[transition.sensors + k]);
+			index |= digitalRead(pgm_read_byte(&SENSOR_PINS[sensor])) << k;
+		}
+"""
+            fire = "\t\t\ttime = millis();\n"
+        if entry_actions:
+            fire += "\t\t\tstate_entry = true;\n"
+        rtr += """		if (bitRead(pgm_read_byte(&CONDITION_TABLES[transition.table + (index >> 3)]), index & 7) && guard) {
+%s			current_state = transition.next;
+			break;
+		}
+	}
+}""" % fire
+        return rtr
@@ -0,0 +1,47 @@
+from pyArduinoML.model.Transition import Transition
+
+
+class TimeTransition(Transition):
+    """
+    A transition fired when a delay has elapsed since the state was entered.
+    The state-entry timestamp is recorded once, when a transition enters the state, and each poll compares the time
+    elapsed since then to the delay, without blocking.
+    """
+
+    def __init__(self, delay, nextstate):
+        """
+        Constructor.
+
+        :param delay: Integer, delay in milliseconds
+        :param nextstate: State, state to change to when the delay has elapsed
+        :return:
+        :raises: ValueError, if the delay is not positive
+        """
+        if delay <= 0:
+            raise ValueError("The delay of a time transition must be positive, got %s" % delay)
+        Transition.__init__(self, None, None, nextstate)
+        self.delay = delay
+
+    def evaluate_condition(self, options=None):
+        """
+        Generates Arduino code for the transition condition.
+        :param options: GeneratorOptions (optional), options of the generation
+        :return: String, Arduino condition code over the time elapsed in the state
+        """
+        return "elapsed >= %d" % self.delay
+
+    def sensors(self):
+        """
+        Sensors read by the transition condition (none).
+        :return: List[Sensor]
+        """
+        return []
+
+    def uses_table(self, options=None):
+        """
+        Checks if the condition is generated as a truth table lookup (never).
+
+        :param options: GeneratorOptions (optional), options of the generation
+        :return: Boolean
+        """
+        return False
@@ -0,0 +1,20 @@
+"""
+Enumeration of time units, by their duration in milliseconds.
+"""
+
+MS = 1
+S = 1000
+
+
+def value(unit):
+    """
+    Returns the string representation of a time unit.
+
+    :param unit: TimeUnit, the unit
+    :return: String, the name of the unit in the DSL
+    """
+    if unit == MS:
+        return "MS"
+    if unit == S:
+        return "S"
+    return ""
@@ -1,6 +1,11 @@
 __author__ = 'pascalpoizat'
 
+from pyArduinoML.analysis.CostTable import COSTS
 from pyArduinoML.model.Condition import SensorCondition
+from pyArduinoML.model.GeneratorOptions import TABLE_CONDITIONS, AUTO_CONDITIONS
+from pyArduinoML.model import SIGNAL
+
+TABLE_MAX_SENSORS = 8  # the table of a condition over k sensors has 2^k bits
 
 
 class Transition:
@@ -27,9 +32,106 @@ class Transition:
         else:
             self.condition = condition
 
-    def evaluate_condition(self):
+    def evaluate_condition(self, options=None):
         """
         Generates Arduino code for the transition condition.
+        :param options: GeneratorOptions (optional), options of the generation
         :return: String, Arduino condition code
         """
-        return self.condition.evaluate()
+        return self.condition.evaluate(options)
+
+    def sensors(self):
+        """
+        Sensors read by the transition condition.
+        :return: List[Sensor]
+        """
+        return self.condition.sensors()
+
+    def expression_cost(self, options):
+        """
+        Estimated worst-case cycles of the evaluation of the condition as an expression, with the costs of the board.
+
+        :param options: GeneratorOptions, options of the generation
+        :return: Integer
+        """
+        cycles = COSTS[options.board].cycles
+        read = cycles["port_read" if options.port_io() else "digitalRead"]
+        if options.sample_sensors:
+            return len(self.sensors()) * read + self.condition.checks() * cycles["compare"]
+        return self.condition.checks() * (read + cycles["compare"])
+
+    def table_cost(self, options):
+        """
+        Estimated cycles of the evaluation of the condition as a truth table lookup, with the costs of the board.
+
+        :param options: GeneratorOptions, options of the generation
+        :return: Integer
+        """
+        cycles = COSTS[options.board].cycles
+        read = cycles["port_read" if options.port_io() else "digitalRead"]
+        return len(self.sensors()) * (read + cycles["table_index"]) + cycles["table_lookup"]
+
+    def uses_table(self, options=None):
+        """
+        Checks if the condition is generated as a truth table lookup.
+        Tables are only possible for conditions over 1 to 8 sensors, none of them captured by an interrupt handler.
+
+        :param options: GeneratorOptions (optional), options of the generation
+        :return: Boolean
+        """
+        if options is None or options.conditions not in (TABLE_CONDITIONS, AUTO_CONDITIONS):
+            return False
+        sensors = self.sensors()
+        if not 0 < len(sensors) <= TABLE_MAX_SENSORS or any(getattr(s, "interrupt", False) for s in sensors):
+            return False
+        return options.conditions == TABLE_CONDITIONS or self.table_cost(options) < self.expression_cost(options)
+
+    def table(self):
+        """
+        Truth table of the condition, indexed by the values of its sensors (bit i of the index being the value of the
+        i-th sensor), packed in bytes (bit j of byte b being the entry 8 * b + j).
+
+        :return: List[Integer]
+        """
+        sensors = self.sensors()
+        size = 1 << len(sensors)
+        rtr = [0] * ((size + 7) // 8)
+        for index in range(size):
+            values = {}
+            for bit, sensor in enumerate(sensors):
+                values[sensor.name] = SIGNAL.HIGH if index >> bit & 1 else SIGNAL.LOW
+            if self.condition.holds(values):
+                rtr[index // 8] |= 1 << index % 8
+        return rtr
+
+    def table_declaration(self, name):
+        """
+        Arduino declaration of the truth table of the condition, in flash.
+
+        :param name: String, name of the table
+        :return: String
+        """
+        return "const uint8_t %s[] PROGMEM = {%s};" % (name, ", ".join(["0x%02X" % byte for byte in self.table()]))
+
+    def table_index(self, options=None):
+        """
+        Arduino expression of the index of the truth table for the current sensor values.
+
+        :param options: GeneratorOptions (optional), options of the generation
+        :return: String
+        """
+        terms = []
+        for bit, sensor in enumerate(self.sensors()):
+            value = sensor.sample() if options is not None and options.sample_sensors else sensor.read(options)
+            terms.append(value if bit == 0 else "%s << %d" % (value, bit))
+        return " | ".join(terms)
+
+    def table_lookup(self, name, index):
+        """
+        Arduino condition testing the entry of the truth table.
+
+        :param name: String, name of the table
+        :param index: String, name of the variable holding the index
+        :return: String
+        """
+        return "bitRead(pgm_read_byte(&%s[%s >> 3]), %s & 7)" % (name, index, index)
@@ -0,0 +1,337 @@
+"""
+Tests for the options of the Arduino code generation
+"""
+
+import pytest
+
+from pyArduinoML.methodchaining.AppBuilder import AppBuilder
+from pyArduinoML.model.Actuator import Actuator
+from pyArduinoML.model.GeneratorOptions import GeneratorOptions, LOOP, PORT_IO, SENSOR_DEBOUNCE, \
+    TABLE_CONDITIONS, AUTO_CONDITIONS, TABLE, COMPACT_DECLARATIONS
+from pyArduinoML.model.SIGNAL import HIGH, LOW
+from pyArduinoML.model.TableBackend import TableBackend
+from pyArduinoML.model.TimeUnit import S
+
+
+def build_dual_button_app(options=None):
+    """
+    Builds an app whose transition mentions the same sensor twice.
+    """
+    return AppBuilder("Dual_Button") \
+        .sensor("BUTTON1").on_pin(9) \
+        .sensor("BUTTON2").on_pin(10) \
+        .actuator("LED").on_pin(12) \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when_any(("BUTTON1", HIGH), ("BUTTON2", HIGH), ("BUTTON1", LOW)).go_to_state("on") \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .when("BUTTON1").has_value(HIGH).go_to_state("off") \
+        .get_contents(options)
+
+
+def test_default_reads_sensor_at_each_use():
+    code = str(build_dual_button_app())
+    assert code.count("digitalRead(BUTTON1)") == 3
+    assert "_sample" not in code
+
+
+def test_sampled_sensors_are_read_once_per_state():
+    code = str(build_dual_button_app(GeneratorOptions(sample_sensors=True)))
+    assert code.count("int BUTTON1_sample = digitalRead(BUTTON1);") == 2
+    assert code.count("int BUTTON2_sample = digitalRead(BUTTON2);") == 1
+    assert "(BUTTON1_sample == HIGH || BUTTON2_sample == HIGH) || BUTTON1_sample == LOW" in code
+
+
+def test_loop_backend_dispatches_from_loop():
+    code = str(build_dual_button_app(GeneratorOptions(backend=LOOP)))
+    assert "uint8_t current_state = STATE_off;" in code
+    assert "current_state = STATE_on;" in code
+    assert "case STATE_on: state_on(); break;" in code
+    # no state function calls another state function
+    assert "state_on();\n\t}" not in code
+    assert code.count("state_off();") == 1
+
+
+def test_entry_actions_are_guarded_by_the_entry_flag():
+    code = str(build_dual_button_app(GeneratorOptions(entry_actions=True)))
+    assert "boolean state_entry = true;" in code
+    assert "\tif (state_entry) {\n\t\tdigitalWrite(LED, LOW);\n\t\tstate_entry = false;\n\t}" in code
+    assert "state_entry = true; state_on();" in code
+    assert "\tdigitalWrite" not in code.replace("\t\tdigitalWrite", "")
+
+
+def test_port_io_uses_registers():
+    code = str(build_dual_button_app(GeneratorOptions(io=PORT_IO)))
+    assert "pinMode" not in code and "digitalRead" not in code and "digitalWrite" not in code
+    assert "DDRB |= _BV(4);" in code
+    assert "PORTB &= ~_BV(4);" in code and "PORTB |= _BV(4);" in code
+    assert "bitRead(PINB, 1) == HIGH" in code
+
+
+def test_port_io_rejects_pins_without_port():
+    with pytest.raises(ValueError):
+        Actuator("LED", 42).write(1, GeneratorOptions(io=PORT_IO))
+
+
+def test_batched_writes_use_one_masked_write_per_port():
+    app = AppBuilder("Batched") \
+        .sensor("BUTTON").on_pin(2) \
+        .actuator("LED1").on_pin(10) \
+        .actuator("LED2").on_pin(11) \
+        .actuator("LED3").on_pin(5) \
+        .state("off") \
+            .set("LED1").to(HIGH) \
+            .set("LED2").to(LOW) \
+            .set("LED3").to(LOW) \
+            .when("BUTTON").has_value(HIGH).go_to_state("off") \
+        .get_contents(GeneratorOptions(io=PORT_IO, batch_writes=True))
+    code = str(app)
+    assert "\tPORTB = (PORTB & ~0x08) | 0x04;\n\tPORTD &= ~0x20;\n" in code
+
+
+def test_batched_writes_require_port_io():
+    with pytest.raises(ValueError):
+        str(build_dual_button_app(GeneratorOptions(batch_writes=True)))
+
+
+def test_sensor_debounce_uses_a_timestamp_per_sensor():
+    app = AppBuilder("Debounced") \
+        .sensor("BUTTON1").with_debounce(50).on_pin(9) \
+        .sensor("BUTTON2").on_pin(10) \
+        .actuator("LED").on_pin(12) \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when("BUTTON1").has_value(HIGH).go_to_state("on") \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .when("BUTTON2").has_value(HIGH).go_to_state("off") \
+        .get_contents(GeneratorOptions(debounce=SENSOR_DEBOUNCE))
+    code = str(app)
+    assert "const unsigned long BUTTON1_debounce = 50;" in code
+    assert "const unsigned long BUTTON2_debounce = 200;" in code
+    assert "long debounce" not in code
+    assert code.count("millis()") == 2
+    assert "boolean guard = now - BUTTON1_time > BUTTON1_debounce;" in code
+    assert "BUTTON2_time = now; state_off();" in code
+
+
+def build_interrupt_app(pin, options=None):
+    """
+    Builds an app with a sensor captured by an interrupt handler.
+    """
+    return AppBuilder("Interrupt") \
+        .sensor("BUTTON").with_interrupt().on_pin(pin) \
+        .sensor("SWITCH").on_pin(9) \
+        .actuator("LED").on_pin(12) \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when("BUTTON").has_value(HIGH).go_to_state("on") \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .when("SWITCH").has_value(HIGH).go_to_state("off") \
+        .get_contents(options)
+
+
+def test_interrupt_sensor_latches_edges():
+    code = str(build_interrupt_app(2))
+    assert "volatile uint8_t sensor_edges = 0;" in code
+    assert "void BUTTON_isr() { sensor_edges |= digitalRead(BUTTON) == HIGH ? BUTTON_HIGH_EDGE : BUTTON_LOW_EDGE; }" \
+        in code
+    assert "attachInterrupt(digitalPinToInterrupt(BUTTON), BUTTON_isr, CHANGE);" in code
+    assert code.count("noInterrupts(); uint8_t edges = sensor_edges; interrupts();") == 2
+    assert "(digitalRead(BUTTON) == HIGH || (edges & BUTTON_HIGH_EDGE))" in code
+    # polling for the other sensors
+    assert "if (digitalRead(SWITCH) == HIGH && guard)" in code
+
+
+def test_interrupt_edges_survive_a_closed_guard():
+    code = str(build_interrupt_app(2))
+    # the edges of BUTTON are consumed only when its transition is evaluated with an open guard
+    assert "if (guard) { noInterrupts(); sensor_edges &= ~(edges & (BUTTON_HIGH_EDGE | BUTTON_LOW_EDGE)); " \
+           "interrupts(); }" in code
+    # and are kept while a state not reading BUTTON is active
+    assert code.split("void state_on()")[1].count("sensor_edges &=") == 0
+    code = str(build_interrupt_app(2, GeneratorOptions(debounce=SENSOR_DEBOUNCE)))
+    assert "if (now - BUTTON_time > BUTTON_debounce) { noInterrupts(); " \
+           "sensor_edges &= ~(edges & (BUTTON_HIGH_EDGE | BUTTON_LOW_EDGE)); interrupts(); }" in code
+
+
+def test_interrupt_sensor_rejects_pins_without_interrupt():
+    with pytest.raises(ValueError):
+        str(build_interrupt_app(9))
+
+
+def test_table_conditions_match_the_expressions():
+    app = build_dual_button_app()
+    transition = app.states[0].transition
+    for index in range(4):
+        values = {"BUTTON1": index & 1, "BUTTON2": index >> 1 & 1}
+        assert bool(transition.table()[0] >> index & 1) == transition.condition.holds(values)
+
+
+def test_table_conditions_replace_the_expressions():
+    code = str(build_dual_button_app(GeneratorOptions(conditions=TABLE_CONDITIONS)))
+    assert "const uint8_t condition_off[] PROGMEM = {0x0F};" in code
+    assert "uint8_t index = digitalRead(BUTTON1) | digitalRead(BUTTON2) << 1;" in code
+    assert "if (bitRead(pgm_read_byte(&condition_off[index >> 3]), index & 7) && guard)" in code
+    assert "const uint8_t condition_on[] PROGMEM = {0x02};" in code
+
+
+def test_auto_conditions_keep_cheap_expressions():
+    code = str(build_dual_button_app(GeneratorOptions(conditions=AUTO_CONDITIONS)))
+    assert "condition_off" in code
+    assert "condition_on" not in code
+
+
+def test_table_backend_encodes_the_app_into_tables():
+    app = build_dual_button_app(GeneratorOptions(backend=TABLE))
+    code = str(app)
+    assert "void state_" not in code
+    assert "const StateEntry STATES[] PROGMEM = {\n\t{0x1, 0x0, 0, 1},\n\t{0x1, 0x1, 1, 1}\n};" in code
+    assert "const TransitionEntry TRANSITIONS[] PROGMEM = {\n\t{1, 2, 0, 0},\n\t{0, 1, 2, 1}\n};" in code
+    assert "const uint8_t CONDITION_SENSORS[] PROGMEM = {0, 1, 0};" in code
+    assert "const uint8_t CONDITION_TABLES[] PROGMEM = {0x0F, 0x02};" in code
+    flash, ram = TableBackend(app).footprint()
+    assert "// expected usage: %d bytes of flash, %d bytes of RAM" % (flash, ram) in code
+
+
+def test_table_backend_grows_with_data():
+    builder = AppBuilder("Large").sensor("BUTTON").on_pin(9).actuator("LED").on_pin(12)
+    for index in range(300):
+        builder.state("s%d" % index).set("LED").to(index % 2) \
+            .when("BUTTON").has_value(HIGH).go_to_state("s%d" % ((index + 1) % 300))
+    app = builder.get_contents(GeneratorOptions(backend=TABLE))
+    assert "struct TransitionEntry { uint16_t next;" in str(app)
+    flash, ram = TableBackend(app).footprint()
+    # 5 bytes per state entry, 7 per transition entry, 1 condition sensor and 1 truth table byte per transition
+    assert flash < 300 * 14 + 500
+
+
+def test_table_backend_loop_index_reaches_the_number_of_transitions():
+    def build(count):
+        builder = AppBuilder("Ring").sensor("BUTTON").on_pin(9).actuator("LED").on_pin(12)
+        for index in range(count):
+            builder.state("s%d" % index).set("LED").to(index % 2) \
+                .when("BUTTON").has_value(HIGH).go_to_state("s%d" % ((index + 1) % count))
+        return TableBackend(builder.get_contents(GeneratorOptions(backend=TABLE)))
+
+    # with 256 transitions, an 8-bit index would wrap around before the end of the last state
+    assert build(255).transition_type == "uint8_t"
+    assert build(256).transition_type == "uint16_t"
+
+
+def test_table_backend_debounce_windows_beyond_16_bits():
+    app = AppBuilder("Slow") \
+        .sensor("BUTTON").with_debounce(70000).on_pin(9) \
+        .actuator("LED").on_pin(12) \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when("BUTTON").has_value(HIGH).go_to_state("on") \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .when("BUTTON").has_value(LOW).go_to_state("off") \
+        .get_contents(GeneratorOptions(backend=TABLE, debounce=SENSOR_DEBOUNCE))
+    code = str(app)
+    assert "const uint32_t SENSOR_DEBOUNCE[] PROGMEM = {70000};" in code
+    assert "pgm_read_dword(&SENSOR_DEBOUNCE[sensor])" in code
+
+
+def test_compact_declarations_minimize_ram():
+    app = build_dual_button_app(GeneratorOptions(declarations=COMPACT_DECLARATIONS, backend=LOOP))
+    code = str(app)
+    assert "const uint8_t BUTTON1 = 9;" in code
+    assert "int state" not in code and "int prev" not in code
+    assert "static unsigned long time = 0; const unsigned long debounce = 200;" in code
+    assert "static uint8_t current_state = STATE_off;" in code
+    assert app.ram_estimate() == 5
+    assert "// estimated static RAM: 5 bytes" in code
+    app.options = GeneratorOptions(backend=LOOP)
+    assert app.ram_estimate() == 2 * 3 + 4 + 8 + 1
+
+
+def build_prioritized_app(options=None):
+    """
+    Builds an app whose first state has several prioritized transitions sharing a sensor.
+    """
+    return AppBuilder("Prioritized") \
+        .sensor("BUTTON1").on_pin(9) \
+        .sensor("BUTTON2").on_pin(10) \
+        .actuator("LED").on_pin(12) \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when_all(("BUTTON1", HIGH), ("BUTTON2", HIGH)).go_to_state("both") \
+            .when("BUTTON1").has_value(HIGH).go_to_state("on") \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .when("BUTTON1").has_value(LOW).go_to_state("off") \
+        .state("both") \
+            .set("LED").to(HIGH) \
+            .when("BUTTON2").has_value(LOW).go_to_state("off") \
+        .get_contents(options)
+
+
+def test_prioritized_transitions_are_compiled_into_a_decision_tree():
+    app = build_prioritized_app()
+    assert [t.nextstate.name for t in app.states[0].transitions] == ["both", "on"]
+    code = str(app)
+    # BUTTON1 is read once for both transitions, and BUTTON2 only when BUTTON1 is HIGH
+    assert "\tif (guard) {\n\t\tif (digitalRead(BUTTON1) == HIGH) {\n" \
+           "\t\t\tif (digitalRead(BUTTON2) == HIGH) {\n\t\t\t\ttime = millis(); state_both();\n" \
+           "\t\t\t} else {\n\t\t\t\ttime = millis(); state_on();\n\t\t\t}\n" \
+           "\t\t} else {\n\t\t\tstate_off();\n\t\t}\n\t} else {\n\t\tstate_off();\n\t}" in code
+    assert code.count("digitalRead(BUTTON1)") == 2
+
+
+def test_prioritized_transitions_with_sensor_debounce_fall_through_blocked_guards():
+    code = str(build_prioritized_app(GeneratorOptions(debounce=SENSOR_DEBOUNCE, backend=LOOP)))
+    assert "if (now - BUTTON1_time > BUTTON1_debounce && now - BUTTON2_time > BUTTON2_debounce) {\n" \
+           "\t\t\t\tBUTTON1_time = now; BUTTON2_time = now; current_state = STATE_both;\n" \
+           "\t\t\t} else if (now - BUTTON1_time > BUTTON1_debounce) {\n" \
+           "\t\t\t\tBUTTON1_time = now; current_state = STATE_on;\n\t\t\t}" in code
+
+
+def test_table_backend_encodes_prioritized_transitions():
+    code = str(build_prioritized_app(GeneratorOptions(backend=TABLE)))
+    assert "const StateEntry STATES[] PROGMEM = {\n\t{0x1, 0x0, 0, 2},\n\t{0x1, 0x1, 2, 1},\n\t{0x1, 0x1, 3, 1}\n};" \
+        in code
+    assert "const TransitionEntry TRANSITIONS[] PROGMEM = {\n\t{2, 2, 0, 0},\n\t{1, 1, 2, 1}," in code
+
+
+def build_timed_app(options=None):
+    """
+    Builds an app whose "on" state falls back to "off" after 2 seconds.
+    """
+    return AppBuilder("Timed") \
+        .sensor("BUTTON").on_pin(9) \
+        .actuator("LED").on_pin(12) \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when("BUTTON").has_value(HIGH).go_to_state("on") \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .when("BUTTON").has_value(HIGH).go_to_state("off") \
+            .after(2, S).go_to_state("off") \
+        .get_contents(options)
+
+
+def test_time_transitions_compare_the_state_entry_timestamp_without_blocking():
+    app = build_timed_app()
+    assert app.states[1].transitions[1].delay == 2000
+    code = str(app)
+    assert "delay(" not in code
+    assert "unsigned long state_time = 0;" in code
+    # the timestamp is only recorded when entering a state with time transitions
+    assert "time = millis(); state_time = time; state_on();" in code
+    assert "time = millis(); state_off();" in code
+    assert "\tunsigned long elapsed = millis() - state_time;\n" in code
+    assert "\t} else {\n\t\tif (elapsed >= 2000) {\n\t\t\tstate_off();\n\t\t} else {\n\t\t\tstate_on();\n\t\t}\n\t}" in code
+    assert app.ram_estimate() == 2 * 2 + 4 + 8 + 4
+
+
+def test_time_transitions_with_sensor_debounce_use_the_poll_timestamp():
+    code = str(build_timed_app(GeneratorOptions(debounce=SENSOR_DEBOUNCE, backend=LOOP)))
+    assert "BUTTON_time = now; state_time = now; current_state = STATE_on;" in code
+    assert "\tunsigned long elapsed = now - state_time;\n" in code
+    with pytest.raises(ValueError):
+        str(build_timed_app(GeneratorOptions(backend=TABLE)))
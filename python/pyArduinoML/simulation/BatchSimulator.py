@@ -0,0 +1,245 @@
+"""
+Vectorized simulation of many traces of an app with NumPy.
+The app is lowered to integer transition arrays, as in the table backend, and all the traces advance in lockstep:
+the i-th event of every trace is applied at once, and the conditions are evaluated as element-wise boolean operations
+over the (traces x sensors) matrix of sensor values. The semantics are those of the Simulator.
+NumPy is an optional dependency, only needed by this module.
+"""
+
+import time
+
+try:
+    import numpy
+except ImportError:  # optional dependency
+    numpy = None
+
+from pyArduinoML.model.Sensor import Sensor, DEFAULT_DEBOUNCE
+from pyArduinoML.model.TimeTransition import TimeTransition
+from pyArduinoML.simulation.Simulator import MILLIS_MASK, random_trace
+
+
+class BatchResult:
+    """
+    Outcome of a batch simulation.
+
+    """
+
+    def __init__(self, names, states, visits, polls):
+        """
+        Constructor.
+
+        :param names: List[String], names of the states, by state index
+        :param states: numpy.ndarray[Integer], state of each trace at the end of the simulation
+        :param visits: numpy.ndarray[Integer], number of entries in each state (columns) of each trace (rows), the
+                       initial state included
+        :param polls: numpy.ndarray[Integer], number of polls of the state machine of each trace
+        :return:
+        """
+        self.names = names
+        self.states = states
+        self.visits = visits
+        self.polls = polls
+
+    def final_states(self):
+        """
+        Names of the states at the end of the simulation.
+
+        :return: List[String], one per trace
+        """
+        return [self.names[state] for state in self.states]
+
+    def histogram(self, trace):
+        """
+        Number of entries in each visited state of a trace, as SimulationResult.visits.
+
+        :param trace: Integer, index of the trace
+        :return: Map[String, Integer]
+        """
+        return dict([(self.names[state], int(count)) for state, count in enumerate(self.visits[trace]) if count])
+
+
+class BatchSimulator:
+    """
+    Batch simulator of an app.
+    Each trace is simulated from the initial state, sensors LOW and timestamps at 0, as Simulator.run does.
+
+    """
+
+    def __init__(self, app):
+        """
+        Constructor: lowers the app to transition arrays.
+
+        :param app: App, the app to simulate
+        :return:
+        :raises: ImportError, if NumPy is not installed
+        """
+        if numpy is None:
+            raise ImportError("The batch simulator requires NumPy")
+        self.app = app
+        self.sensor_debounce = app.options.sensor_debounce()
+        self.sensors = [brick for brick in app.bricks if isinstance(brick, Sensor)]  # List[Sensor]
+        self.sensor_ids = dict([(sensor.name, index) for index, sensor in enumerate(self.sensors)])
+        state_ids = dict([(state.name, index) for index, state in enumerate(app.states)])
+        self.names = [state.name for state in app.states]
+        # the transitions of each state are contiguous, by decreasing priority
+        transitions = [transition for state in app.states for transition in state.transitions]
+        self.first = numpy.zeros(len(app.states), dtype=numpy.int64)
+        self.count = numpy.zeros(len(app.states), dtype=numpy.int64)
+        first = 0
+        for index, state in enumerate(app.states):
+            self.first[index] = first
+            self.count[index] = len(state.transitions)
+            first += len(state.transitions)
+        # one extra entry, never fired, so that a state without a k-th transition can still be gathered
+        size = len(transitions) + 1
+        self.next = numpy.zeros(size, dtype=numpy.int64)
+        self.delay = numpy.zeros(size, dtype=numpy.int64)
+        self.timed = numpy.zeros(size, dtype=bool)
+        self.guards = numpy.zeros((size, len(self.sensors)), dtype=bool)  # sensors guarding each transition
+        self.conditions = []  # List[Function[numpy.ndarray, numpy.ndarray]], None for time transitions
+        for index, transition in enumerate(transitions):
+            self.next[index] = state_ids[transition.nextstate.name]
+            if isinstance(transition, TimeTransition):
+                self.timed[index] = True
+                self.delay[index] = transition.delay
+                self.conditions.append(None)
+                continue
+            for sensor in transition.sensors():
+                self.guards[index, self.sensor_ids[sensor.name]] = True
+            self.conditions.append(eval("lambda values: %s"
+                                        % transition.condition.python(self.sensor_ids, vectorized=True)))
+        self.windows = numpy.array([sensor.debounce for sensor in self.sensors], dtype=numpy.int64)
+        self.width = int(self.count.max()) if len(app.states) else 0  # maximum number of transitions of a state
+        self.max_polls = len(transitions) + 1
+
+    def pack(self, traces):
+        """
+        Packs traces into event matrices, shorter traces being padded with empty events.
+
+        :param traces: List[List[(Integer, String, SIGNAL)]], the traces, events by increasing time
+        :return: (numpy.ndarray, numpy.ndarray, numpy.ndarray), time, sensor index (-1 for padding) and value of
+                 each event (columns) of each trace (rows)
+        """
+        length = max([len(trace) for trace in traces] + [0])
+        times = numpy.zeros((len(traces), length), dtype=numpy.int64)
+        sensors = numpy.full((len(traces), length), -1, dtype=numpy.int64)
+        values = numpy.zeros((len(traces), length), dtype=numpy.int8)
+        for row, trace in enumerate(traces):
+            for column, (now, sensor, value) in enumerate(trace):
+                times[row, column] = now
+                sensors[row, column] = self.sensor_ids[sensor]
+                values[row, column] = value
+        return times, sensors, values
+
+    def run(self, traces):
+        """
+        Simulates the app against traces.
+
+        :param traces: List[List[(Integer, String, SIGNAL)]], the traces, events by increasing time
+        :return: BatchResult
+        """
+        return self.run_packed(*self.pack(traces))
+
+    def run_packed(self, times, sensors, values):
+        """
+        Simulates the app against packed traces (see pack).
+
+        :param times: numpy.ndarray[Integer], time of each event of each trace
+        :param sensors: numpy.ndarray[Integer], sensor set by each event of each trace, -1 for no event
+        :param values: numpy.ndarray[SIGNAL], value set by each event of each trace
+        :return: BatchResult
+        """
+        traces, length = sensors.shape
+        rows = numpy.arange(traces)
+        matrix = numpy.zeros((traces, len(self.sensors)), dtype=numpy.int8)  # sensor values of each trace
+        conditions = numpy.zeros((traces, len(self.next)), dtype=bool)  # conditions holding in each trace
+        state = numpy.zeros(traces, dtype=numpy.int64)
+        state_time = numpy.zeros(traces, dtype=numpy.int64)
+        debounce_time = numpy.zeros(traces, dtype=numpy.int64)
+        sensor_times = numpy.zeros((traces, len(self.sensors)), dtype=numpy.int64)
+        visits = numpy.zeros((traces, len(self.names)), dtype=numpy.int64)
+        polls = numpy.zeros(traces, dtype=numpy.int64)
+        if len(self.names):
+            visits[:, 0] = 1
+
+        for column in range(length):
+            event = sensors[:, column] >= 0
+            matrix[rows[event], sensors[event, column]] = values[event, column]
+            now = times[:, column]
+            # the sensor values are constant during the polls at the time of an event
+            for index, condition in enumerate(self.conditions):
+                if condition is not None:
+                    conditions[:, index] = condition(matrix)
+            active = event
+            for _ in range(self.max_polls):
+                if not active.any():
+                    break
+                polls += active
+                fired = self.step(rows, now, active, state, state_time, debounce_time, sensor_times, conditions)
+                visits[rows[fired], state[fired]] += 1
+                active = fired
+        return BatchResult(self.names, state, visits, polls)
+
+    def step(self, rows, now, active, state, state_time, debounce_time, sensor_times, conditions):
+        """
+        Polls the current state of the active traces once, updating their state and timestamps in place.
+
+        :param rows: numpy.ndarray[Integer], index of each trace
+        :param now: numpy.ndarray[Integer], current time of each trace
+        :param active: numpy.ndarray[Boolean], traces to poll
+        :param state: numpy.ndarray[Integer], current state of each trace
+        :param state_time: numpy.ndarray[Integer], state-entry timestamp of each trace
+        :param debounce_time: numpy.ndarray[Integer], global debounce timestamp of each trace
+        :param sensor_times: numpy.ndarray[Integer], per-sensor debounce timestamps of each trace
+        :param conditions: numpy.ndarray[Boolean], conditions holding in each trace, by transition
+        :return: numpy.ndarray[Boolean], traces in which a transition fired
+        """
+        pending = active.copy()
+        first = self.first[state]
+        count = self.count[state]
+        elapsed = (now - state_time) & MILLIS_MASK
+        if not self.sensor_debounce:
+            guard = (now - debounce_time) & MILLIS_MASK > DEFAULT_DEBOUNCE
+        for k in range(self.width):
+            candidate = pending & (k < count)
+            if not candidate.any():
+                break
+            transition = numpy.where(candidate, first + k, len(self.next) - 1)
+            timed = self.timed[transition]
+            holds = conditions[rows, transition]
+            if self.sensor_debounce:
+                guards = self.guards[transition]
+                expired = ((now[:, None] - sensor_times) & MILLIS_MASK) > self.windows
+                holds &= (expired | ~guards).all(axis=1)
+            else:
+                holds &= guard
+            fire = candidate & numpy.where(timed, elapsed >= self.delay[transition], holds)
+            if not fire.any():
+                continue
+            stamp = fire & ~timed
+            if self.sensor_debounce:
+                sensor_times[stamp] = numpy.where(guards[stamp], now[stamp, None], sensor_times[stamp])
+            else:
+                debounce_time[stamp] = now[stamp]
+            state[fire] = self.next[transition[fire]]
+            state_time[fire] = now[fire]
+            pending &= ~fire
+        return active & ~pending
+
+
+def benchmark(app, traces=1000, events=1000, seed=0):
+    """
+    Measures the batch simulation throughput of an app on random traces.
+
+    :param app: App, the app
+    :param traces: Integer, number of traces
+    :param events: Integer, number of events of each trace
+    :param seed: Integer, seed of the random generator of the first trace (the next ones use the next seeds)
+    :return: (Float, BatchResult), events per second (packing excluded) and outcome of the simulation
+    """
+    simulator = BatchSimulator(app)
+    packed = simulator.pack([random_trace(app, events, seed + index) for index in range(traces)])
+    start = time.perf_counter()
+    result = simulator.run_packed(*packed)
+    elapsed = time.perf_counter() - start
+    return traces * events / elapsed if elapsed > 0 else float("inf"), result
@@ -0,0 +1,263 @@
+"""
+Coverage of an app by simulated runs: entries of each state, firings of each transition, and values of each operand
+of the and/or conditions (each operand should be seen both true and false).
+The counts are preallocated integer arrays indexed by compact ids, so that recording is O(1) per state, transition and
+operand, and the coverage of runs in different worker processes is merged by adding the arrays.
+"""
+
+import json
+from array import array
+
+from pyArduinoML.model.Condition import AndCondition, BinaryExpression, NotCondition, OrCondition
+from pyArduinoML.model.GeneratorOptions import TABLE
+from pyArduinoML.model.TimeTransition import TimeTransition
+from pyArduinoML.simulation.Simulator import Simulator
+
+
+def _counts(count):
+    """
+    Preallocated array of counts.
+
+    :param count: Integer, number of counts
+    :return: array, all counts at 0
+    """
+    return array("q", bytes(8 * count))
+
+
+class Coverage:
+    """
+    Coverage counts of an app.
+
+    """
+
+    def __init__(self, name, states, transitions, operands):
+        """
+        Constructor: all counts at 0.
+
+        :param name: String, name of the app
+        :param states: List[String], names of the states
+        :param transitions: List[String], names of the transitions
+        :param operands: List[String], names of the operands
+        :return:
+        """
+        self.name = name
+        self.state_names = states
+        self.transition_names = transitions
+        self.operand_names = operands
+        self.states = _counts(len(states))  # entries of each state
+        self.transitions = _counts(len(transitions))  # firings of each transition
+        self.operands_true = _counts(len(operands))  # evaluations of each operand to true
+        self.operands_false = _counts(len(operands))  # evaluations of each operand to false
+
+    def merge(self, other):
+        """
+        Adds the counts of another coverage of the same app.
+
+        :param other: Coverage, the other coverage
+        :return: Coverage, self
+        :raises: ValueError, if the coverages are not of the same app
+        """
+        if (self.state_names, self.transition_names, self.operand_names) \
+                != (other.state_names, other.transition_names, other.operand_names):
+            raise ValueError("Cannot merge the coverages of different apps")
+        for mine, theirs in ((self.states, other.states), (self.transitions, other.transitions),
+                             (self.operands_true, other.operands_true), (self.operands_false, other.operands_false)):
+            for index, count in enumerate(theirs):
+                mine[index] += count
+        return self
+
+    def uncovered(self):
+        """
+        Parts of the app never exercised.
+
+        :return: Map[String, List[String]], states never entered, transitions never fired, operands never true and
+                 never false
+        """
+        return {
+            "states": [name for name, count in zip(self.state_names, self.states) if not count],
+            "transitions": [name for name, count in zip(self.transition_names, self.transitions) if not count],
+            "operands_never_true": [name for name, count in zip(self.operand_names, self.operands_true) if not count],
+            "operands_never_false": [name for name, count in zip(self.operand_names, self.operands_false)
+                                     if not count],
+        }
+
+    def ratios(self):
+        """
+        Ratio of the covered states, transitions, and operand values (true and false of each operand).
+
+        :return: Map[String, Float], 1.0 when there is nothing to cover
+        """
+        def ratio(covered, total):
+            return covered / float(total) if total else 1.0
+
+        return {
+            "states": ratio(sum(1 for count in self.states if count), len(self.states)),
+            "transitions": ratio(sum(1 for count in self.transitions if count), len(self.transitions)),
+            "operands": ratio(sum(1 for count in self.operands_true if count)
+                              + sum(1 for count in self.operands_false if count), 2 * len(self.operand_names)),
+        }
+
+    def to_dict(self):
+        """
+        Dictionary representation of the coverage.
+
+        :return: Map[String, Object]
+        """
+        return {
+            "app": self.name,
+            "states": dict(names=self.state_names, counts=self.states.tolist()),
+            "transitions": dict(names=self.transition_names, counts=self.transitions.tolist()),
+            "operands": dict(names=self.operand_names, true=self.operands_true.tolist(),
+                             false=self.operands_false.tolist()),
+        }
+
+    def to_json(self):
+        """
+        JSON representation of the coverage.
+
+        :return: String
+        """
+        return json.dumps(self.to_dict())
+
+    @staticmethod
+    def from_dict(data):
+        """
+        Coverage from its dictionary representation.
+
+        :param data: Map[String, Object], see to_dict
+        :return: Coverage
+        """
+        rtr = Coverage(data["app"], data["states"]["names"], data["transitions"]["names"], data["operands"]["names"])
+        rtr.states = array("q", data["states"]["counts"])
+        rtr.transitions = array("q", data["transitions"]["counts"])
+        rtr.operands_true = array("q", data["operands"]["true"])
+        rtr.operands_false = array("q", data["operands"]["false"])
+        return rtr
+
+    @staticmethod
+    def from_json(text):
+        """
+        Coverage from its JSON representation.
+
+        :param text: String, see to_json
+        :return: Coverage
+        """
+        return Coverage.from_dict(json.loads(text))
+
+
+class CoverageSimulator(Simulator):
+    """
+    Simulator recording the coverage of the app by its runs.
+    The coverage accumulates over the runs of the simulator.
+
+    """
+
+    def __init__(self, app):
+        """
+        Constructor: compiles the app, and numbers its states, transitions and operands.
+        Only the operands of the conditions generated as short-circuit chains are counted: decision trees and truth
+        tables read each sensor of a condition whatever the values of the others.
+
+        :param app: App, the app to simulate
+        :return:
+        """
+        options = app.options
+        self.transition_ids = []  # List[List[Integer]], id of each transition of each state
+        self.transition_names = []
+        self.names = {}  # Map[Integer, String], name of each transition, by Python id
+        self.chains = set()  # Set[Integer], Python ids of the transitions whose operands are counted
+        self.operand_names = []
+        for state in app.states:
+            ids = []
+            chain = options.backend != TABLE and state.decision_tree(options) is None
+            for index, transition in enumerate(state.transitions):
+                ids.append(len(self.transition_names))
+                self.names[id(transition)] = "%s[%d] -> %s" % (state.name, index, transition.nextstate.name)
+                self.transition_names.append(self.names[id(transition)])
+                if chain and not isinstance(transition, TimeTransition) and not transition.uses_table(options):
+                    self.chains.add(id(transition))
+            self.transition_ids.append(ids)
+        # the counts start after the construction (which enters the initial state)
+        self.coverage = None
+        Simulator.__init__(self, app)
+        self.coverage = Coverage(app.name, [state.name for state in app.states], self.transition_names,
+                                 self.operand_names)
+
+    def compile(self, transition):
+        """
+        Compiles a transition, with a condition counting the values of its operands.
+
+        :param transition: Transition, the transition
+        :return: see Simulator.compile
+        """
+        compiled = Simulator.compile(self, transition)
+        if id(transition) not in self.chains \
+                or not isinstance(transition.condition, (AndCondition, OrCondition, BinaryExpression, NotCondition)):
+            return compiled
+        return (self.counting(transition.condition, self.names[id(transition)]),) + compiled[1:]
+
+    def counting(self, condition, transition):
+        """
+        Compiles a condition into a function counting the values of the operands of its and/or conditions, in the
+        short-circuit order of the generated code: an operand that the program does not evaluate is not counted.
+        The operands are numbered in evaluation order.
+
+        :param condition: LogicalExpression, the condition
+        :param transition: String, name of the transition of the condition
+        :return: Function[List[SIGNAL], Boolean]
+        """
+        if isinstance(condition, NotCondition):
+            negated = self.counting(condition.condition, transition)
+            return lambda values: not negated(values)
+        if isinstance(condition, (AndCondition, OrCondition)):
+            conjunction = isinstance(condition, AndCondition)
+            terms = condition.conditions
+        elif isinstance(condition, BinaryExpression):
+            conjunction = condition.operator.lower() != "or"
+            terms = [condition.left, condition.right]
+        else:
+            return eval("lambda values: %s" % condition.python(self.sensor_ids))
+        operands = []
+        for term in terms:
+            index = len(self.operand_names)
+            self.operand_names.append("%s: %s" % (transition, term.evaluate()))
+            operands.append((index, self.counting(term, transition)))
+
+        def chain(values):
+            coverage = self.coverage
+            for index, test in operands:
+                if test(values):
+                    coverage.operands_true[index] += 1
+                    if not conjunction:
+                        return True
+                else:
+                    coverage.operands_false[index] += 1
+                    if conjunction:
+                        return False
+            return conjunction
+
+        return chain
+
+    def enter(self, state, now):
+        """
+        Enters a state, counting the entry (the initial state being entered at each reset).
+
+        :param state: Integer, the state
+        :param now: Integer, the current time
+        :return:
+        """
+        if self.coverage is not None:
+            self.coverage.states[state] += 1
+        Simulator.enter(self, state, now)
+
+    def fire(self, index, nextstate, now):
+        """
+        Fires a transition of the current state, counting the firing (see Simulator.fire).
+
+        :param index: Integer, index of the transition among the transitions of the current state
+        :param nextstate: Integer, the state entered
+        :param now: Integer, the current time
+        :return:
+        """
+        self.coverage.transitions[self.transition_ids[self.state][index]] += 1
+        Simulator.fire(self, index, nextstate, now)
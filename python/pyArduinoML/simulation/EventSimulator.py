@@ -0,0 +1,81 @@
+"""
+Discrete-event simulation of an app with a virtual millis() clock.
+The generated program polls its current state at each iteration of loop(), but with constant sensor values the outcome
+of a poll only changes when a debounce window or the delay of a time transition expires. The clock therefore jumps
+from one sensor change or timer expiry to the next, and the idle milliseconds in between are not simulated.
+"""
+
+from pyArduinoML.model.Sensor import DEFAULT_DEBOUNCE
+from pyArduinoML.simulation.Simulator import MILLIS_MASK, Simulator
+
+
+class EventSimulator(Simulator):
+    """
+    Simulator polling the state machine at the sensor changes and at the timer expiries, with the guards of
+    State.setup: a global debounce guard (millis() - time > debounce) or per-sensor guards (now - N_time >
+    N_debounce), and time transitions (elapsed >= delay).
+    The result is the one of a program polling at every millisecond.
+
+    """
+
+    def expiry(self, now):
+        """
+        Earliest time, after a poll at a given time, at which a transition of the current state can fire if the
+        sensor values do not change.
+
+        :param now: Integer, time of the last poll in milliseconds
+        :return: Integer, the time (None if no transition can fire)
+        """
+        rtr = None
+        values = self.values
+        for condition, nextstate, guards, delay in self.transitions[self.state]:
+            if condition is None:
+                remaining = delay - ((now - self.state_time) & MILLIS_MASK)
+            elif not condition(values):
+                continue
+            elif self.sensor_debounce:
+                remaining = max([self.windows[sensor] + 1 - ((now - self.sensor_times[sensor]) & MILLIS_MASK)
+                                 for sensor in guards] + [0])
+            else:
+                remaining = DEFAULT_DEBOUNCE + 1 - ((now - self.time) & MILLIS_MASK)
+            # a transition ready at the last poll was not tried (polls bounded): it is retried at the next millisecond
+            ready = now + max(remaining, 1)
+            if rtr is None or ready < rtr:
+                rtr = ready
+        return rtr
+
+    def advance(self, until):
+        """
+        Moves the clock forward, polling at each timer expiry.
+
+        :param until: Integer, time to move the clock to in milliseconds (included)
+        :return: Integer, number of timer expiries at which a transition fired
+        """
+        rtr = 0
+        expiry = self.expiry(self.now)
+        while expiry is not None and expiry <= until:
+            if self.poll(expiry):
+                rtr += 1
+            expiry = self.expiry(expiry)
+        self.now = max(self.now, until)
+        return rtr
+
+    def run(self, trace, until=None):
+        """
+        Simulates the app, from its initial state, against a trace.
+        At a time with both a timer expiry and a sensor change, the sensor change comes first.
+
+        :param trace: Iterable[(Integer, String, SIGNAL)], events setting the value of a sensor, by increasing time
+        :param until: Integer (optional), end of the simulation in milliseconds (default: time of the last event)
+        :return: SimulationResult
+        """
+        self.reset()
+        values = self.values
+        sensor_ids = self.sensor_ids
+        for now, sensor, value in trace:
+            self.advance(now - 1)
+            values[sensor_ids[sensor]] = value
+            self.poll(now)
+        if until is not None:
+            self.advance(until)
+        return self.result()
@@ -0,0 +1,326 @@
+"""
+Fleet of virtual boards multiplexed on one asyncio event loop, to load-test a backend against many simulated devices.
+Each board runs an app with the semantics of the generated program (EventSimulator), driven by its own input source.
+The changes of the actuators are sent through a bounded queue: when the consumer is slower than the boards, the boards
+wait for room in the queue (backpressure).
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from pyArduinoML.Scenarios import load_scenarios
+from pyArduinoML.model import SIGNAL
+from pyArduinoML.simulation.EventSimulator import EventSimulator
+from pyArduinoML.simulation.Simulator import random_trace
+
+DEFAULT_QUEUE_SIZE = 1024  # maximum number of output events waiting for the consumer
+
+
+def parse_event(line):
+    """
+    Parses an input event from a line "time sensor value", the value being HIGH, LOW, 1 or 0.
+
+    :param line: String, the line
+    :return: (Integer, String, SIGNAL), the event (None for a blank line or a comment starting with '#')
+    :raises: ValueError, if the line is not an event
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    fields = line.split()
+    if len(fields) != 3:
+        raise ValueError("Expected 'time sensor value', got '%s'" % line)
+    now, sensor, value = fields
+    if value.upper() in ("HIGH", "1"):
+        return int(now), sensor, SIGNAL.HIGH
+    if value.upper() in ("LOW", "0"):
+        return int(now), sensor, SIGNAL.LOW
+    raise ValueError("Unknown signal value '%s'" % value)
+
+
+async def iterable_source(events):
+    """
+    Input source of a board from an iterable (list or generator) of events.
+
+    :param events: Iterable[(Integer, String, SIGNAL)], the events, by increasing time
+    :return: AsyncIterator[(Integer, String, SIGNAL)]
+    """
+    for event in events:
+        yield event
+
+
+async def file_source(path):
+    """
+    Input source of a board from a file of events, one "time sensor value" line per event.
+
+    :param path: String, path of the file
+    :return: AsyncIterator[(Integer, String, SIGNAL)]
+    """
+    with open(path) as stream:
+        for line in stream:
+            event = parse_event(line)
+            if event is not None:
+                yield event
+
+
+async def stream_source(reader):
+    """
+    Input source of a board from an asyncio stream (e.g., a local socket), one "time sensor value" line per event.
+
+    :param reader: asyncio.StreamReader, the stream
+    :return: AsyncIterator[(Integer, String, SIGNAL)]
+    """
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        event = parse_event(line.decode())
+        if event is not None:
+            yield event
+
+
+class BoardStats:
+    """
+    Measures of a virtual board.
+
+    """
+
+    def __init__(self, name):
+        """
+        Constructor.
+
+        :param name: String, name of the board
+        :return:
+        """
+        self.name = name
+        self.events = 0  # input events processed
+        self.outputs = 0  # output events sent
+        self.elapsed = 0.0  # wall-clock seconds from the start to the end of the input
+        self.lag_total = 0.0  # seconds between the scheduled and the actual resumption of the board, summed
+        self.lag_max = 0.0
+        self.lag_count = 0
+
+    def lag(self, seconds):
+        """
+        Records a scheduling lag.
+
+        :param seconds: Float, the lag
+        :return:
+        """
+        self.lag_total += seconds
+        self.lag_count += 1
+        if seconds > self.lag_max:
+            self.lag_max = seconds
+
+    def throughput(self):
+        """
+        Input events processed per second.
+
+        :return: Float
+        """
+        return self.events / self.elapsed if self.elapsed > 0 else 0.0
+
+    def mean_lag(self):
+        """
+        Mean scheduling lag in seconds.
+
+        :return: Float
+        """
+        return self.lag_total / self.lag_count if self.lag_count else 0.0
+
+    def to_dict(self):
+        """
+        Dictionary representation of the measures.
+
+        :return: Map[String, Object]
+        """
+        return {"board": self.name, "events": self.events, "outputs": self.outputs,
+                "throughput": self.throughput(), "mean_lag": self.mean_lag(), "max_lag": self.lag_max}
+
+
+class VirtualBoard:
+    """
+    Virtual board running an app.
+    The board yields to the event loop before each input event: either until the time of the event, scaled by a
+    speed factor, or immediately when replaying as fast as possible. The scheduling lag is the delay between the
+    time the board asked to resume at and the time it actually resumed.
+
+    """
+
+    def __init__(self, name, app, source):
+        """
+        Constructor.
+
+        :param name: String, name of the board, tagging its output events
+        :param app: App, the app run by the board
+        :param source: AsyncIterable[(Integer, String, SIGNAL)], the input events, by increasing time
+        :return:
+        """
+        self.name = name
+        self.app = app
+        self.source = source
+        self.simulator = EventSimulator(app)
+        self.stats = BoardStats(name)
+
+    async def flush(self, queue):
+        """
+        Sends the pending changes of the actuators to the output queue, waiting for room in the queue.
+
+        :param queue: asyncio.Queue, the output queue of (board, time, actuator, SIGNAL) events
+        :return:
+        """
+        changes = self.simulator.changes
+        for now, actuator, value in changes:
+            await queue.put((self.name, now, actuator, value))
+        self.stats.outputs += len(changes)
+        # the trace of the simulation is not kept, so that long runs use constant memory
+        del changes[:]
+        del self.simulator.visited[:]
+
+    async def run(self, queue, speed=None, start=None):
+        """
+        Runs the board until the end of its input.
+
+        :param queue: asyncio.Queue, the output queue of (board, time, actuator, SIGNAL) events
+        :param speed: Float (optional), virtual milliseconds per wall-clock millisecond (default: as fast as
+                      possible)
+        :param start: Float (optional), loop time of the virtual time 0 (default: now)
+        :return: BoardStats, the measures of the board
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time() if start is None else start
+        simulator = self.simulator
+        stats = self.stats
+        simulator.reset()
+        await self.flush(queue)
+        async for now, sensor, value in self.source:
+            target = start + now / 1000.0 / speed if speed else loop.time()
+            await asyncio.sleep(max(target - loop.time(), 0))
+            stats.lag(max(loop.time() - target, 0.0))
+            simulator.advance(now - 1)
+            simulator.set(sensor, value)
+            simulator.poll(now)
+            stats.events += 1
+            await self.flush(queue)
+        stats.elapsed = loop.time() - start
+        return stats
+
+
+class Fleet:
+    """
+    Fleet of virtual boards sharing an event loop and an output queue.
+
+    """
+
+    def __init__(self, queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        Constructor.
+
+        :param queue_size: Integer, maximum number of output events waiting for the consumer
+        :return:
+        """
+        self.queue_size = queue_size
+        self.boards = []
+
+    def add(self, name, app, source):
+        """
+        Adds a board.
+
+        :param name: String, name of the board
+        :param app: App, the app run by the board
+        :param source: AsyncIterable[(Integer, String, SIGNAL)], the input events of the board
+        :return: VirtualBoard, the board
+        """
+        board = VirtualBoard(name, app, source)
+        self.boards.append(board)
+        return board
+
+    async def run(self, sink=None, speed=None):
+        """
+        Runs all the boards until the end of their inputs, while a consumer drains the output queue.
+
+        :param sink: Function[(String, Integer, String, SIGNAL), Awaitable] (optional), coroutine function consuming
+                     each output event (default: output events are dropped)
+        :param speed: Float (optional), virtual milliseconds per wall-clock millisecond (default: as fast as
+                      possible)
+        :return: List[BoardStats], the measures of each board
+        """
+        queue = asyncio.Queue(self.queue_size)
+        done = object()
+
+        async def consume():
+            while True:
+                event = await queue.get()
+                if event is done:
+                    return
+                if sink is not None:
+                    await sink(*event)
+
+        consumer = asyncio.ensure_future(consume())
+        start = asyncio.get_running_loop().time()
+        try:
+            rtr = await asyncio.gather(*[board.run(queue, speed, start) for board in self.boards])
+            await queue.put(done)
+            await consumer
+        finally:
+            consumer.cancel()
+        return rtr
+
+
+def print_report(stats):
+    """
+    Prints the measures of the boards of a fleet.
+
+    :param stats: List[BoardStats], the measures
+    :return:
+    """
+    print("%-24s %10s %10s %14s %12s %12s" % ("board", "events", "outputs", "events/s", "mean lag ms", "max lag ms"))
+    for board in stats:
+        print("%-24s %10d %10d %14.0f %12.3f %12.3f" % (board.name, board.events, board.outputs, board.throughput(),
+                                                         1000 * board.mean_lag(), 1000 * board.lag_max))
+
+
+def main(argv=None):
+    """
+    Command line: fleet of boards running the scenarios (functions starting with 'scenario') of a Python file on
+    random inputs.
+
+    :param argv: List[String] (optional), the arguments (default: sys.argv)
+    :return: Integer, exit status
+    """
+    parser = argparse.ArgumentParser(description="Fleet simulation of ArduinoML scenarios")
+    parser.add_argument("file", help="Python file containing scenario functions returning apps")
+    parser.add_argument("--boards", type=int, default=100, help="number of boards")
+    parser.add_argument("--events", type=int, default=1000, help="number of random input events per board")
+    parser.add_argument("--queue", type=int, default=DEFAULT_QUEUE_SIZE, help="size of the output queue")
+    parser.add_argument("--speed", type=float, default=None,
+                        help="virtual milliseconds per wall-clock millisecond (default: as fast as possible)")
+    args = parser.parse_args(argv)
+
+    apps = load_scenarios(args.file)
+    if not apps:
+        print("No scenario in %s" % args.file)
+        return 1
+
+    fleet = Fleet(args.queue)
+    for index in range(args.boards):
+        app = apps[index % len(apps)]
+        fleet.add("%s-%d" % (app.name, index), app, iterable_source(random_trace(app, args.events, index)))
+    start = time.perf_counter()
+    stats = asyncio.run(fleet.run(speed=args.speed))
+    elapsed = time.perf_counter() - start
+
+    print("=" * 88)
+    print("ArduinoML Fleet Simulation (%d boards, %d events per board)" % (args.boards, args.events))
+    print("=" * 88)
+    print_report(stats)
+    print("=" * 88)
+    print("%d events in %.3f s (%.0f events/s)" % (sum(board.events for board in stats), elapsed,
+                                                   sum(board.events for board in stats) / elapsed))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
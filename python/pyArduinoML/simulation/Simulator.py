@@ -0,0 +1,299 @@
+"""
+Host-side simulation of an app against a trace of timestamped sensor values, without hardware.
+The state machine is stepped with the semantics of the generated program: transitions tried by priority, debounce
+guards (global or per sensor, as in the generation options), and time transitions compared to the state-entry
+timestamp. The conditions are compiled once into Python closures.
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from pyArduinoML.Scenarios import load_scenarios
+from pyArduinoML.model import SIGNAL
+from pyArduinoML.model.Actuator import Actuator
+from pyArduinoML.model.Sensor import Sensor, DEFAULT_DEBOUNCE
+from pyArduinoML.model.TimeTransition import TimeTransition
+
+MILLIS_MASK = 0xFFFFFFFF  # millis() is an unsigned 32-bit counter, the differences of timestamps wrap around
+
+
+class SimulationResult:
+    """
+    Outcome of a simulation.
+
+    """
+
+    def __init__(self, states, outputs, state, polls):
+        """
+        Constructor.
+
+        :param states: List[(Integer, String)], entered states with their entry time, the initial state included
+        :param outputs: List[(Integer, String, SIGNAL)], changes of the actuator values, with their time
+        :param state: String, state at the end of the simulation
+        :param polls: Integer, number of polls of the state machine
+        :return:
+        """
+        self.states = states
+        self.outputs = outputs
+        self.state = state
+        self.polls = polls
+
+    def visits(self):
+        """
+        Number of entries in each state.
+
+        :return: Map[String, Integer]
+        """
+        rtr = {}
+        for _, state in self.states:
+            rtr[state] = rtr.get(state, 0) + 1
+        return rtr
+
+
+class Simulator:
+    """
+    Simulator of an app.
+    Each event of a trace sets the value of a sensor, then the state machine is polled at the time of the event
+    (and polled again while transitions fire, as the generated program immediately polls the state it enters).
+    Between two events, the sensor values are constant, so the program would only fire transitions when a debounce
+    window or a delay expires: these polls are not simulated (see EventSimulator).
+
+    """
+
+    def __init__(self, app):
+        """
+        Constructor: compiles the app.
+
+        :param app: App, the app to simulate
+        :return:
+        """
+        self.app = app
+        self.options = app.options
+        self.sensors = [brick for brick in app.bricks if isinstance(brick, Sensor)]  # List[Sensor]
+        self.actuators = [brick for brick in app.bricks if isinstance(brick, Actuator)]  # List[Actuator]
+        self.sensor_ids = dict([(sensor.name, index) for index, sensor in enumerate(self.sensors)])
+        self.state_ids = dict([(state.name, index) for index, state in enumerate(app.states)])
+        actuator_ids = dict([(actuator.name, index) for index, actuator in enumerate(self.actuators)])
+        self.sensor_debounce = self.options.sensor_debounce()
+        self.windows = [sensor.debounce for sensor in self.sensors]  # List[Integer], debounce window of each sensor
+        # compiled states: actions (actuator, value) and transitions (condition, next state, guard sensors, delay)
+        self.actions = []
+        self.transitions = []
+        for state in app.states:
+            self.actions.append(tuple([(actuator_ids[action.brick.name], action.value) for action in state.actions]))
+            self.transitions.append(tuple([self.compile(transition) for transition in state.transitions]))
+        # a transition over no sensor can fire at each poll: bound the polls at a single time
+        self.max_polls = sum(len(transitions) for transitions in self.transitions) + 1
+        self.reset()
+
+    def compile(self, transition):
+        """
+        Compiles a transition.
+
+        :param transition: Transition, the transition
+        :return: (Function[List[SIGNAL], Boolean], Integer, Tuple[Integer], Integer), condition over the sensor
+                 values (None for a time transition), next state, sensors whose debounce windows guard the transition,
+                 delay (time transitions, 0 otherwise)
+        """
+        nextstate = self.state_ids[transition.nextstate.name]
+        if isinstance(transition, TimeTransition):
+            return None, nextstate, (), transition.delay
+        condition = eval("lambda values: %s" % transition.condition.python(self.sensor_ids))
+        guards = tuple([self.sensor_ids[sensor.name] for sensor in transition.sensors()])
+        return condition, nextstate, guards, 0
+
+    def reset(self, now=0):
+        """
+        Resets the board: initial state entered, sensors LOW, timestamps at the given time.
+
+        :param now: Integer, time of the reset in milliseconds
+        :return:
+        """
+        self.now = now
+        self.values = [SIGNAL.LOW] * len(self.sensors)  # List[SIGNAL], value of each sensor
+        self.outputs = [None] * len(self.actuators)  # List[SIGNAL], value of each actuator (None before any write)
+        self.time = 0  # global debounce timestamp
+        self.sensor_times = [0] * len(self.sensors)  # per-sensor debounce timestamps
+        self.state_time = 0  # state-entry timestamp
+        self.state = 0
+        self.polls = 0
+        self.visited = []
+        self.changes = []
+        self.enter(0, now)
+
+    def enter(self, state, now):
+        """
+        Enters a state, and runs its actions.
+
+        :param state: Integer, the state
+        :param now: Integer, the current time
+        :return:
+        """
+        self.state = state
+        self.state_time = now
+        self.visited.append((now, self.app.states[state].name))
+        outputs = self.outputs
+        for actuator, value in self.actions[state]:
+            if outputs[actuator] != value:
+                outputs[actuator] = value
+                self.changes.append((now, self.actuators[actuator].name, value))
+
+    def set(self, sensor, value):
+        """
+        Sets the value of a sensor.
+
+        :param sensor: String, name of the sensor
+        :param value: SIGNAL, the value
+        :return:
+        """
+        self.values[self.sensor_ids[sensor]] = value
+
+    def step(self, now):
+        """
+        Polls the current state once, as the generated state function does.
+
+        :param now: Integer, the current time in milliseconds
+        :return: Boolean, True if a transition fired
+        """
+        self.polls += 1
+        values = self.values
+        if not self.sensor_debounce:
+            guard = (now - self.time) & MILLIS_MASK > DEFAULT_DEBOUNCE
+        for index, (condition, nextstate, guards, delay) in enumerate(self.transitions[self.state]):
+            if condition is None:
+                if (now - self.state_time) & MILLIS_MASK < delay:
+                    continue
+            elif self.sensor_debounce:
+                times = self.sensor_times
+                windows = self.windows
+                if not condition(values) \
+                        or not all((now - times[sensor]) & MILLIS_MASK > windows[sensor] for sensor in guards):
+                    continue
+                for sensor in guards:
+                    times[sensor] = now
+            else:
+                if not guard or not condition(values):
+                    continue
+                self.time = now
+            self.fire(index, nextstate, now)
+            return True
+        return False
+
+    def fire(self, index, nextstate, now):
+        """
+        Fires a transition of the current state, once its condition and guard hold and its timestamps are updated.
+
+        :param index: Integer, index of the transition among the transitions of the current state
+        :param nextstate: Integer, the state entered
+        :param now: Integer, the current time
+        :return:
+        """
+        self.enter(nextstate, now)
+
+    def poll(self, now):
+        """
+        Polls the state machine at a time, until no transition fires.
+
+        :param now: Integer, the current time in milliseconds (not before the previous poll)
+        :return: Boolean, True if a transition fired
+        """
+        self.now = now
+        polls = 0
+        while polls < self.max_polls and self.step(now):
+            polls += 1
+        return polls > 0
+
+    def result(self):
+        """
+        Outcome of the simulation so far.
+
+        :return: SimulationResult
+        """
+        return SimulationResult(self.visited, self.changes, self.app.states[self.state].name, self.polls)
+
+    def run(self, trace):
+        """
+        Simulates the app, from its initial state, against a trace.
+
+        :param trace: Iterable[(Integer, String, SIGNAL)], events setting the value of a sensor, by increasing time
+        :return: SimulationResult
+        """
+        self.reset()
+        values = self.values
+        sensor_ids = self.sensor_ids
+        step = self.step
+        max_polls = self.max_polls
+        now = self.now
+        for now, sensor, value in trace:
+            values[sensor_ids[sensor]] = value
+            polls = 0
+            while polls < max_polls and step(now):
+                polls += 1
+        self.now = now
+        return self.result()
+
+
+def random_trace(app, events, seed=0, max_gap=50):
+    """
+    Random trace over the sensors of an app.
+
+    :param app: App, the app
+    :param events: Integer, number of events
+    :param seed: Integer, seed of the random generator
+    :param max_gap: Integer, maximum time between two events in milliseconds
+    :return: List[(Integer, String, SIGNAL)]
+    """
+    generator = random.Random(seed)
+    names = [brick.name for brick in app.bricks if isinstance(brick, Sensor)]
+    rtr = []
+    now = 0
+    for _ in range(events if names else 0):
+        now += generator.randint(1, max_gap)
+        rtr.append((now, generator.choice(names), generator.randint(SIGNAL.LOW, SIGNAL.HIGH)))
+    return rtr
+
+
+def benchmark(app, events=1000000, seed=0):
+    """
+    Measures the simulation throughput of an app on a random trace.
+
+    :param app: App, the app
+    :param events: Integer, number of events of the trace
+    :param seed: Integer, seed of the random generator
+    :return: (Float, SimulationResult), events per second and outcome of the simulation
+    """
+    trace = random_trace(app, events, seed)
+    simulator = Simulator(app)
+    start = time.perf_counter()
+    result = simulator.run(trace)
+    elapsed = time.perf_counter() - start
+    return len(trace) / elapsed if elapsed > 0 else float("inf"), result
+
+
+def main(argv=None):
+    """
+    Command line: simulation throughput of all the scenarios (functions starting with 'scenario') of a Python file.
+
+    :param argv: List[String] (optional), the arguments (default: sys.argv)
+    :return: Integer, exit status
+    """
+    parser = argparse.ArgumentParser(description="Simulation benchmark of ArduinoML scenarios")
+    parser.add_argument("file", help="Python file containing scenario functions returning apps")
+    parser.add_argument("--events", type=int, default=1000000, help="number of events of the random traces")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random traces")
+    args = parser.parse_args(argv)
+
+    print("=" * 80)
+    print("ArduinoML Simulation Benchmark (%d events per scenario)" % args.events)
+    print("=" * 80)
+    for app in load_scenarios(args.file):
+        rate, result = benchmark(app, args.events, args.seed)
+        print("%-24s %12.0f events/s %10d transitions" % (app.name, rate, len(result.states) - 1))
+    print("=" * 80)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Tests for the vectorized batch simulation of apps
+"""
+
+import pytest
+
+from pyArduinoML.methodchaining.AppBuilder import AppBuilder
+from pyArduinoML.model.GeneratorOptions import GeneratorOptions, SENSOR_DEBOUNCE
+from pyArduinoML.model.SIGNAL import HIGH, LOW
+from pyArduinoML.simulation.Simulator import Simulator, random_trace
+from pyArduinoML.simulation.test_simulator import build_switch_app
+
+numpy = pytest.importorskip("numpy")
+
+from pyArduinoML.simulation.BatchSimulator import BatchSimulator  # noqa: E402
+
+
+def build_alarm_app(options=None):
+    """
+    Builds an app with composite conditions and prioritized transitions.
+    """
+    return AppBuilder("Alarm") \
+        .sensor("DOOR").on_pin(8) \
+        .sensor("KEY").with_debounce(20).on_pin(9) \
+        .sensor("PANIC").on_pin(10) \
+        .actuator("SIREN").on_pin(12) \
+        .state("armed") \
+            .set("SIREN").to(LOW) \
+            .when_any(("PANIC", HIGH), ("DOOR", HIGH)).go_to_state("alarm") \
+            .when("KEY").has_value(HIGH).go_to_state("disarmed") \
+        .state("alarm") \
+            .set("SIREN").to(HIGH) \
+            .when_all(("KEY", HIGH), ("PANIC", LOW)).go_to_state("disarmed") \
+        .state("disarmed") \
+            .set("SIREN").to(LOW) \
+            .when("KEY").has_value(LOW).go_to_state("armed") \
+        .get_contents(options)
+
+
+@pytest.mark.parametrize("build", [build_switch_app, build_alarm_app])
+@pytest.mark.parametrize("debounce", [None, SENSOR_DEBOUNCE])
+def test_batch_simulation_matches_the_simulator(build, debounce):
+    app = build(GeneratorOptions(debounce=debounce) if debounce else None)
+    traces = [random_trace(app, 200 + 10 * seed, seed, max_gap=150) for seed in range(20)]
+    result = BatchSimulator(app).run(traces)
+    for index, trace in enumerate(traces):
+        expected = Simulator(app).run(trace)
+        assert result.final_states()[index] == expected.state
+        assert result.histogram(index) == expected.visits()
+        assert result.polls[index] == expected.polls
+
+
+def test_empty_traces_stay_in_the_initial_state():
+    result = BatchSimulator(build_switch_app()).run([[], [(300, "BUTTON", HIGH)]])
+    assert result.final_states() == ["off", "on"]
+    assert result.visits.tolist() == [[1, 0], [1, 1]]
@@ -0,0 +1,91 @@
+"""
+Tests for the coverage of apps by simulated runs
+"""
+
+import pytest
+
+from pyArduinoML.methodchaining.AppBuilder import AppBuilder
+from pyArduinoML.model.GeneratorOptions import GeneratorOptions, TABLE_CONDITIONS
+from pyArduinoML.model.SIGNAL import HIGH, LOW
+from pyArduinoML.simulation.Coverage import Coverage, CoverageSimulator
+
+from pyArduinoML.simulation.test_simulator import build_switch_app
+
+
+def build_dual_app():
+    """
+    Builds an app switched on by two buttons pressed together.
+    """
+    return AppBuilder("Dual") \
+        .sensor("BUTTON1").on_pin(9) \
+        .sensor("BUTTON2").on_pin(10) \
+        .actuator("LED").on_pin(12) \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when_all(("BUTTON1", HIGH), ("BUTTON2", HIGH)).go_to_state("on") \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .when("BUTTON1").has_value(LOW).go_to_state("off") \
+        .get_contents()
+
+
+def test_records_states_transitions_and_operands():
+    simulator = CoverageSimulator(build_dual_app())
+    simulator.run([(300, "BUTTON1", HIGH)])
+    coverage = simulator.coverage
+    assert list(coverage.states) == [1, 0]
+    assert list(coverage.transitions) == [0, 0]
+    assert coverage.operand_names == ["off[0] -> on: digitalRead(BUTTON1) == HIGH",
+                                      "off[0] -> on: digitalRead(BUTTON2) == HIGH"]
+    assert (list(coverage.operands_true), list(coverage.operands_false)) == ([1, 0], [0, 1])
+    assert coverage.uncovered() == {"states": ["on"], "transitions": ["off[0] -> on", "on[0] -> off"],
+                                    "operands_never_true": ["off[0] -> on: digitalRead(BUTTON2) == HIGH"],
+                                    "operands_never_false": ["off[0] -> on: digitalRead(BUTTON1) == HIGH"]}
+
+    simulator.run([(300, "BUTTON1", HIGH), (301, "BUTTON2", HIGH), (600, "BUTTON1", LOW)])
+    assert list(coverage.states) == [3, 1]
+    assert list(coverage.transitions) == [1, 1]
+    # BUTTON1 was always HIGH when the condition of "off" was evaluated
+    assert coverage.ratios() == {"states": 1.0, "transitions": 1.0, "operands": 0.75}
+
+
+def test_operands_skipped_by_short_circuits_are_not_counted():
+    simulator = CoverageSimulator(build_dual_app())
+    # BUTTON1 is LOW: the generated && never reads BUTTON2
+    simulator.run([(300, "BUTTON2", HIGH)])
+    coverage = simulator.coverage
+    assert (list(coverage.operands_true), list(coverage.operands_false)) == ([0, 0], [1, 0])
+
+
+def test_operands_of_decision_trees_and_truth_tables_are_not_counted():
+    def build(options=None):
+        return AppBuilder("Tree") \
+            .sensor("BUTTON1").on_pin(9) \
+            .sensor("BUTTON2").on_pin(10) \
+            .actuator("LED").on_pin(12) \
+            .state("off") \
+                .set("LED").to(LOW) \
+                .when_all(("BUTTON1", HIGH), ("BUTTON2", HIGH)).go_to_state("on") \
+                .when_any(("BUTTON1", LOW), ("BUTTON2", LOW)).go_to_state("off") \
+            .state("on") \
+                .set("LED").to(HIGH) \
+                .when_all(("BUTTON1", LOW), ("BUTTON2", LOW)).go_to_state("off") \
+            .get_contents(options)
+
+    # "off" is dispatched by a decision tree reading each sensor once
+    assert [name.split(":")[0] for name in CoverageSimulator(build()).coverage.operand_names] \
+        == ["on[0] -> off", "on[0] -> off"]
+    assert CoverageSimulator(build(GeneratorOptions(conditions=TABLE_CONDITIONS))).coverage.operand_names == []
+
+
+def test_merges_coverages_exported_as_json():
+    first = CoverageSimulator(build_switch_app())
+    first.run([(300, "BUTTON", HIGH)])
+    second = CoverageSimulator(build_switch_app())
+    second.run([(300, "BUTTON", HIGH), (600, "STOP", HIGH)])
+    merged = Coverage.from_json(first.coverage.to_json()).merge(Coverage.from_json(second.coverage.to_json()))
+    assert list(merged.states) == [3, 2]
+    assert list(merged.transitions) == [2, 1, 0]
+    assert merged.uncovered()["transitions"] == ["on[1] -> off"]
+    with pytest.raises(ValueError):
+        merged.merge(CoverageSimulator(build_dual_app()).coverage)
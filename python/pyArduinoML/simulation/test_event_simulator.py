@@ -0,0 +1,63 @@
+"""
+Tests for the discrete-event simulation of apps
+"""
+
+import pytest
+
+from pyArduinoML.methodchaining.AppBuilder import AppBuilder
+from pyArduinoML.model.GeneratorOptions import GeneratorOptions, SENSOR_DEBOUNCE
+from pyArduinoML.model.SIGNAL import HIGH, LOW
+from pyArduinoML.model.TimeUnit import S
+from pyArduinoML.simulation.EventSimulator import EventSimulator
+from pyArduinoML.simulation.Simulator import Simulator, random_trace
+from pyArduinoML.simulation.test_simulator import build_switch_app
+
+
+def simulate_every_millisecond(app, trace, until):
+    """
+    Reference simulation: the state machine is polled at every millisecond, as the generated program does.
+    """
+    simulator = Simulator(app)
+    events = {}
+    for now, sensor, value in trace:
+        events.setdefault(now, []).append((sensor, value))
+    for now in range(until + 1):
+        for sensor, value in events.get(now, []):
+            simulator.set(sensor, value)
+        simulator.poll(now)
+    return simulator.result()
+
+
+@pytest.mark.parametrize("debounce", [None, SENSOR_DEBOUNCE])
+def test_event_simulation_matches_polling_every_millisecond(debounce):
+    app = build_switch_app(GeneratorOptions(debounce=debounce) if debounce else None)
+    for seed in range(5):
+        trace = random_trace(app, 40, seed, max_gap=400)
+        until = trace[-1][0] + 3000
+        expected = simulate_every_millisecond(app, trace, until)
+        result = EventSimulator(app).run(trace, until)
+        assert result.states == expected.states
+        assert result.outputs == expected.outputs
+
+
+def test_held_sensor_fires_when_the_debounce_window_expires():
+    result = EventSimulator(build_switch_app()).run([(100, "BUTTON", HIGH)], until=3000)
+    # the global guard opens after 200 ms; the time transition fires 2 s later without stamping the guard, so that
+    # the held button immediately switches the LED on again
+    assert result.states == [(0, "off"), (201, "on"), (2201, "off"), (2201, "on")]
+
+
+def test_days_of_device_time_are_simulated_without_ticks():
+    app = AppBuilder("Blink") \
+        .actuator("LED").on_pin(12) \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .after(1, S).go_to_state("off") \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .after(1, S).go_to_state("on") \
+        .get_contents()
+    result = EventSimulator(app).run([], until=24 * 3600 * 1000)
+    assert len(result.states) == 24 * 3600 + 1
+    assert result.state == "on"
+    assert result.polls == 24 * 3600 * 2
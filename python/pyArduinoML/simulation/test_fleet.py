@@ -0,0 +1,68 @@
+"""
+Tests for the fleet simulation of virtual boards
+"""
+
+import asyncio
+
+import pytest
+
+from pyArduinoML.model.SIGNAL import HIGH, LOW
+from pyArduinoML.simulation.EventSimulator import EventSimulator
+from pyArduinoML.simulation.Fleet import Fleet, file_source, iterable_source, parse_event, stream_source
+from pyArduinoML.simulation.Simulator import random_trace
+from pyArduinoML.simulation.test_simulator import build_switch_app
+
+
+def test_parse_event():
+    assert parse_event("300 BUTTON HIGH") == (300, "BUTTON", HIGH)
+    assert parse_event("  600 STOP 0\n") == (600, "STOP", LOW)
+    assert parse_event("# comment") is None
+    with pytest.raises(ValueError):
+        parse_event("300 BUTTON")
+
+
+def test_boards_send_the_outputs_of_their_own_inputs(tmp_path):
+    app = build_switch_app()
+    traces = [random_trace(app, 50, seed, max_gap=300) for seed in range(3)]
+    path = tmp_path / "board1.txt"
+    path.write_text("\n".join(["%d %s %d" % event for event in traces[1]]))
+
+    async def simulate():
+        reader = asyncio.StreamReader()  # stands in for a local socket
+        reader.feed_data("".join(["%d %s %d\n" % event for event in traces[2]]).encode())
+        reader.feed_eof()
+        fleet = Fleet(queue_size=1)  # the boards wait for the consumer at each output
+        fleet.add("board0", app, iterable_source(traces[0]))
+        fleet.add("board1", app, file_source(str(path)))
+        fleet.add("board2", app, stream_source(reader))
+        received = []
+
+        async def sink(board, now, actuator, value):
+            await asyncio.sleep(0)
+            received.append((board, now, actuator, value))
+
+        return await fleet.run(sink), received
+
+    stats, received = asyncio.run(simulate())
+    for index, trace in enumerate(traces):
+        simulator = EventSimulator(app)
+        expected = simulator.run(trace).outputs
+        board = "board%d" % index
+        assert [event[1:] for event in received if event[0] == board] == expected
+        assert stats[index].name == board
+        assert stats[index].events == len(trace)
+        assert stats[index].outputs == len(expected)
+        assert stats[index].throughput() > 0
+
+
+def test_boards_follow_the_virtual_time_at_the_given_speed():
+    app = build_switch_app()
+
+    async def simulate():
+        fleet = Fleet()
+        fleet.add("board", app, iterable_source([(300, "BUTTON", HIGH), (600, "BUTTON", LOW)]))
+        return await fleet.run(speed=20.0)
+
+    stats = asyncio.run(simulate())
+    assert stats[0].elapsed >= 0.6 / 20
+    assert stats[0].lag_count == 2
@@ -0,0 +1,65 @@
+"""
+Tests for the host-side simulation of apps
+"""
+
+from pyArduinoML.methodchaining.AppBuilder import AppBuilder
+from pyArduinoML.model.GeneratorOptions import GeneratorOptions, SENSOR_DEBOUNCE
+from pyArduinoML.model.SIGNAL import HIGH, LOW
+from pyArduinoML.model.TimeUnit import S
+from pyArduinoML.simulation.Simulator import Simulator, benchmark
+
+
+def build_switch_app(options=None):
+    """
+    Builds an app switching a LED on and off with a button, or after 2 seconds for off.
+    """
+    return AppBuilder("Switch") \
+        .sensor("BUTTON").with_debounce(50).on_pin(9) \
+        .sensor("STOP").on_pin(10) \
+        .actuator("LED").on_pin(12) \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when("BUTTON").has_value(HIGH).go_to_state("on") \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .when("STOP").has_value(HIGH).go_to_state("off") \
+            .after(2, S).go_to_state("off") \
+        .get_contents(options)
+
+
+def test_global_debounce_blocks_all_transitions():
+    result = Simulator(build_switch_app()).run([
+        (100, "BUTTON", HIGH),  # blocked: less than 200 ms since the start
+        (300, "BUTTON", HIGH),  # fires
+        (400, "STOP", HIGH),  # blocked: less than 200 ms since the previous transition
+        (600, "STOP", HIGH),  # fires
+    ])
+    assert result.states == [(0, "off"), (300, "on"), (600, "off")]
+    assert result.outputs == [(0, "LED", LOW), (300, "LED", HIGH), (600, "LED", LOW)]
+    assert result.state == "off"
+
+
+def test_sensor_debounce_only_blocks_the_sensors_read():
+    result = Simulator(build_switch_app(GeneratorOptions(debounce=SENSOR_DEBOUNCE))).run([
+        (60, "BUTTON", HIGH),  # the window of BUTTON is 50 ms
+        (100, "STOP", LOW),
+        (250, "STOP", HIGH),  # STOP was never stamped
+    ])
+    assert result.states == [(0, "off"), (60, "on"), (250, "off"), (250, "on")]
+
+
+def test_time_transitions_fire_after_the_delay_since_the_state_entry():
+    result = Simulator(build_switch_app()).run([
+        (300, "BUTTON", HIGH),
+        (400, "BUTTON", LOW),
+        (2299, "STOP", LOW),
+        (2300, "STOP", LOW),
+    ])
+    assert result.states == [(0, "off"), (300, "on"), (2300, "off")]
+    assert result.visits() == {"off": 2, "on": 1}
+
+
+def test_benchmark_reports_the_throughput():
+    rate, result = benchmark(build_switch_app(), events=10000)
+    assert rate > 0
+    assert len(result.states) > 1
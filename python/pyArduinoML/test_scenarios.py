@@ -0,0 +1,24 @@
+"""
+Tests for the loading of the scenarios of the command lines
+"""
+
+from pyArduinoML.Scenarios import load_scenarios
+from pyArduinoML.model.GeneratorOptions import LOOP, parse_value
+
+
+def test_loads_the_scenarios_with_overridden_options(tmp_path, capsys):
+    scenarios = tmp_path / "scenarios.py"
+    scenarios.write_text("from pyArduinoML.simulation.test_simulator import build_switch_app\n"
+                         "def scenario_switch():\n"
+                         "    app = build_switch_app()\n"
+                         "    print(app)\n"
+                         "    return app\n")
+    apps = load_scenarios(str(scenarios), ["backend=LOOP", "sample_sensors=True"])
+    assert [app.name for app in apps] == ["Switch"]
+    assert apps[0].options.backend == LOOP and apps[0].options.sample_sensors
+    # the scenarios print their program
+    assert capsys.readouterr().out == ""
+
+
+def test_parse_value():
+    assert [parse_value(value) for value in ("LOOP", "False", "8", "uno")] == [LOOP, False, 8, "uno"]
@@ -0,0 +1,112 @@
+"""
+Minimization of the states of an app, by partition refinement (Hopcroft's algorithm).
+Two states are merged if they run the same actions, and have the same transitions (conditions or delays, in the same
+priority order) to merged states. The generated code of the merged states is then identical, whatever the generation
+options, so that the minimized app behaves as the original one with fewer state functions.
+"""
+
+from pyArduinoML.model.TimeTransition import TimeTransition
+
+
+def _signature(state):
+    """
+    Behavior of a state, besides the targets of its transitions.
+
+    :param state: State, the state
+    :return: Tuple, hashable description of the actions and of the transitions of the state
+    """
+    actions = tuple([(action.brick.name, action.value) for action in state.actions])
+    transitions = []
+    for transition in state.transitions:
+        if isinstance(transition, TimeTransition):
+            transitions.append(("after", transition.delay))
+        else:
+            transitions.append(("when", transition.evaluate_condition(),
+                                tuple([sensor.name for sensor in transition.sensors()])))
+    return actions, tuple(transitions)
+
+
+def partition(app):
+    """
+    Classes of equivalent states of an app.
+
+    :param app: App, the app
+    :return: List[Integer], class of each state, classes being numbered by their first state
+    """
+    states = app.states
+    count = len(states)
+    state_ids = dict([(state.name, index) for index, state in enumerate(states)])
+    # initial partition: states with the same signature
+    blocks = []  # List[Set[Integer]], states of each block
+    block_of = [0] * count
+    signatures = {}
+    for index, state in enumerate(states):
+        block = signatures.setdefault(_signature(state), len(blocks))
+        if block == len(blocks):
+            blocks.append(set())
+        blocks[block].add(index)
+        block_of[index] = block
+    # inverse transitions: sources of the k-th transition of each target
+    width = max([len(state.transitions) for state in states] + [0])
+    inverse = [dict() for _ in range(width)]
+    for index, state in enumerate(states):
+        for k, transition in enumerate(state.transitions):
+            inverse[k].setdefault(state_ids[transition.nextstate.name], []).append(index)
+
+    waiting = list(range(len(blocks)))
+    pending = set(waiting)
+    while waiting:
+        splitter = waiting.pop()
+        pending.discard(splitter)
+        members = list(blocks[splitter])
+        for k in range(width):
+            # states whose k-th transition leads to the splitter, by block
+            touched = {}
+            for target in members:
+                for source in inverse[k].get(target, ()):
+                    touched.setdefault(block_of[source], []).append(source)
+            for block, sources in touched.items():
+                if len(sources) == len(blocks[block]):
+                    continue
+                # the sources leave the block
+                new = len(blocks)
+                blocks.append(set(sources))
+                blocks[block].difference_update(sources)
+                for source in sources:
+                    block_of[source] = new
+                if block in pending:
+                    waiting.append(new)
+                    pending.add(new)
+                else:
+                    smaller = new if len(blocks[new]) <= len(blocks[block]) else block
+                    waiting.append(smaller)
+                    pending.add(smaller)
+
+    # classes numbered by their first state, so that the initial state stays first
+    numbers = {}
+    return [numbers.setdefault(block_of[index], len(numbers)) for index in range(count)]
+
+
+def minimize(app):
+    """
+    Merges the equivalent states of an app, in place: the first state of each class is kept, and the transitions
+    are redirected to the kept states.
+
+    :param app: App, the app
+    :return: Map[String, String], kept state of each removed state, by name
+    """
+    classes = partition(app)
+    kept = {}
+    states = []
+    for index, state in enumerate(app.states):
+        if classes[index] not in kept:
+            kept[classes[index]] = state
+            states.append(state)
+    state_ids = dict([(state.name, index) for index, state in enumerate(app.states)])
+    for state in states:
+        for transition in state.transitions:
+            transition.nextstate = kept[classes[state_ids[transition.nextstate.name]]]
+    rtr = dict([(state.name, kept[classes[index]].name) for index, state in enumerate(app.states)
+                if kept[classes[index]] is not state])
+    app.states = states
+    return rtr
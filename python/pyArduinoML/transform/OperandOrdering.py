@@ -0,0 +1,155 @@
+"""
+Profile-guided ordering of the operands of the and/or conditions of an app.
+The generated && and || chains short-circuit: an and chain stops at the first false operand, an or chain at the
+first true one. Given the probability of each sensor being HIGH, the operands are reordered to minimize the expected
+number of sensor reads, operands being taken as independent: an and chain is sorted by increasing
+cost / P(false), an or chain by increasing cost / P(true).
+The operands are side-effect free, so that the reordered conditions hold for exactly the same sensor values.
+Only the conditions generated as short-circuit chains are reordered: the decision trees of the states with several
+sensor transitions, the truth tables, and the sampled sensors read each sensor once whatever the order.
+"""
+
+from pyArduinoML.model import SIGNAL
+from pyArduinoML.model.Condition import AndCondition, BinaryExpression, NotCondition, OrCondition, \
+    PrimaryExpression
+from pyArduinoML.model.GeneratorOptions import TABLE
+from pyArduinoML.model.Sensor import Sensor
+from pyArduinoML.model.TimeTransition import TimeTransition
+
+DEFAULT_PROBABILITY = 0.5  # probability of a sensor being HIGH when nothing is known about it
+
+
+def probabilities_from_traces(app, traces):
+    """
+    Probability of each sensor of an app being HIGH, as the fraction of the time it is HIGH in traces (sensors being
+    LOW at time 0, until the last event of each trace).
+
+    :param app: App, the app
+    :param traces: List[List[(Integer, String, SIGNAL)]], simulated or recorded traces, events by increasing time
+    :return: Map[String, Float], by sensor name (DEFAULT_PROBABILITY for sensors of traces with no duration)
+    """
+    names = [brick.name for brick in app.bricks if isinstance(brick, Sensor)]
+    high = dict([(name, 0) for name in names])
+    total = 0
+    for trace in traces:
+        values = dict([(name, SIGNAL.LOW) for name in names])
+        changed = dict([(name, 0) for name in names])
+        end = 0
+        for now, sensor, value in trace:
+            if values.get(sensor) == SIGNAL.HIGH:
+                high[sensor] += now - changed[sensor]
+            values[sensor] = value
+            changed[sensor] = now
+            end = now
+        for name in names:
+            if values[name] == SIGNAL.HIGH:
+                high[name] += end - changed[name]
+        total += end
+    return dict([(name, high[name] / float(total) if total else DEFAULT_PROBABILITY) for name in names])
+
+
+def _primary(expression, probabilities):
+    """
+    Expected reads and probability of holding of a sensor check.
+
+    :param expression: PrimaryExpression, the check (not negated)
+    :param probabilities: Map[String, Float], probability of each sensor being HIGH
+    :return: (Float, Float)
+    """
+    high = probabilities.get(expression.brick.name, DEFAULT_PROBABILITY)
+    return 1.0, high if expression.value == SIGNAL.HIGH else 1.0 - high
+
+
+def _chain(operands, conjunction):
+    """
+    Expected reads and probability of holding of a short-circuit chain.
+
+    :param operands: List[(Float, Float)], expected reads and probability of holding of the operands, in order
+    :param conjunction: Boolean, True for an and chain, False for an or chain
+    :return: (Float, Float)
+    """
+    cost = 0.0
+    reached = 1.0  # probability of evaluating the next operand
+    for operand_cost, probability in operands:
+        cost += reached * operand_cost
+        reached *= probability if conjunction else 1.0 - probability
+    return cost, reached if conjunction else 1.0 - reached
+
+
+def _key(conjunction):
+    """
+    Sort key of the operands of a chain: the cost per probability of stopping the chain.
+
+    :param conjunction: Boolean, True for an and chain, False for an or chain
+    :return: Function[((Float, Float), Object), Float]
+    """
+    def key(entry):
+        cost, probability = entry[0]
+        stop = 1.0 - probability if conjunction else probability
+        return cost / stop if stop > 0 else float("inf")
+    return key
+
+
+def expected_reads(condition, probabilities, reorder=False):
+    """
+    Expected number of sensor reads of the evaluation of a condition, optionally reordering its operands in place.
+
+    :param condition: LogicalExpression, the condition
+    :param probabilities: Map[String, Float], probability of each sensor being HIGH
+    :param reorder: Boolean, reorder the operands of the and/or conditions to minimize the expected reads
+    :return: (Float, Float), expected reads and probability of the condition holding
+    """
+    if isinstance(condition, NotCondition):
+        cost, probability = expected_reads(condition.condition, probabilities, reorder)
+        return cost, 1.0 - probability
+    if isinstance(condition, PrimaryExpression):
+        if condition.inner:
+            cost, probability = expected_reads(condition.inner, probabilities, reorder)
+            return cost, 1.0 - probability
+        return _primary(condition, probabilities)
+    if isinstance(condition, (AndCondition, OrCondition)):
+        conjunction = isinstance(condition, AndCondition)
+        if not condition.conditions:
+            return 0.0, 1.0 if conjunction else 0.0
+        entries = [(expected_reads(operand, probabilities, reorder), operand) for operand in condition.conditions]
+        if reorder:
+            # stable: operands with the same key keep their order
+            entries.sort(key=_key(conjunction))
+            condition.conditions = [operand for _, operand in entries]
+        return _chain([entry[0] for entry in entries], conjunction)
+    if isinstance(condition, BinaryExpression):
+        conjunction = condition.operator.lower() != "or"
+        entries = [(expected_reads(operand, probabilities, reorder), operand)
+                   for operand in (condition.left, condition.right)]
+        if reorder:
+            entries.sort(key=_key(conjunction))
+            condition.left, condition.right = entries[0][1], entries[1][1]
+        return _chain([entry[0] for entry in entries], conjunction)
+    return float(condition.checks()), DEFAULT_PROBABILITY
+
+
+def reorder_operands(app, probabilities):
+    """
+    Reorders, in place, the operands of the and/or conditions of the transitions of an app to minimize the expected
+    number of sensor reads, for the conditions generated as short-circuit chains with the options of the app.
+
+    :param app: App, the app
+    :param probabilities: Map[String, Float], probability of each sensor being HIGH, from traces (see
+                          probabilities_from_traces) or user hints (missing sensors: DEFAULT_PROBABILITY)
+    :return: (Float, Float), expected reads of the reordered conditions before and after the reordering
+    """
+    options = app.options
+    before = 0.0
+    after = 0.0
+    if options.backend == TABLE or options.sample_sensors:
+        # table lookups or sensors read once per poll
+        return before, after
+    for state in app.states:
+        if state.decision_tree(options) is not None:
+            continue
+        for transition in state.transitions:
+            if isinstance(transition, TimeTransition) or transition.uses_table(options):
+                continue
+            before += expected_reads(transition.condition, probabilities)[0]
+            after += expected_reads(transition.condition, probabilities, reorder=True)[0]
+    return before, after
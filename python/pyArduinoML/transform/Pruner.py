@@ -0,0 +1,86 @@
+"""
+Pruning of an app before code generation: the states that cannot be entered from the initial state, and the bricks
+that no remaining action or condition uses, are removed, so that the generated program neither declares their pins
+nor defines their state functions.
+"""
+
+import collections
+
+
+class PruningReport:
+    """
+    Elements removed by a pruning.
+
+    """
+
+    def __init__(self, states, bricks):
+        """
+        Constructor.
+
+        :param states: List[String], names of the removed states
+        :param bricks: List[String], names of the removed bricks
+        :return:
+        """
+        self.states = states
+        self.bricks = bricks
+
+    def __bool__(self):
+        return bool(self.states or self.bricks)
+
+    def __repr__(self):
+        """
+        External representation: the removed elements.
+
+        :return: String
+        """
+        if not self:
+            return "nothing to prune"
+        rtr = []
+        if self.states:
+            rtr.append("unreachable states: %s" % ", ".join(self.states))
+        if self.bricks:
+            rtr.append("unused bricks: %s" % ", ".join(self.bricks))
+        return "; ".join(rtr)
+
+
+def reachable_states(app):
+    """
+    States that can be entered from the initial state through transitions.
+
+    :param app: App, the app
+    :return: List[State], in the order of the app
+    """
+    if not app.states:
+        return []
+    reached = set([app.states[0].name])
+    frontier = collections.deque([app.states[0]])
+    while frontier:
+        state = frontier.popleft()
+        for transition in state.transitions:
+            if transition.nextstate.name not in reached:
+                reached.add(transition.nextstate.name)
+                frontier.append(transition.nextstate)
+    return [state for state in app.states if state.name in reached]
+
+
+def prune(app):
+    """
+    Removes, in place, the unreachable states of an app, then the bricks not used by the remaining states.
+
+    :param app: App, the app
+    :return: PruningReport
+    """
+    states = reachable_states(app)
+    kept = set([state.name for state in states])
+    removed_states = [state.name for state in app.states if state.name not in kept]
+    used = set()
+    for state in states:
+        for action in state.actions:
+            used.add(action.brick.name)
+        for transition in state.transitions:
+            for sensor in transition.sensors():
+                used.add(sensor.name)
+    removed_bricks = [brick.name for brick in app.bricks if brick.name not in used]
+    app.states = states
+    app.bricks = [brick for brick in app.bricks if brick.name in used]
+    return PruningReport(removed_states, removed_bricks)
@@ -0,0 +1,69 @@
+"""
+Tests for the minimization of the states of apps
+"""
+
+from pyArduinoML.analysis.Equivalence import equivalent
+from pyArduinoML.methodchaining.AppBuilder import AppBuilder
+from pyArduinoML.model.Actuator import Actuator
+from pyArduinoML.model.Action import Action
+from pyArduinoML.model.App import App
+from pyArduinoML.model.SIGNAL import HIGH, LOW
+from pyArduinoML.model.Sensor import Sensor
+from pyArduinoML.model.State import State
+from pyArduinoML.model.Transition import Transition
+from pyArduinoML.transform.Minimizer import minimize, partition
+
+
+def build_counter_app():
+    """
+    Builds an app counting button presses modulo 4 with duplicated states, the LED being on every other press.
+    """
+    builder = AppBuilder("Counter") \
+        .sensor("BUTTON").on_pin(9) \
+        .actuator("LED").on_pin(12)
+    for index in range(4):
+        builder = builder.state("s%d" % index) \
+            .set("LED").to(HIGH if index % 2 else LOW) \
+            .when("BUTTON").has_value(HIGH).go_to_state("s%d" % ((index + 1) % 4))
+    return builder.get_contents()
+
+
+def test_merges_equivalent_states():
+    app = build_counter_app()
+    original = build_counter_app()
+    assert partition(app) == [0, 1, 0, 1]
+    assert minimize(app) == {"s2": "s0", "s3": "s1"}
+    assert [state.name for state in app.states] == ["s0", "s1"]
+    assert app.states[1].transition.nextstate is app.states[0]
+    assert equivalent(app, original)
+    assert "void state_s2()" not in str(app)
+
+
+def test_keeps_states_with_different_transitions():
+    app = AppBuilder("Dual") \
+        .sensor("BUTTON1").on_pin(9) \
+        .sensor("BUTTON2").on_pin(10) \
+        .actuator("LED").on_pin(12) \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when("BUTTON1").has_value(HIGH).go_to_state("pressed") \
+        .state("pressed") \
+            .set("LED").to(LOW) \
+            .when("BUTTON2").has_value(HIGH).go_to_state("on") \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .when("BUTTON1").has_value(LOW).go_to_state("off") \
+        .get_contents()
+    assert minimize(app) == {}
+    assert len(app.states) == 3
+
+
+def test_large_apps():
+    button = Sensor("BUTTON", 9)
+    led = Actuator("LED", 12)
+    states = [State("s%d" % index, (Action(HIGH if index % 2 else LOW, led),)) for index in range(100000)]
+    for index, state in enumerate(states):
+        state.settransition(Transition(button, HIGH, states[(index + 1) % len(states)]))
+    app = App("Large", (button, led), states)
+    assert len(minimize(app)) == 99998
+    assert [state.name for state in app.states] == ["s0", "s1"]
@@ -0,0 +1,68 @@
+"""
+Tests for the profile-guided ordering of condition operands
+"""
+
+import itertools
+
+import pytest
+
+from pyArduinoML.methodchaining.AppBuilder import AppBuilder
+from pyArduinoML.model.GeneratorOptions import GeneratorOptions, TABLE_CONDITIONS
+from pyArduinoML.model.SIGNAL import HIGH, LOW
+from pyArduinoML.model.Transition import Transition
+from pyArduinoML.transform.OperandOrdering import probabilities_from_traces, reorder_operands
+
+
+def build_app(options=None):
+    """
+    Builds an app whose conditions check the usually HIGH sensor first.
+    """
+    return AppBuilder("Ordered") \
+        .sensor("DOOR").on_pin(8) \
+        .sensor("MOTION").on_pin(9) \
+        .sensor("KEY").on_pin(10) \
+        .actuator("SIREN").on_pin(12) \
+        .state("armed") \
+            .set("SIREN").to(LOW) \
+            .when_all(("DOOR", HIGH), ("MOTION", HIGH)).go_to_state("alarm") \
+        .state("alarm") \
+            .set("SIREN").to(HIGH) \
+            .when_any(("DOOR", HIGH), ("KEY", HIGH)).go_to_state("armed") \
+        .get_contents(options)
+
+
+def test_probabilities_from_traces():
+    app = build_app()
+    probabilities = probabilities_from_traces(app, [[(100, "DOOR", HIGH), (400, "MOTION", HIGH), (500, "DOOR", LOW)],
+                                                    [(500, "KEY", LOW)]])
+    assert probabilities == {"DOOR": 0.4, "MOTION": 0.1, "KEY": 0.0}
+
+
+def test_reorders_operands_without_changing_the_conditions():
+    app = build_app()
+    original = build_app()
+    before, after = reorder_operands(app, {"DOOR": 0.9, "MOTION": 0.1, "KEY": 0.95})
+    # the and chain checks MOTION (rarely HIGH) first; the or chain checks KEY (almost always HIGH) first
+    assert "digitalRead(MOTION) == HIGH && digitalRead(DOOR) == HIGH" in str(app)
+    assert "digitalRead(KEY) == HIGH || digitalRead(DOOR) == HIGH" in str(app)
+    assert after < before
+    for values in itertools.product((LOW, HIGH), repeat=3):
+        values = dict(zip(("DOOR", "MOTION", "KEY"), values))
+        for state, other in zip(app.states, original.states):
+            assert state.transition.condition.holds(values) == other.transition.condition.holds(values)
+
+
+def test_skips_decision_trees_and_truth_tables():
+    probabilities = {"DOOR": 0.9, "MOTION": 0.1, "KEY": 0.95}
+    app = build_app()
+    app.states[0].addtransition(Transition(app.bricks[2], HIGH, app.states[0]))
+    code = str(app)
+    before, after = reorder_operands(app, probabilities)
+    # the tree of "armed" reads each sensor once whatever the order: only the or chain of "alarm" is reordered
+    assert str(app).split("void state_alarm")[0] == code.split("void state_alarm")[0]
+    assert "digitalRead(KEY) == HIGH || digitalRead(DOOR) == HIGH" in str(app)
+    assert (before, after) == pytest.approx((1.1, 1.05))
+    app = build_app(GeneratorOptions(conditions=TABLE_CONDITIONS))
+    code = str(app)
+    assert reorder_operands(app, probabilities) == (0.0, 0.0)
+    assert str(app) == code
@@ -0,0 +1,49 @@
+"""
+Tests for the pruning of apps
+"""
+
+from pyArduinoML.methodchaining.AppBuilder import AppBuilder
+from pyArduinoML.model.SIGNAL import HIGH, LOW
+from pyArduinoML.model.TimeUnit import S
+from pyArduinoML.transform.Pruner import prune
+
+
+def build_app():
+    """
+    Builds an app with an unreachable state, and a sensor and an actuator only used by it.
+    """
+    return AppBuilder("Pruned") \
+        .sensor("BUTTON").on_pin(9) \
+        .sensor("RESET").on_pin(10) \
+        .actuator("LED").on_pin(12) \
+        .actuator("BUZZER").on_pin(11) \
+        .state("off") \
+            .set("LED").to(LOW) \
+            .when("BUTTON").has_value(HIGH).go_to_state("on") \
+        .state("on") \
+            .set("LED").to(HIGH) \
+            .after(1, S).go_to_state("off") \
+        .state("maintenance") \
+            .set("BUZZER").to(HIGH) \
+            .when("RESET").has_value(HIGH).go_to_state("off") \
+        .get_contents()
+
+
+def test_removes_unreachable_states_and_unused_bricks():
+    app = build_app()
+    report = prune(app)
+    assert report.states == ["maintenance"]
+    assert report.bricks == ["RESET", "BUZZER"]
+    assert repr(report) == "unreachable states: maintenance; unused bricks: RESET, BUZZER"
+    assert [state.name for state in app.states] == ["off", "on"]
+    assert [brick.name for brick in app.bricks] == ["BUTTON", "LED"]
+    code = str(app)
+    assert "state_maintenance" not in code and "RESET" not in code and "BUZZER" not in code
+
+
+def test_nothing_to_prune():
+    app = build_app()
+    prune(app)
+    report = prune(app)
+    assert not report
+    assert repr(report) == "nothing to prune"